@@ -5,44 +5,67 @@ set -e  # Exit on error
 SCRIPT_DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)"
 ROOT_DIR="$(cd "${SCRIPT_DIR}/.." && pwd)"
 
-echo "=== Building Lambda Layer ==="
+# build_layer <layer dir> <requirements file> <zip name>
+build_layer() {
+    local layer_dir="${ROOT_DIR}/$1"
+    local requirements="$2"
+    local zip_file="${ROOT_DIR}/dist/$3"
 
-# Clean previous builds
-rm -rf "${ROOT_DIR}/lambda_layer" "${ROOT_DIR}/dist/dependencies_layer.zip"
+    echo "=== Building Lambda Layer from ${requirements} ==="
 
-# Create layer directory with proper Python structure
-mkdir -p "${ROOT_DIR}/lambda_layer/python"
+    # Clean previous builds
+    rm -rf "${layer_dir}" "${zip_file}"
 
-echo "Installing dependencies from requirements-layer..."
+    # Create layer directory with proper Python structure
+    mkdir -p "${layer_dir}/python"
 
-# Install packages to the layer directory
-python -m pip install \
-    --platform manylinux2014_x86_64 \
-    --target "${ROOT_DIR}/lambda_layer/python" \
-    --python-version 3.11 \
-    --implementation cp \
-    --only-binary=:all: \
-    --upgrade \
-    -r requirements-layer.txt
+    echo "Installing dependencies from ${requirements}..."
 
-echo "Cleaning up unnecessary files..."
+    # Install packages to the layer directory
+    python -m pip install \
+        --platform manylinux2014_x86_64 \
+        --target "${layer_dir}/python" \
+        --python-version 3.11 \
+        --implementation cp \
+        --only-binary=:all: \
+        --upgrade \
+        -r "${ROOT_DIR}/${requirements}"
 
-# Remove cache and other unnecessary files
-echo "Cleaning up unnecessary files..."
+    echo "Cleaning up unnecessary files..."
 
-find "${ROOT_DIR}/lambda_layer" -type d -name "__pycache__" -exec rm -rf {} + 2>/dev/null || true
-find "${ROOT_DIR}/lambda_layer" -type f -name "*.pyc" -delete
-find "${ROOT_DIR}/lambda_layer" -type d -name "tests" -exec rm -rf {} + 2>/dev/null || true
+    find "${layer_dir}" -type d -name "__pycache__" -exec rm -rf {} + 2>/dev/null || true
+    find "${layer_dir}" -type f -name "*.pyc" -delete
+    find "${layer_dir}" -type d -name "tests" -exec rm -rf {} + 2>/dev/null || true
+}
 
+# zip_layer <layer dir> <zip name>
+zip_layer() {
+    local layer_dir="${ROOT_DIR}/$1"
+    local zip_file="${ROOT_DIR}/dist/$2"
 
+    echo "Creating ZIP file..."
 
-echo "Creating ZIP file..."
+    # Create the ZIP (must be at the layer root, not inside python/)
+    mkdir -p "${ROOT_DIR}/dist"
+    (cd "${layer_dir}" && zip -r "${zip_file}" .)
 
-# Create the ZIP (must be at lambda_layer root, not inside python/)
-mkdir -p "${ROOT_DIR}/dist"
-cd "${ROOT_DIR}/lambda_layer"
-zip -r "${ROOT_DIR}/dist/dependencies_layer.zip" python/
+    echo "=== Layer Build Complete ==="
+    echo "Layer size: $(du -sh "${layer_dir}")"
+    echo "ZIP size: $(du -h "${zip_file}")"
+}
 
-echo "=== Layer Build Complete ==="
-echo "Layer size: $(du -sh "${ROOT_DIR}/lambda_layer")"
-echo "ZIP size: $(du -h "${ROOT_DIR}/dist/dependencies_layer.zip")"
\ No newline at end of file
+# Shared dependencies (ingestion and loading)
+build_layer lambda_layer requirements-layer.txt dependencies_layer.zip
+zip_layer lambda_layer dependencies_layer.zip
+
+# Transform engine dependencies: duckdb plus its httpfs extension, which
+# DuckDB would otherwise download at runtime. Layers are mounted at /opt,
+# so the extension ends up in /opt/duckdb_extensions (DUCKDB_EXTENSION_DIR).
+build_layer lambda_transform_layer requirements-transform-layer.txt transform_layer.zip
+DUCKDB_VERSION="$(sed -n 's/^duckdb==//p' "${ROOT_DIR}/requirements-transform-layer.txt")"
+EXTENSION_DIR="${ROOT_DIR}/lambda_transform_layer/duckdb_extensions/v${DUCKDB_VERSION}/linux_amd64"
+mkdir -p "${EXTENSION_DIR}"
+echo "Downloading DuckDB httpfs extension v${DUCKDB_VERSION}..."
+curl -fsSL "https://extensions.duckdb.org/v${DUCKDB_VERSION}/linux_amd64/httpfs.duckdb_extension.gz" \
+    | gunzip > "${EXTENSION_DIR}/httpfs.duckdb_extension"
+zip_layer lambda_transform_layer transform_layer.zip
@@ -0,0 +1,244 @@
+import hashlib
+import logging
+import os
+import threading
+from collections import OrderedDict
+from typing import Callable, Optional
+
+import pandas as pd
+import pyarrow as pa
+from botocore.exceptions import ClientError
+
+logger = logging.getLogger(__name__)
+logger.setLevel(os.getenv("LOG_LEVEL", "INFO"))
+
+# Decoded S3 objects cached on local disk, keyed by bucket/key/ETag.
+# Lambda keeps /tmp between warm invocations of the same container, so an
+# unchanged object is answered by a conditional GET (304, no body) and read
+# back from an uncompressed Arrow IPC file (no download, no JSON decode).
+
+ENABLED = os.getenv("S3_DISK_CACHE", "false").lower() in ("1", "true", "yes")
+CACHE_DIR = os.getenv("S3_DISK_CACHE_DIR", "/tmp/s3-cache")
+MAX_BYTES = int(os.getenv("S3_DISK_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+
+SUFFIX = ".arrow"
+TMP_SUFFIX = ".tmp"
+
+
+def _process_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class DiskCache:
+    """
+    Size-capped LRU cache of DataFrames stored as Arrow IPC files.
+    File names are <sha256(bucket/key)>.<etag>.arrow, so the index can be
+    rebuilt from the directory when a new process finds a warm /tmp.
+    """
+
+    def __init__(self, directory: str = CACHE_DIR, max_bytes: int = MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        # path -> size, least recently used first
+        self._entries: "OrderedDict[str, int]" = OrderedDict()
+        # object id -> (etag, path)
+        self._etags: dict[str, tuple[str, str]] = {}
+        self._total = 0
+        os.makedirs(directory, exist_ok=True)
+        self._scan()
+
+    @staticmethod
+    def _object_id(bucket: str, key: str) -> str:
+        return hashlib.sha256(f"{bucket}/{key}".encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def _etag_token(etag: str) -> str:
+        token = etag.strip('"')
+        if not token or not all(c.isalnum() or c == "-" for c in token):
+            token = hashlib.sha256(etag.encode("utf-8")).hexdigest()
+        return token
+
+    def _remove_orphaned_tmp(self, name: str):
+        # <entry>.<pid>.<thread>.tmp: left behind when the writing process
+        # died mid-put; they would use /tmp without counting toward max_bytes
+        try:
+            pid = int(name[:-len(TMP_SUFFIX)].split(".")[-2])
+        except (IndexError, ValueError):
+            pid = None
+        if pid is not None and (pid == os.getpid() or _process_alive(pid)):
+            return
+        try:
+            os.remove(os.path.join(self.directory, name))
+            logger.info("Removed orphaned cache file %s", name)
+        except FileNotFoundError:
+            pass
+
+    def _scan(self):
+        files = []
+        for name in os.listdir(self.directory):
+            if name.endswith(TMP_SUFFIX):
+                self._remove_orphaned_tmp(name)
+                continue
+            if not name.endswith(SUFFIX):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            files.append((stat.st_mtime, path, stat.st_size, name))
+        for _, path, size, name in sorted(files):
+            object_id, etag_token = name[:-len(SUFFIX)].split(".", 1)
+            self._entries[path] = size
+            self._etags[object_id] = (etag_token, path)
+            self._total += size
+
+    def etag(self, bucket: str, key: str) -> Optional[str]:
+        """
+        Returns the quoted ETag of the cached copy of the object, if any.
+        """
+        with self._lock:
+            entry = self._etags.get(self._object_id(bucket, key))
+        return f'"{entry[0]}"' if entry else None
+
+    def get(self, bucket: str, key: str, etag: str) -> Optional[pd.DataFrame]:
+        object_id = self._object_id(bucket, key)
+        with self._lock:
+            entry = self._etags.get(object_id)
+            if entry is None or entry[0] != self._etag_token(etag):
+                return None
+            path = entry[1]
+            self._entries.move_to_end(path)
+        try:
+            # to_pandas copies every column anyway, so a plain read is as
+            # cheap as memory-mapping the file
+            with pa.OSFile(path, "rb") as source:
+                table = pa.ipc.open_file(source).read_all()
+            os.utime(path)
+        except (FileNotFoundError, pa.ArrowInvalid) as e:
+            logger.warning("Dropping unreadable cache entry %s: %s", path, e)
+            self._remove(object_id, path)
+            return None
+        return table.to_pandas()
+
+    def put(self, bucket: str, key: str, etag: str, df: pd.DataFrame) -> None:
+        try:
+            table = pa.Table.from_pandas(df, preserve_index=False)
+        except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError) as e:
+            # mixed-type object columns cannot be stored; just don't cache
+            logger.info("Not caching s3://%s/%s: %s", bucket, key, e)
+            return
+
+        object_id = self._object_id(bucket, key)
+        path = os.path.join(
+            self.directory, f"{object_id}.{self._etag_token(etag)}{SUFFIX}")
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}{TMP_SUFFIX}"
+        try:
+            with pa.OSFile(tmp_path, "wb") as sink:
+                with pa.ipc.new_file(sink, table.schema) as writer:
+                    writer.write_table(table)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning("Could not write cache entry for s3://%s/%s: %s", bucket, key, e)
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return
+        size = os.path.getsize(path)
+
+        with self._lock:
+            previous = self._etags.get(object_id)
+            if previous is not None and previous[1] != path:
+                self._discard(previous[1])
+            if path in self._entries:
+                self._total -= self._entries.pop(path)
+            self._entries[path] = size
+            self._etags[object_id] = (self._etag_token(etag), path)
+            self._total += size
+            self._evict()
+
+    def _evict(self):
+        # caller holds the lock
+        while self._total > self.max_bytes and len(self._entries) > 1:
+            path = next(iter(self._entries))
+            self._discard(path)
+            for object_id, (_, entry_path) in list(self._etags.items()):
+                if entry_path == path:
+                    del self._etags[object_id]
+            logger.info("Evicted %s from disk cache", path)
+
+    def _discard(self, path: str):
+        # caller holds the lock
+        self._total -= self._entries.pop(path, 0)
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    def _remove(self, object_id: str, path: str):
+        with self._lock:
+            self._discard(path)
+            self._etags.pop(object_id, None)
+
+    def clear(self):
+        with self._lock:
+            for path in list(self._entries):
+                self._discard(path)
+            self._etags.clear()
+
+
+_cache: Optional[DiskCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_disk_cache() -> Optional[DiskCache]:
+    """
+    Returns the process-wide DiskCache, or None when S3_DISK_CACHE is off.
+    """
+    global _cache
+    if not ENABLED:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = DiskCache()
+        return _cache
+
+
+def read_through(s3, bucket: str, key: str,
+                 decode: Callable[[bytes], pd.DataFrame],
+                 cache: Optional[DiskCache] = None) -> pd.DataFrame:
+    """
+    Returns decode(object body) for s3://bucket/key, served from the disk
+    cache when the object's ETag is unchanged. Without a cache this is a
+    plain get_object + decode.
+    """
+    cache = cache if cache is not None else get_disk_cache()
+    if cache is None:
+        return decode(s3.get_object(Bucket=bucket, Key=key)["Body"].read())
+
+    cached_etag = cache.etag(bucket, key)
+    if cached_etag is not None:
+        try:
+            response = s3.get_object(Bucket=bucket, Key=key, IfNoneMatch=cached_etag)
+        except ClientError as e:
+            status = e.response.get("ResponseMetadata", {}).get("HTTPStatusCode")
+            if status != 304 and e.response.get("Error", {}).get("Code") not in ("304", "NotModified"):
+                raise
+            df = cache.get(bucket, key, cached_etag)
+            if df is not None:
+                logger.info("Disk cache hit for s3://%s/%s", bucket, key)
+                return df
+            response = s3.get_object(Bucket=bucket, Key=key)
+    else:
+        response = s3.get_object(Bucket=bucket, Key=key)
+
+    df = decode(response["Body"].read())
+    if response.get("ETag"):
+        cache.put(bucket, key, response["ETag"], df)
+    return df
@@ -0,0 +1,129 @@
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Hashable
+
+import boto3
+from botocore.config import Config
+
+logger = logging.getLogger(__name__)
+logger.setLevel(os.getenv("LOG_LEVEL", "INFO"))
+
+# Module-level registry shared by all three Lambdas.
+# Lambda keeps module state alive between warm invocations, so boto3 clients,
+# secrets and idle DB connections created here are reused by the next
+# invocation served by the same container.
+
+SECRET_TTL_SECONDS = int(os.getenv("SECRET_CACHE_TTL_SECONDS", "300"))
+# Idle connections kept per database; 0 disables connection reuse
+MAX_IDLE_CONNECTIONS = int(os.getenv("DB_POOL_MAX_IDLE", "4"))
+
+_lock = threading.Lock()
+_clients: dict[Hashable, Any] = {}
+_secrets: dict[str, tuple[float, dict[str, Any]]] = {}
+_idle_connections: dict[Hashable, list[Any]] = {}
+
+
+def get_client(service_name: str, max_pool_connections: int | None = None):
+    """
+    Returns a cached boto3 client for the service (clients are thread-safe).
+    max_pool_connections sizes the client's HTTP connection pool for callers
+    that share one client across that many threads (botocore default: 10).
+    """
+    key = (service_name, max_pool_connections)
+    with _lock:
+        client = _clients.get(key)
+        if client is None:
+            if max_pool_connections is None:
+                client = boto3.client(service_name)
+            else:
+                client = boto3.client(
+                    service_name, config=Config(max_pool_connections=max_pool_connections))
+            _clients[key] = client
+            logger.info("Created boto3 client for %s", service_name)
+        return client
+
+
+def get_secret(secret_id: str) -> dict[str, Any]:
+    """
+    Returns the parsed JSON secret, fetched from Secrets Manager at most once
+    per SECRET_TTL_SECONDS.
+    """
+    with _lock:
+        cached = _secrets.get(secret_id)
+        if cached is not None and time.monotonic() - cached[0] < SECRET_TTL_SECONDS:
+            return cached[1]
+
+    resp = get_client("secretsmanager").get_secret_value(SecretId=secret_id)
+
+    # Secrets Manager can store secret as SecretString or SecretBinary.
+    if "SecretString" in resp and resp["SecretString"]:
+        secret_raw = resp["SecretString"]
+    else:
+        secret_raw = resp["SecretBinary"].decode("utf-8")
+    secret = json.loads(secret_raw)
+
+    with _lock:
+        _secrets[secret_id] = (time.monotonic(), secret)
+    logger.info("Loaded secret %s from Secrets Manager", secret_id)
+    return secret
+
+
+def acquire_connection(key: Hashable,
+                       connect: Callable[[], Any],
+                       ping: Callable[[Any], None]):
+    """
+    Returns an idle connection for key that passes ping(), or a new one from
+    connect(). Connections failing the health check are closed and skipped.
+    """
+    while True:
+        with _lock:
+            idle = _idle_connections.get(key)
+            conn = idle.pop() if idle else None
+
+        if conn is None:
+            logger.info("Opening new database connection")
+            return connect()
+
+        try:
+            ping(conn)
+            logger.info("Reusing warm database connection")
+            return conn
+        except Exception as e:
+            logger.warning("Discarding stale database connection: %s", e)
+            close_connection(conn)
+
+
+def release_connection(key: Hashable, conn: Any) -> None:
+    """
+    Hands a connection back for reuse by later invocations.
+    Connections beyond MAX_IDLE_CONNECTIONS are closed.
+    """
+    with _lock:
+        idle = _idle_connections.setdefault(key, [])
+        if len(idle) < MAX_IDLE_CONNECTIONS:
+            idle.append(conn)
+            return
+    close_connection(conn)
+
+
+def close_connection(conn: Any) -> None:
+    try:
+        conn.close()
+    except Exception as e:
+        logger.warning("Failed to close database connection cleanly: %s", e)
+
+
+def clear() -> None:
+    """
+    Drops every cached client and secret and closes idle connections.
+    """
+    with _lock:
+        idle = [conn for conns in _idle_connections.values() for conn in conns]
+        _idle_connections.clear()
+        _clients.clear()
+        _secrets.clear()
+    for conn in idle:
+        close_connection(conn)
@@ -0,0 +1,149 @@
+import logging
+import os
+from io import BytesIO
+
+logger = logging.getLogger(__name__)
+logger.setLevel(os.getenv("LOG_LEVEL", "INFO"))
+
+# S3 rejects multipart parts smaller than 5 MiB (except the last one)
+MIN_PART_SIZE = 5 * 1024 * 1024
+
+
+class S3StreamWriter:
+    """
+    Streams bytes to a single S3 object.
+
+    Data is collected in an in-memory buffer that is uploaded as one
+    multipart part every time it reaches part_size bytes, so memory stays
+    bounded by part_size however much is written. Small objects that never
+    fill a part are uploaded with a single put_object on close(), straight
+    from the buffer.
+    """
+
+    content_type = "application/octet-stream"
+
+    def __init__(self, s3, bucket: str, key: str, part_size: int,
+                 content_type: str | None = None):
+        if part_size < MIN_PART_SIZE:
+            raise ValueError(
+                f"part_size must be at least {MIN_PART_SIZE} bytes")
+        self.s3 = s3
+        self.bucket = bucket
+        self.key = key
+        self.part_size = part_size
+        if content_type is not None:
+            self.content_type = content_type
+        self.bytes_written = 0
+        self._buffer = BytesIO()
+        self._upload_id = None
+        self._parts: list[dict] = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+        return False
+
+    def write(self, data: bytes):
+        self._buffer.write(data)
+        self.bytes_written += len(data)
+        if self._buffer.tell() >= self.part_size:
+            self._flush_part()
+
+    def _flush_part(self):
+        if self._upload_id is None:
+            response = self.s3.create_multipart_upload(
+                Bucket=self.bucket,
+                Key=self.key,
+                ContentType=self.content_type)
+            self._upload_id = response["UploadId"]
+            logger.info("Started multipart upload → s3://%s/%s", self.bucket, self.key)
+
+        part_number = len(self._parts) + 1
+        self._buffer.seek(0)
+        response = self.s3.upload_part(
+            Bucket=self.bucket,
+            Key=self.key,
+            UploadId=self._upload_id,
+            PartNumber=part_number,
+            Body=self._buffer)
+        self._parts.append({"ETag": response["ETag"], "PartNumber": part_number})
+        logger.info("Uploaded part %s → s3://%s/%s", part_number, self.bucket, self.key)
+        self._buffer = BytesIO()
+
+    def close(self):
+        """
+        Uploads whatever is buffered and finalises the object. Returns the key.
+        """
+        try:
+            if self._upload_id is None:
+                self._buffer.seek(0)
+                self.s3.put_object(
+                    Bucket=self.bucket,
+                    Key=self.key,
+                    Body=self._buffer,
+                    ContentType=self.content_type)
+            else:
+                if self._buffer.tell():
+                    self._flush_part()
+                self.s3.complete_multipart_upload(
+                    Bucket=self.bucket,
+                    Key=self.key,
+                    UploadId=self._upload_id,
+                    MultipartUpload={"Parts": self._parts})
+            logger.info(
+                "S3 upload successful → s3://%s/%s, bytes=%s",
+                self.bucket, self.key, self.bytes_written)
+            return self.key
+        except Exception as e:
+            logger.exception(
+                "Failed to upload stream to S3 (bucket=%s, key=%s, %s)",
+                self.bucket, self.key, e)
+            self.abort()
+            raise
+
+    def abort(self):
+        """
+        Drops buffered data and aborts any multipart upload in progress.
+        """
+        self._buffer = BytesIO()
+        if self._upload_id is None:
+            return
+        try:
+            self.s3.abort_multipart_upload(
+                Bucket=self.bucket, Key=self.key, UploadId=self._upload_id)
+            logger.info("Aborted multipart upload → s3://%s/%s", self.bucket, self.key)
+        except Exception as e:
+            logger.warning("Failed to abort multipart upload for %s: %s", self.key, e)
+        self._upload_id = None
+
+
+class PartSink:
+    """
+    File-like object handing a writer's output (e.g. pyarrow's
+    ParquetWriter) to an S3StreamWriter.
+    """
+
+    def __init__(self, writer: S3StreamWriter):
+        self._writer = writer
+        self._position = 0
+        self.closed = False
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._writer.write(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
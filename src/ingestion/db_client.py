@@ -1,10 +1,16 @@
 # from dotenv import load_dotenv
 from pg8000.native import Connection
 from datetime import datetime
+from uuid import uuid4
 import os
 import logging
-import boto3
-import json
+import threading
+import time
+from common.resources import (
+    acquire_connection,
+    get_secret,
+    release_connection,
+)
 
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
@@ -17,6 +23,28 @@ except ModuleNotFoundError:
 if load_dotenv is not None:
     load_dotenv()
 
+# Rows fetched per round trip when streaming through a server-side cursor
+DEFAULT_BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", "5000"))
+
+# Catalog snapshots are kept at module level so warm Lambda invocations
+# reuse them: {(host, port, database, user): (loaded_at, {table: [columns]})}.
+# The user is part of the key because privileges decide which tables it sees.
+CATALOG_TTL_SECONDS = int(os.getenv("CATALOG_TTL_SECONDS", "900"))
+_catalog_cache: dict[tuple, tuple[float, dict[str, list[dict]]]] = {}
+_catalog_lock = threading.Lock()
+
+
+def _ping(conn):
+    conn.run("SELECT 1")
+
+
+def clear_catalog_cache():
+    """
+    Drops every cached catalog snapshot (e.g. after a schema migration).
+    """
+    with _catalog_lock:
+        _catalog_cache.clear()
+
 
 class DatabaseClient:
     def __init__(self):
@@ -44,9 +72,7 @@ class DatabaseClient:
             if not secret_arn:
                 raise ValueError(
                     "DB_SECRET_ARN environment variable is required in Lambda")
-            client = boto3.client("secretsmanager")
-            response = client.get_secret_value(SecretId=secret_arn)
-            secret = json.loads(response["SecretString"])
+            secret = get_secret(secret_arn)
             self.host = secret.get("host")
             self.database = secret.get("database")
             self.user = secret.get("username")
@@ -62,8 +88,13 @@ class DatabaseClient:
             logger.error("Missing required DB environment variables!")
             raise ValueError(
                 "One or more database environment variables are missing.")
+        # Warm invocations reuse an idle connection when it passes a health check
+        self._pool_key = (self.host, self.port, self.database, self.user)
+        self.conn = acquire_connection(self._pool_key, self._connect, _ping)
+
+    def _connect(self):
         try:
-            self.conn = Connection(
+            conn = Connection(
                 user=self.user,
                 host=self.host,
                 database=self.database,
@@ -71,6 +102,7 @@ class DatabaseClient:
                 port=self.port,
             )
             logger.info("Database connection successfully.")
+            return conn
         except Exception as e:
             logger.exception(f"Failed to database connection: {e}")
             raise
@@ -91,6 +123,53 @@ class DatabaseClient:
             logger.exception(f"Error executing SQL: {sql}, {e}")
             raise
 
+    def stream(
+            self,
+            sql: str,
+            params: dict | None = None,
+            batch_size: int = DEFAULT_BATCH_SIZE):
+        """
+        Executes a query through a named server-side cursor and yields lists
+        of row dicts with at most batch_size rows each, so only one batch is
+        held in memory at a time.
+        """
+        if batch_size < 1:
+            raise ValueError("batch_size must be a positive integer")
+
+        sql = sql.strip().rstrip(";")
+        cursor_name = f"ingest_cursor_{uuid4().hex}"
+        logger.info(
+            f"Streaming SQL via cursor '{cursor_name}': {sql} | params={params} | batch_size={batch_size}")
+
+        # Cursors only live inside a transaction block
+        self.conn.run("BEGIN")
+        completed = False
+        try:
+            self.conn.run(
+                f"DECLARE {cursor_name} NO SCROLL CURSOR FOR {sql}", **(params or {}))
+            total = 0
+            while True:
+                rows = self.conn.run(
+                    f"FETCH FORWARD {batch_size} FROM {cursor_name}")
+                if not rows:
+                    break
+                column_names = [col["name"] for col in self.conn.columns]
+                total += len(rows)
+                yield [dict(zip(column_names, row)) for row in rows]
+            self.conn.run(f"CLOSE {cursor_name}")
+            completed = True
+            logger.info(
+                f"Streaming via cursor '{cursor_name}' finished. Returned {total} rows.")
+        except Exception as e:
+            logger.exception(f"Error streaming SQL: {sql}, {e}")
+            raise
+        finally:
+            try:
+                self.conn.run("COMMIT" if completed else "ROLLBACK")
+            except Exception as e:
+                logger.warning(
+                    f"Failed to end cursor transaction for '{cursor_name}': {e}")
+
     def fetch_preview(self, table_name: str, limit: int = 10):
         logger.info(
             f"Fetching preview from table '{table_name}' (limit={limit})")
@@ -102,20 +181,72 @@ class DatabaseClient:
             return {"columns": [], "rows": []}
         return {"columns": list(rows[0].keys()), "rows": rows}
 
+    def catalog(self, refresh: bool = False) -> dict[str, list[dict]]:
+        """
+        Returns {table_name: [{"column_name", "data_type"}, ...]} for every
+        table in the public schema, loaded with a single information_schema
+        query and cached for CATALOG_TTL_SECONDS. Primary key columns also
+        carry their "primary_key_position".
+        """
+        cache_key = (self.host, self.port, self.database, self.user)
+        with _catalog_lock:
+            cached = _catalog_cache.get(cache_key)
+            if (not refresh and cached is not None
+                    and time.monotonic() - cached[0] < CATALOG_TTL_SECONDS):
+                return cached[1]
+
+            sql = """
+                SELECT t.table_name, c.column_name, c.data_type,
+                       c.numeric_precision, c.numeric_scale,
+                       pk.ordinal_position AS primary_key_position
+                FROM information_schema.tables t
+                LEFT JOIN information_schema.columns c
+                  ON c.table_schema = t.table_schema
+                 AND c.table_name = t.table_name
+                LEFT JOIN (
+                    SELECT kcu.table_name, kcu.column_name, kcu.ordinal_position
+                    FROM information_schema.table_constraints tc
+                    JOIN information_schema.key_column_usage kcu
+                      ON tc.constraint_name = kcu.constraint_name
+                     AND tc.table_schema = kcu.table_schema
+                    WHERE tc.constraint_type = 'PRIMARY KEY'
+                      AND tc.table_schema = 'public'
+                ) pk
+                  ON pk.table_name = c.table_name
+                 AND pk.column_name = c.column_name
+                WHERE t.table_schema = 'public'
+                ORDER BY t.table_name, c.ordinal_position;
+            """
+            try:
+                rows = self.run(sql)
+            except Exception:
+                logger.exception("Failed to load catalog snapshot from information_schema")
+                raise
+
+            snapshot: dict[str, list[dict]] = {}
+            for row in rows:
+                columns = snapshot.setdefault(row["table_name"], [])
+                if row["column_name"] is not None:
+                    column = {
+                        "column_name": row["column_name"],
+                        "data_type": row["data_type"],
+                    }
+                    if row["numeric_precision"] is not None:
+                        column["numeric_precision"] = row["numeric_precision"]
+                        column["numeric_scale"] = row["numeric_scale"]
+                    if row.get("primary_key_position") is not None:
+                        column["primary_key_position"] = row["primary_key_position"]
+                    columns.append(column)
+            _catalog_cache[cache_key] = (time.monotonic(), snapshot)
+            logger.info(f"Loaded catalog snapshot for {len(snapshot)} tables")
+            return snapshot
+
     def list_tables(self):
         """
         Returns a list of all user tables in the public schema.
         """
-        sql = """
-            SELECT table_name
-            FROM information_schema.tables
-            WHERE table_schema = 'public'
-            ORDER BY table_name;
-        """
-
         try:
-            rows = self.run(sql)
-            table_names = [row["table_name"] for row in rows]
+            table_names = sorted(self.catalog())
             logger.info(f"Found {len(table_names)} tables: {table_names}")
             return table_names
 
@@ -130,16 +261,12 @@ class DatabaseClient:
         if not table_name.isidentifier():
             raise ValueError(f"Unsafe table name: {table_name}")
 
-        sql = """
-            SELECT column_name, data_type
-            FROM information_schema.columns
-            WHERE table_name = :table_name
-            ORDER BY ordinal_position;
-        """
-
         try:
-
-            rows = self.run(sql, {"table_name": table_name})
+            catalog = self.catalog()
+            if table_name not in catalog:
+                # table may have been created after the snapshot was taken
+                catalog = self.catalog(refresh=True)
+            rows = catalog.get(table_name, [])
             # expected format output [{"column_name": "staff_id", "data_type":
             # "integer"}]
 
@@ -151,6 +278,60 @@ class DatabaseClient:
                 f"Failed to get columns for table '{table_name}', {e}")
             raise
 
+    def get_primary_key(self, table_name: str) -> list[str]:
+        """
+        Returns the primary key column names of the table, in key order.
+        """
+        if not table_name.isidentifier():
+            raise ValueError(f"Unsafe table name: {table_name}")
+
+        columns = [col for col in self.get_columns(table_name)
+                   if "primary_key_position" in col]
+        columns.sort(key=lambda col: col["primary_key_position"])
+        return [col["column_name"] for col in columns]
+
+    def fetch_change_counters(self) -> dict[str, int]:
+        """
+        Returns {table_name: inserted + updated + deleted rows} for every
+        table in the public schema from the statistics collector, in one
+        query that touches no table data. The counters only ever grow
+        until the statistics are reset, so any difference from an earlier
+        reading means the table may have changed.
+        """
+        sql = """
+            SELECT relname AS table_name,
+                   n_tup_ins + n_tup_upd + n_tup_del AS changes
+            FROM pg_stat_user_tables
+            WHERE schemaname = 'public';
+        """
+        rows = self.run(sql)
+        return {row["table_name"]: int(row["changes"]) for row in rows}
+
+    def fetch_max(self, table_name: str, column: str):
+        """
+        Returns max(column) for the table, or None if the table is empty.
+        """
+        if not table_name.isidentifier() or not column.isidentifier():
+            raise ValueError(f"Unsafe identifier: {table_name}.{column}")
+        rows = self.run(f"SELECT max({column}) AS max_value FROM {table_name};")
+        return rows[0]["max_value"] if rows else None
+
+    def fetch_chunk(self, table_name: str, key_column: str, after=None, limit: int = 10000):
+        """
+        Keyset pagination: returns up to limit rows ordered by key_column,
+        starting after the given key value (from the beginning if None).
+        """
+        if not table_name.isidentifier() or not key_column.isidentifier():
+            raise ValueError(f"Unsafe identifier: {table_name}.{key_column}")
+
+        if after is None:
+            sql = f"SELECT * FROM {table_name} ORDER BY {key_column} ASC LIMIT :limit;"
+            params = {"limit": limit}
+        else:
+            sql = f"SELECT * FROM {table_name} WHERE {key_column} > :after ORDER BY {key_column} ASC LIMIT :limit;"
+            params = {"after": after, "limit": limit}
+        return self.run(sql, params)
+
     def infer_timestamp_column(self, table_name: str):
         """
         Detects the most appropriate timestamp column for incremental ingestion.
@@ -196,9 +377,21 @@ class DatabaseClient:
                 f"Failed to infer timestamp column for table '{table_name}','{e}'")
             raise
 
-    def fetch_changes(self, table_name: str, since: datetime | None = None):
+    def fetch_changes(
+            self,
+            table_name: str,
+            since: datetime | None = None,
+            stream: bool = False,
+            batch_size: int = DEFAULT_BATCH_SIZE,
+            key_column: str | None = None,
+            after_key=None):
         """
         Fetches new or updated rows from the table since the given checkpoint timestamp.
+        With stream=True returns a generator of row batches (see stream())
+        instead of a single list.
+        With key_column, incremental rows are ordered by (timestamp, key) so
+        a run can stop after any row; after_key resumes from the composite
+        watermark (since, after_key) of such a stop.
         """
 
         logger.info(
@@ -206,28 +399,46 @@ class DatabaseClient:
 
         if not table_name.isidentifier():
             raise ValueError(f"Unsafe table name: {table_name}")
+        if key_column is not None and not key_column.isidentifier():
+            raise ValueError(f"Unsafe column name: {key_column}")
 
         timestamp_col = self.infer_timestamp_column(table_name)
 
         if timestamp_col is None:
             logger.warning(
                 f"[{table_name}] No timestamp column found → FULL table ingestion.")
-            return self.run(f"SELECT * FROM {table_name};")
+            return self._select(f"SELECT * FROM {table_name};", None, stream, batch_size)
 
         if since is None:
             logger.info(
                 f"[{table_name}] No checkpoint found → FULL table ingestion.")
-            return self.run(f"SELECT * FROM {table_name};")
+            return self._select(f"SELECT * FROM {table_name};", None, stream, batch_size)
+
+        params = {"since": since}
+        if key_column is None:
+            where = f"{timestamp_col} > :since"
+            order_by = f"{timestamp_col} ASC"
+        else:
+            order_by = f"{timestamp_col} ASC, {key_column} ASC"
+            if after_key is None:
+                where = f"{timestamp_col} > :since"
+            else:
+                logger.info(
+                    f"[{table_name}] Resuming after ({since}, {key_column}={after_key})")
+                where = f"({timestamp_col}, {key_column}) > (:since, :after_key)"
+                params["after_key"] = after_key
 
         sql = f"""
             SELECT *
             FROM {table_name}
-            WHERE {timestamp_col} > :since
-            ORDER BY {timestamp_col} ASC;
+            WHERE {where}
+            ORDER BY {order_by};
         """
 
         try:
-            rows = self.run(sql, {"since": since})
+            if stream:
+                return self.stream(sql, params, batch_size)
+            rows = self.run(sql, params)
             logger.info(
                 f"Fetched {len(rows)} incremental rows from '{table_name}'")
             return rows
@@ -237,9 +448,17 @@ class DatabaseClient:
                 f"Failed to fetch incremental data from table '{table_name}','{e}'")
             raise
 
+    def _select(self, sql: str, params: dict | None, stream: bool, batch_size: int):
+        if stream:
+            return self.stream(sql, params, batch_size)
+        return self.run(sql, params)
+
     def close(self):
-        try:
-            self.conn.close()
-            logger.info("Database connection closed.")
-        except Exception as e:
-            logger.warning(f"Failed to close database connection cleanly: {e}")
+        """
+        Releases the connection so a later invocation can reuse it.
+        """
+        if self.conn is None:
+            return
+        release_connection(self._pool_key, self.conn)
+        self.conn = None
+        logger.info("Database connection released.")
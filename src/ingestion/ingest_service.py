@@ -1,12 +1,41 @@
-from ingestion.db_client import DatabaseClient
+from ingestion.db_client import DatabaseClient, DEFAULT_BATCH_SIZE
 from ingestion.s3_client import S3Client
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
+from typing import Callable
 import logging
+import os
+import threading
 
 
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
+# Tables ingested concurrently, each worker on its own DB connection
+DEFAULT_MAX_WORKERS = int(os.getenv("INGEST_MAX_WORKERS", "4"))
+
+# Keep all table watermarks in one manifest object instead of one file per table
+USE_CHECKPOINT_MANIFEST = os.getenv(
+    "INGEST_CHECKPOINT_MANIFEST", "false").lower() in ("1", "true", "yes")
+MANIFEST_WRITE_ATTEMPTS = 3
+
+# Initial loads (no checkpoint) page through the table by primary key,
+# one part file per chunk, and can resume after a timeout
+USE_CHUNKED_FULL_LOAD = os.getenv(
+    "INGEST_CHUNKED_FULL_LOAD", "false").lower() in ("1", "true", "yes")
+DEFAULT_CHUNK_SIZE = int(os.getenv("INGEST_CHUNK_SIZE", "50000"))
+
+# Skip tables whose pg_stat_user_tables counters have not moved since the
+# previous run
+USE_CHANGE_PROBE = os.getenv(
+    "INGEST_CHANGE_PROBE", "false").lower() in ("1", "true", "yes")
+# Results after which a table's probe reading is saved as its new baseline
+PROBE_SETTLED_STATUSES = ("success", "no_changes", "unchanged")
+
+# Stop starting new work once less than this much invocation time is left,
+# leaving room to upload the open part and save checkpoints
+DEFAULT_TIME_RESERVE_MS = int(os.getenv("INGEST_TIME_RESERVE_MS", "60000"))
+
 
 class IngestionService:
     """
@@ -14,12 +43,34 @@ class IngestionService:
     - writing raw data into S3
     """
 
-    def __init__(self, bucket: str):
+    def __init__(
+            self,
+            bucket: str,
+            batch_size: int = DEFAULT_BATCH_SIZE,
+            max_workers: int = DEFAULT_MAX_WORKERS,
+            use_manifest: bool = USE_CHECKPOINT_MANIFEST,
+            chunked_full_load: bool = USE_CHUNKED_FULL_LOAD,
+            chunk_size: int = DEFAULT_CHUNK_SIZE,
+            time_reserve_ms: int = DEFAULT_TIME_RESERVE_MS,
+            change_probe: bool = USE_CHANGE_PROBE):
         logger.info(f"Initialising IngestionService with bucket={bucket}")
 
         self.bucket = bucket
+        self.batch_size = batch_size
+        self.max_workers = max_workers
+        self.use_manifest = use_manifest
+        self.chunked_full_load = chunked_full_load
+        self.chunk_size = chunk_size
+        self.time_reserve_ms = time_reserve_ms
+        self.change_probe = change_probe
+        # set by ingest_all_tables, e.g. to context.get_remaining_time_in_millis
+        self._time_remaining: Callable[[], int] | None = None
         self.db = DatabaseClient()
         self.s3 = S3Client(bucket)
+        # pg8000 connections are not thread-safe: one per worker thread
+        self._local = threading.local()
+        self._worker_dbs: list[DatabaseClient] = []
+        self._worker_dbs_lock = threading.Lock()
 
     def ingest_table_preview(self, table_name: str, limit: int = 10):
         logger.info(
@@ -60,19 +111,103 @@ class IngestionService:
                 f"Ingestion preview FAILED for table '{table_name}'. Error: {e}")
             raise
 
-    def ingest_table_changes(self, table_name: str):
+    def ingest_table_changes(
+            self,
+            table_name: str,
+            db: DatabaseClient | None = None,
+            checkpoints: dict[str, datetime] | None = None,
+            resume_keys: dict[str, dict] | None = None):
+        """
+        Ingests rows changed since the table's checkpoint.
+        When a checkpoints dict (the loaded manifest) is passed, the
+        checkpoint is read from and written back to it instead of the
+        per-table checkpoint file; tables not in the manifest yet fall back
+        to their legacy file once, which migrates them.
+        If the time budget runs out between batches, the rows written so far
+        are uploaded and the checkpoint becomes the composite (timestamp,
+        primary key) of the last row, so the next run resumes exactly there.
+        """
         logger.info(f"Starting incremental ingestion for table '{table_name}'")
+        db = db or self.db
 
         try:
-            # Get last checkpoint from S3
-            last_checkpoint = self.s3.get_checkpoint(table_name)
+            # Get last checkpoint from the manifest or S3
+            if checkpoints is not None and table_name in checkpoints:
+                last_checkpoint = checkpoints[table_name]
+                resume_key = (resume_keys or {}).get(table_name)
+            else:
+                last_checkpoint, resume_key = self.s3.get_checkpoint_state(table_name)
+                if checkpoints is not None and last_checkpoint is not None:
+                    logger.info(
+                        f"Migrating checkpoint for table '{table_name}' into manifest")
+                    checkpoints[table_name] = last_checkpoint
+                    if resume_keys is not None and resume_key is not None:
+                        resume_keys[table_name] = resume_key
+
+            if last_checkpoint is None and self.chunked_full_load:
+                result = self._ingest_full_load_chunked(
+                    table_name, db, checkpoints, resume_keys)
+                if result is not None:
+                    return result
+
+            # Incremental runs order by (timestamp, primary key) so they can
+            # stop after any batch; full loads stop only between tables
+            key_column = None
+            if last_checkpoint is not None:
+                primary_key = db.get_primary_key(table_name)
+                if len(primary_key) == 1:
+                    key_column = primary_key[0]
+            if resume_key is not None and resume_key.get("column") != key_column:
+                logger.warning(
+                    f"[{table_name}] Resume key {resume_key} no longer matches the primary key; "
+                    f"re-reading from '{last_checkpoint}'")
+                resume_key = None
 
-            # Fetch new/updated rows from DB since last checkpoint
-            changes = self.db.fetch_changes(table_name, since=last_checkpoint)
+            # Stream new/updated rows from DB since last checkpoint, one
+            # batch at a time, so memory is bounded by batch_size
+            batches = db.fetch_changes(
+                table_name,
+                since=last_checkpoint,
+                stream=True,
+                batch_size=self.batch_size,
+                key_column=key_column,
+                after_key=resume_key["value"] if resume_key is not None else None)
+
+            timestamp_col = db.infer_timestamp_column(table_name)
+            raw_checkpoint = None
+            last_row = None
+            interrupted = False
+
+            # Encode batches straight into a multipart upload so neither
+            # the rows nor the serialised payload are held in full
+            columns = (db.get_columns(table_name)
+                       if self.s3.landing_format == "parquet" else None)
+            writer = self.s3.open_stream(table_name, columns=columns)
+            try:
+                for batch in batches:
+                    if not batch:
+                        continue
+                    writer.write_rows(batch)
+                    if timestamp_col is not None:
+                        batch_max = max(row[timestamp_col] for row in batch)
+                        if raw_checkpoint is None or batch_max > raw_checkpoint:
+                            raw_checkpoint = batch_max
+                    last_row = batch[-1]
+                    if key_column is not None and timestamp_col is not None and self._out_of_time():
+                        interrupted = True
+                        break
+            except Exception:
+                writer.abort()
+                raise
+            if interrupted and hasattr(batches, "close"):
+                # ends the server-side cursor before the upload completes
+                batches.close()
+            row_count = writer.row_count
 
             logger.info(
-                f"Fetched {len(changes)} changed rows from table '{table_name}' since '{last_checkpoint}'")
-            if not changes:
+                f"Fetched {row_count} changed rows from table '{table_name}' since '{last_checkpoint}'")
+            if not row_count:
+                writer.abort()
                 logger.info(
                     f"No new changes found for table '{table_name}'. Skipping S3 upload.")
                 return {
@@ -82,22 +217,33 @@ class IngestionService:
                     "status": "no_changes",
                 }
 
-            s3_key = self.s3.write_json(table_name=table_name, data=changes)
+            s3_key = writer.close()
 
             logger.info(
                 f"Incremental ingestion complete for table '{table_name}'. " f"Uploaded to S3 key: {s3_key}")
 
-            timestamp_col = self.db.infer_timestamp_column(table_name)
+            if interrupted:
+                # rows are ordered by (timestamp, key): the last row written
+                # is the composite watermark to resume after
+                new_resume_key = {"column": key_column, "value": last_row[key_column]}
+                checkpoint_str = self._save_checkpoint(
+                    table_name, last_row[timestamp_col], checkpoints,
+                    resume_keys=resume_keys, resume_key=new_resume_key)
+                logger.warning(
+                    f"Time budget exhausted during table '{table_name}' after {row_count} rows; "
+                    f"will resume after ({checkpoint_str}, {key_column}={new_resume_key['value']})")
+                return {
+                    "table": table_name,
+                    "row_count": row_count,
+                    "s3_key": s3_key,
+                    "checkpoint": checkpoint_str,
+                    "resume_key": new_resume_key,
+                    "status": "partial",
+                }
+
             if timestamp_col is not None:
-                raw_checkpoint = max(row[timestamp_col] for row in changes)
-                if isinstance(raw_checkpoint, str):
-                    new_checkpoint = datetime.fromisoformat(raw_checkpoint)
-                else:
-                    new_checkpoint = raw_checkpoint
-                self.s3.write_checkpoint(table_name, timestamp=new_checkpoint)
-                logger.info(
-                    f"Updated checkpoint for table '{table_name}' to '{new_checkpoint}'")
-                checkpoint_str = new_checkpoint.isoformat()
+                checkpoint_str = self._save_checkpoint(
+                    table_name, raw_checkpoint, checkpoints, resume_keys=resume_keys)
             else:
                 checkpoint_str = None
                 logger.info(
@@ -106,7 +252,7 @@ class IngestionService:
             # RETURN METADATA ONLY (no heavy payload)
             return {
                 "table": table_name,
-                "row_count": len(changes),
+                "row_count": row_count,
                 "s3_key": s3_key,
                 "checkpoint": checkpoint_str,
             }
@@ -116,36 +262,300 @@ class IngestionService:
                 f"Incremental ingestion FAILED for table '{table_name}'. Error: {e}")
             raise
 
+    def _save_checkpoint(
+            self,
+            table_name: str,
+            raw_checkpoint,
+            checkpoints=None,
+            resume_keys=None,
+            resume_key: dict | None = None) -> str:
+        if isinstance(raw_checkpoint, str):
+            new_checkpoint = datetime.fromisoformat(raw_checkpoint)
+        else:
+            new_checkpoint = raw_checkpoint
+        if checkpoints is not None:
+            checkpoints[table_name] = new_checkpoint.astimezone(timezone.utc)
+            if resume_keys is not None:
+                if resume_key is not None:
+                    resume_keys[table_name] = resume_key
+                else:
+                    resume_keys.pop(table_name, None)
+        else:
+            self.s3.write_checkpoint(
+                table_name, timestamp=new_checkpoint, resume_key=resume_key)
+        logger.info(
+            f"Updated checkpoint for table '{table_name}' to '{new_checkpoint}'")
+        return new_checkpoint.isoformat()
+
+    def _ingest_full_load_chunked(
+            self, table_name: str, db: DatabaseClient, checkpoints=None, resume_keys=None):
+        """
+        Initial load paged by primary key: every chunk of chunk_size rows is
+        written as its own numbered part file and the last key is persisted
+        after each chunk, so an interrupted load resumes where it stopped.
+        Returns None when the table has no single-column primary key, in
+        which case the caller falls back to a streamed full load.
+        """
+        primary_key = db.get_primary_key(table_name)
+        if len(primary_key) != 1:
+            logger.warning(
+                f"[{table_name}] No single-column primary key ({primary_key}) → streamed full load.")
+            return None
+        key_column = primary_key[0]
+        timestamp_col = db.infer_timestamp_column(table_name)
+
+        progress = self.s3.get_bootstrap_progress(table_name)
+        if progress is None:
+            # rows changed while the load runs are re-read by the first
+            # incremental run, which starts from this high watermark
+            high_watermark = (db.fetch_max(table_name, timestamp_col)
+                              if timestamp_col is not None else None)
+            progress = {
+                "table": table_name,
+                "key_column": key_column,
+                "last_key": None,
+                "parts_written": 0,
+                "rows_written": 0,
+                "started_at": datetime.now(timezone.utc).strftime("%Y-%m-%dT%H-%M-%S"),
+                "high_watermark": high_watermark.isoformat() if high_watermark is not None else None,
+            }
+        else:
+            logger.info(
+                f"[{table_name}] Resuming chunked full load after key {progress['last_key']}")
+
+        columns = (db.get_columns(table_name)
+                   if self.s3.landing_format == "parquet" else None)
+        s3_key = None
+        while True:
+            rows = db.fetch_chunk(
+                table_name, key_column, after=progress["last_key"], limit=self.chunk_size)
+            if not rows:
+                break
+            part = progress["parts_written"] + 1
+            with self.s3.open_stream(
+                    table_name, columns=columns, timestamp=progress["started_at"], part=part) as writer:
+                writer.write_rows(rows)
+            s3_key = writer.key
+            progress["last_key"] = rows[-1][key_column]
+            progress["parts_written"] = part
+            progress["rows_written"] += len(rows)
+            self.s3.write_bootstrap_progress(table_name, progress)
+            if len(rows) < self.chunk_size:
+                break
+            if self._out_of_time():
+                logger.warning(
+                    f"Time budget exhausted during chunked full load of '{table_name}'; "
+                    f"will resume after key {progress['last_key']}")
+                return {
+                    "table": table_name,
+                    "mode": "chunked_full_load",
+                    "row_count": progress["rows_written"],
+                    "parts": progress["parts_written"],
+                    "s3_key": s3_key,
+                    "checkpoint": None,
+                    "status": "partial",
+                }
+
+        checkpoint_str = None
+        if progress["high_watermark"] is not None:
+            checkpoint_str = self._save_checkpoint(
+                table_name, progress["high_watermark"], checkpoints, resume_keys=resume_keys)
+        self.s3.delete_bootstrap_progress(table_name)
+
+        logger.info(
+            f"Chunked full load complete for table '{table_name}': "
+            f"{progress['rows_written']} rows in {progress['parts_written']} parts")
+        return {
+            "table": table_name,
+            "mode": "chunked_full_load",
+            "row_count": progress["rows_written"],
+            "parts": progress["parts_written"],
+            "s3_key": s3_key,
+            "checkpoint": checkpoint_str,
+        }
+
     def ingest_all_tables(
             self,
             tables: list[str] | None = None,
-            limit: int = 50):
+            limit: int = 50,
+            max_workers: int | None = None,
+            time_remaining: Callable[[], int] | None = None):
         """
         Ingests new rows from all tables in the database.
+        Tables are processed on a bounded worker pool; a failure in one
+        table is recorded in its result and does not stop the others.
+        time_remaining (e.g. context.get_remaining_time_in_millis) bounds the
+        run: once less than time_reserve_ms is left, tables in progress stop
+        after their current batch ("partial") and tables not started yet are
+        reported as "deferred"; both pick up where they left off next run.
+        With change_probe, tables whose change counters match the previous
+        run are reported as "unchanged" without being queried.
         """
+        self._time_remaining = time_remaining
         tables_to_process = tables or self.db.list_tables()
-        logger.info(f"Starting ingestion for {len(tables_to_process)} tables")
-
-        results = {}
+        workers = max_workers or self.max_workers
+        logger.info(
+            f"Starting ingestion for {len(tables_to_process)} tables (max_workers={workers})")
 
+        tables_to_ingest = []
         for table in tables_to_process:
-            logger.info(f"Processing table '{table}'")
             if table == "_prisma_migrations":
                 logger.info(f"Skipping internal table '{table}'")
                 continue
+            tables_to_ingest.append(table)
+
+        unchanged = []
+        counters = previous_counters = None
+        if self.change_probe:
+            counters, previous_counters = self._probe_changes()
+            if counters is not None:
+                unchanged = [table for table in tables_to_ingest
+                             if table in previous_counters
+                             and counters.get(table) == previous_counters[table]]
+                tables_to_ingest = [table for table in tables_to_ingest
+                                    if table not in unchanged]
+                logger.info(
+                    f"Change probe: {len(tables_to_ingest)} changed, {len(unchanged)} unchanged tables")
+
+        checkpoints = resume_keys = None
+        if self.use_manifest:
+            # one GET for every table's watermark; one conditional PUT at the end
+            checkpoints, resume_keys, manifest_etag = self.s3.get_checkpoint_manifest()
+            initial_checkpoints = dict(checkpoints)
+            initial_resume_keys = dict(resume_keys)
 
+        if workers <= 1 or len(tables_to_ingest) <= 1:
+            results = {table: self._ingest_table_safely(table, self.db, checkpoints, resume_keys)
+                       for table in tables_to_ingest}
+        else:
             try:
-                # CHANGED LINE 142
-                result = self.ingest_table_changes(table)
-                results[table] = {"status": "success", **result}
+                with ThreadPoolExecutor(
+                        max_workers=min(workers, len(tables_to_ingest)),
+                        thread_name_prefix="ingest") as pool:
+                    futures = {
+                        table: pool.submit(
+                            self._ingest_table_in_worker, table, checkpoints, resume_keys)
+                        for table in tables_to_ingest
+                    }
+                    # keep the results dict in table order
+                    results = {table: future.result()
+                               for table, future in futures.items()}
+            finally:
+                self._close_worker_dbs()
 
-            except Exception as e:
-                logger.error(f"Failed to ingest table '{table}'")
-                results[table] = {"status": "error", "error": str(e)}
+        if self.use_manifest and (checkpoints != initial_checkpoints
+                                  or resume_keys != initial_resume_keys):
+            self._save_checkpoint_manifest(checkpoints, manifest_etag, resume_keys)
 
+        if unchanged:
+            results.update({table: {"status": "unchanged"} for table in unchanged})
+            # report in table order
+            results = {table: results[table] for table in tables_to_process
+                       if table in results}
+        if self.change_probe and counters is not None:
+            self._save_change_counters(results, counters, previous_counters)
+
+        pending = [table for table, result in results.items()
+                   if result.get("status") in ("partial", "deferred")]
+        if pending:
+            logger.warning(f"Ingestion stopped on time budget; pending tables: {pending}")
         logger.info("All-table ingestion completed.")
         return results
 
+    def _ingest_table_safely(self, table: str, db: DatabaseClient, checkpoints=None, resume_keys=None):
+        if self._out_of_time():
+            logger.warning(f"Deferring table '{table}': time budget exhausted")
+            return {"status": "deferred"}
+        logger.info(f"Processing table '{table}'")
+        try:
+            result = self.ingest_table_changes(
+                table, db=db, checkpoints=checkpoints, resume_keys=resume_keys)
+            return {"status": "success", **result}
+
+        except Exception as e:
+            logger.error(f"Failed to ingest table '{table}'")
+            return {"status": "error", "error": str(e)}
+
+    def _ingest_table_in_worker(self, table: str, checkpoints=None, resume_keys=None):
+        try:
+            db = self._worker_db()
+        except Exception as e:
+            logger.error(f"Failed to open worker connection for table '{table}'")
+            return {"status": "error", "error": str(e)}
+        return self._ingest_table_safely(table, db, checkpoints, resume_keys)
+
+    def _probe_changes(self):
+        """
+        Returns (current counters, counters saved by the previous run), or
+        (None, None) if the probe fails, in which case every table is read.
+        """
+        try:
+            counters = self.db.fetch_change_counters()
+            previous_counters = self.s3.get_change_counters()
+        except Exception as e:
+            logger.warning(f"Change probe failed, ingesting every table: {e}")
+            return None, None
+        return counters, previous_counters
+
+    def _save_change_counters(self, results: dict, counters: dict, previous_counters: dict):
+        # the baseline is the reading taken *before* extraction, so a change
+        # committed mid-run still differs from it next time; tables that did
+        # not finish lose their baseline and are read again
+        new_counters = dict(previous_counters)
+        for table, result in results.items():
+            if result.get("status") in PROBE_SETTLED_STATUSES and table in counters:
+                new_counters[table] = counters[table]
+            else:
+                new_counters.pop(table, None)
+        if new_counters != previous_counters:
+            self.s3.write_change_counters(new_counters)
+
+    def _out_of_time(self) -> bool:
+        if self._time_remaining is None:
+            return False
+        return self._time_remaining() < self.time_reserve_ms
+
+    def _save_checkpoint_manifest(
+            self,
+            checkpoints: dict[str, datetime],
+            etag: str | None,
+            resume_keys: dict[str, dict] | None = None):
+        resume_keys = {} if resume_keys is None else resume_keys
+        for _ in range(MANIFEST_WRITE_ATTEMPTS):
+            if self.s3.write_checkpoint_manifest(
+                    checkpoints, etag=etag, resume_keys=resume_keys) is not None:
+                return
+            # someone else updated the manifest: merge, keeping the newest
+            # watermark per table, and try again against their version
+            current, current_resume_keys, etag = self.s3.get_checkpoint_manifest()
+            for table, timestamp in current.items():
+                if table not in checkpoints or timestamp > checkpoints[table]:
+                    checkpoints[table] = timestamp
+                    if table in current_resume_keys:
+                        resume_keys[table] = current_resume_keys[table]
+                    else:
+                        resume_keys.pop(table, None)
+        raise RuntimeError(
+            f"Could not save checkpoint manifest after {MANIFEST_WRITE_ATTEMPTS} attempts")
+
+    def _worker_db(self) -> DatabaseClient:
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = DatabaseClient()
+            self._local.db = db
+            with self._worker_dbs_lock:
+                self._worker_dbs.append(db)
+        return db
+
+    def _close_worker_dbs(self):
+        with self._worker_dbs_lock:
+            worker_dbs, self._worker_dbs = self._worker_dbs, []
+        for db in worker_dbs:
+            db.close()
+        # thread-locals die with the pool threads; start fresh next run
+        self._local = threading.local()
+
     def close(self):
         logger.info("Closing IngestionService resources...")
+        self._close_worker_dbs()
         self.db.close()
@@ -1,6 +1,7 @@
 import json
 import logging
 import os
+from common.resources import get_client
 from ingestion.ingest_service import IngestionService
 
 
@@ -8,6 +9,12 @@ from ingestion.ingest_service import IngestionService
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
+# Re-invoke this function asynchronously when tables were left pending by
+# the time budget, up to MAX_REINVOCATIONS times per scheduled run
+SELF_REINVOKE = os.getenv(
+    "INGEST_SELF_REINVOKE", "false").lower() in ("1", "true", "yes")
+MAX_REINVOCATIONS = int(os.getenv("INGEST_MAX_REINVOCATIONS", "3"))
+
 
 def lambda_handler(event, context):
     logger.info(f"Lambda triggered with event: {event}")
@@ -19,8 +26,15 @@ def lambda_handler(event, context):
     try:
         # table_name = event.get("table", "staff")
         logger.info(f"Starting ingestion for tables in bucket: {bucket}")
-        result = service.ingest_all_tables()
+        time_remaining = getattr(context, "get_remaining_time_in_millis", None)
+        # a re-invocation only continues the tables its run left pending
+        tables = (event or {}).get("pending") or None
+        if tables:
+            logger.info(f"Continuing pending tables: {tables}")
+        result = service.ingest_all_tables(tables=tables, time_remaining=time_remaining)
         logger.info(f"Ingestion complete: {result}")
+        if SELF_REINVOKE:
+            _reinvoke_if_pending(result, event, context)
         return {"statusCode": 200, "body": json.dumps(
             {"message": "Ingestion Lambda executed", "result": result}), }
     except Exception as e:
@@ -28,3 +42,35 @@ def lambda_handler(event, context):
         return {"statusCode": 500, "body": json.dumps({"error": str(e)})}
     finally:
         service.close()
+
+
+def _reinvoke_if_pending(result, event, context):
+    """
+    Starts another asynchronous run of this function for the tables the
+    time budget left as "partial" or "deferred". A failed invoke is only
+    logged: this run's ingestion has succeeded, and the pending tables are
+    picked up by the next scheduled run.
+    """
+    pending = [table for table, table_result in result.items()
+               if isinstance(table_result, dict)
+               and table_result.get("status") in ("partial", "deferred")]
+    if not pending or context is None:
+        return
+
+    reinvocation = (event or {}).get("reinvocation", 0) + 1
+    if reinvocation > MAX_REINVOCATIONS:
+        logger.warning(
+            f"Pending tables {pending} left for the next scheduled run: "
+            f"reached {MAX_REINVOCATIONS} re-invocations")
+        return
+
+    logger.info(f"Re-invoking ingestion ({reinvocation}) for pending tables: {pending}")
+    try:
+        get_client("lambda").invoke(
+            FunctionName=context.invoked_function_arn,
+            InvocationType="Event",
+            Payload=json.dumps({"reinvocation": reinvocation, "pending": pending}),
+        )
+    except Exception:
+        logger.exception(
+            f"Re-invocation failed; pending tables {pending} left for the next scheduled run")
@@ -1,21 +1,148 @@
-import boto3
+from common.resources import get_client
+from common.s3_stream import MIN_PART_SIZE, PartSink, S3StreamWriter
+from botocore.exceptions import ClientError
 import json
+import os
 from datetime import datetime, timezone
 import logging
 
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ModuleNotFoundError:
+    pa = None
+    pq = None
+
 
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
+# Landing file format for incremental extracts: "jsonl" or "parquet"
+DEFAULT_LANDING_FORMAT = os.getenv("LANDING_FORMAT", "jsonl").lower()
+LANDING_FORMATS = ("jsonl", "parquet")
+
+DEFAULT_PART_SIZE = int(os.getenv("RAW_PART_SIZE_BYTES", str(8 * 1024 * 1024)))
+
+# Single object holding the watermark of every table (see IngestionService)
+CHECKPOINT_MANIFEST_KEY = "checkpoints/_manifest.json"
+CHANGE_COUNTERS_KEY = "checkpoints/_change_counters.json"
+
+
+class RawStreamWriter(S3StreamWriter):
+    """
+    Streams rows to a single newline-delimited JSON object in S3, through
+    the bounded part buffer of S3StreamWriter.
+    """
+
+    content_type = "application/x-ndjson"
+
+    def __init__(self, s3, bucket: str, key: str, part_size: int = DEFAULT_PART_SIZE):
+        super().__init__(s3, bucket, key, part_size=part_size)
+        self.row_count = 0
+
+    def write_rows(self, rows: list[dict]):
+        for row in rows:
+            self.write(json.dumps(row, default=str).encode("utf-8") + b"\n")
+            self.row_count += 1
+
+
+def arrow_schema(columns: list[dict]):
+    """
+    Builds an Arrow schema from Postgres column types as returned by
+    DatabaseClient.get_columns(). Unknown types land as strings.
+    """
+    if pa is None:
+        raise RuntimeError("pyarrow is required for the parquet landing format")
+
+    def arrow_type(column: dict):
+        data_type = column["data_type"].lower()
+        if data_type == "smallint":
+            return pa.int16()
+        if data_type == "integer":
+            return pa.int32()
+        if data_type == "bigint":
+            return pa.int64()
+        if data_type in ("numeric", "decimal"):
+            precision = column.get("numeric_precision")
+            scale = column.get("numeric_scale")
+            if precision:
+                return pa.decimal128(precision, scale or 0)
+            return pa.decimal128(38, 18)
+        if data_type == "real":
+            return pa.float32()
+        if data_type == "double precision":
+            return pa.float64()
+        if data_type == "boolean":
+            return pa.bool_()
+        if data_type == "date":
+            return pa.date32()
+        if data_type.startswith("time ") or data_type == "time":
+            return pa.time64("us")
+        if data_type == "timestamp with time zone":
+            return pa.timestamp("us", tz="UTC")
+        if data_type.startswith("timestamp"):
+            return pa.timestamp("us")
+        return pa.string()
+
+    return pa.schema([(col["column_name"], arrow_type(col)) for col in columns])
+
+
+class ParquetStreamWriter(RawStreamWriter):
+    """
+    Streams rows to a single typed Parquet object in S3.
+
+    Every write_rows() call becomes one row group; encoded bytes go through
+    the same part buffer and multipart upload as RawStreamWriter.
+    """
+
+    content_type = "application/vnd.apache.parquet"
+
+    def __init__(self, s3, bucket: str, key: str, schema, part_size: int = DEFAULT_PART_SIZE):
+        super().__init__(s3, bucket, key, part_size=part_size)
+        self.schema = schema
+        self._text_columns = [
+            field.name for field in schema if pa.types.is_string(field.type)]
+        self._writer = pq.ParquetWriter(
+            PartSink(self), schema, compression="snappy")
+
+    def write_rows(self, rows: list[dict]):
+        for row in rows:
+            for name in self._text_columns:
+                value = row.get(name)
+                if value is not None and not isinstance(value, str):
+                    # json/uuid/other values land as text, like the JSON format
+                    row[name] = (json.dumps(value, default=str)
+                                 if isinstance(value, (dict, list)) else str(value))
+        self._writer.write_table(pa.Table.from_pylist(rows, schema=self.schema))
+        self.row_count += len(rows)
+
+    def close(self):
+        # the footer is written on close, before the final part goes up
+        self._writer.close()
+        return super().close()
+
+    def abort(self):
+        try:
+            self._writer.close()
+        except Exception:
+            pass
+        super().abort()
+
 
 class S3Client:
     """
     Raw ingestion layer
     """
 
-    def __init__(self, bucket: str):
+    def __init__(self, bucket: str, landing_format: str = DEFAULT_LANDING_FORMAT):
+        if landing_format not in LANDING_FORMATS:
+            raise ValueError(
+                f"Unsupported landing format '{landing_format}', expected one of {LANDING_FORMATS}")
+        if landing_format == "parquet" and pa is None:
+            raise RuntimeError("pyarrow is required for the parquet landing format")
         self.bucket = bucket
-        self.s3 = boto3.client("s3")
+        self.landing_format = landing_format
+        self.s3 = get_client("s3")
 
         logger.info(f"S3Client initialised with bucket: {bucket}")
 
@@ -41,30 +168,68 @@ class S3Client:
                 f"Failed to upload JSON to S3 (bucket={self.bucket}, key={key}, {e})")
             raise
 
+    def open_stream(
+            self,
+            table_name: str,
+            columns: list[dict] | None = None,
+            part_size: int = DEFAULT_PART_SIZE,
+            timestamp: str | None = None,
+            part: int | None = None):
+        """
+        Returns a stream writer for a new raw_<timestamp> landing file in the
+        configured landing format. The parquet format needs the table's
+        columns (DatabaseClient.get_columns) to build its schema.
+        Numbered part files (raw_<timestamp>_part00001) share the timestamp
+        of the run that started them so they sort together.
+        """
+        timestamp = timestamp or datetime.now(timezone.utc).strftime("%Y-%m-%dT%H-%M-%S")
+        suffix = f"_part{part:05d}" if part is not None else ""
+        key = f"{table_name}/raw_{timestamp}{suffix}.{self.landing_format}"
+        logger.info(
+            f"Opening {self.landing_format} stream to S3 → bucket={self.bucket}, key={key}")
+        if self.landing_format == "parquet":
+            if not columns:
+                raise ValueError(
+                    f"Columns are required to write parquet for table '{table_name}'")
+            return ParquetStreamWriter(
+                self.s3, self.bucket, key, arrow_schema(columns), part_size=part_size)
+        return RawStreamWriter(self.s3, self.bucket, key, part_size=part_size)
+
     def get_checkpoint(self, table_name: str):
         """
         Returns last_ingested datetime for a table, or None if checkpoint does not exist.
         """
+        return self.get_checkpoint_state(table_name)[0]
+
+    def get_checkpoint_state(self, table_name: str):
+        """
+        Returns (last_ingested datetime, resume_key) for a table, or
+        (None, None) if checkpoint does not exist. resume_key is
+        {"column", "value"} when the last run stopped part-way through the
+        rows sharing last_ingested, otherwise None.
+        """
         key = f"checkpoints/{table_name}_checkpoint.json"
         try:
             response = self.s3.get_object(Bucket=self.bucket, Key=key)
             body = response["Body"].read().decode("utf-8")
             data = json.loads(body)
             checkpoint = datetime.fromisoformat(data["last_ingested"])
+            resume_key = data.get("resume_key")
             logger.info(
-                f"Retrieved checkpoint for table '{table_name}': {checkpoint}")
-            return checkpoint
+                f"Retrieved checkpoint for table '{table_name}': {checkpoint} (resume_key={resume_key})")
+            return checkpoint, resume_key
         except self.s3.exceptions.NoSuchKey:
             logger.info(f"No checkpoint found for table '{table_name}'")
-            return None
+            return None, None
         except Exception as e:
             logger.exception(
                 f"Failed to retrieve checkpoint for table '{table_name}', {e}")
             raise
 
-    def write_checkpoint(self, table_name: str, timestamp: datetime):
+    def write_checkpoint(self, table_name: str, timestamp: datetime, resume_key: dict | None = None):
         """
-        Writes the last_ingested datetime for a table checkpoint.
+        Writes the last_ingested datetime for a table checkpoint, plus the
+        key of the last row written when a run stopped part-way.
         """
 
         if not isinstance(timestamp, datetime):
@@ -75,6 +240,8 @@ class S3Client:
             "table": table_name,
             "last_ingested": timestamp.astimezone(timezone.utc).isoformat(),
         }
+        if resume_key is not None:
+            data["resume_key"] = resume_key
         logger.info(
             f"Saving checkpoint for table '{table_name}': {data['last_ingested']}")
 
@@ -82,7 +249,7 @@ class S3Client:
             self.s3.put_object(
                 Bucket=self.bucket,
                 Key=key,
-                Body=json.dumps(data),
+                Body=json.dumps(data, default=str),
                 ContentType="application/json",
             )
             logger.info(
@@ -91,3 +258,155 @@ class S3Client:
             logger.exception(
                 f"Failed to write checkpoint for table '{table_name}', {e}")
             raise
+
+    def get_checkpoint_manifest(self):
+        """
+        Returns ({table: last_ingested datetime}, {table: resume_key}, etag)
+        from the checkpoint manifest, or ({}, {}, None) if the manifest does
+        not exist yet.
+        """
+        key = CHECKPOINT_MANIFEST_KEY
+        try:
+            response = self.s3.get_object(Bucket=self.bucket, Key=key)
+            data = json.loads(response["Body"].read().decode("utf-8"))
+            checkpoints = {
+                table: datetime.fromisoformat(ts)
+                for table, ts in data.get("tables", {}).items()
+            }
+            resume_keys = data.get("resume_keys", {})
+            logger.info(
+                f"Retrieved checkpoint manifest with {len(checkpoints)} tables")
+            return checkpoints, resume_keys, response["ETag"]
+        except self.s3.exceptions.NoSuchKey:
+            logger.info("No checkpoint manifest found")
+            return {}, {}, None
+        except Exception as e:
+            logger.exception(f"Failed to retrieve checkpoint manifest, {e}")
+            raise
+
+    def write_checkpoint_manifest(
+            self,
+            checkpoints: dict[str, datetime],
+            etag: str | None,
+            resume_keys: dict[str, dict] | None = None):
+        """
+        Writes the checkpoint manifest only if it is unchanged since it was
+        read (etag), or does not exist yet (etag=None).
+        Returns the new ETag, or None if another writer got there first.
+        """
+        for table, timestamp in checkpoints.items():
+            if not isinstance(timestamp, datetime):
+                raise ValueError(
+                    f"Checkpoint timestamp for '{table}' must be a datetime object")
+
+        data = {
+            "tables": {
+                table: timestamp.astimezone(timezone.utc).isoformat()
+                for table, timestamp in sorted(checkpoints.items())
+            },
+            "updated_at": datetime.now(timezone.utc).isoformat(),
+        }
+        if resume_keys:
+            data["resume_keys"] = dict(sorted(resume_keys.items()))
+        condition = {"IfMatch": etag} if etag else {"IfNoneMatch": "*"}
+        logger.info(
+            f"Saving checkpoint manifest for {len(checkpoints)} tables ({condition})")
+
+        try:
+            response = self.s3.put_object(
+                Bucket=self.bucket,
+                Key=CHECKPOINT_MANIFEST_KEY,
+                Body=json.dumps(data, default=str),
+                ContentType="application/json",
+                **condition,
+            )
+            logger.info("Wrote checkpoint manifest")
+            return response["ETag"]
+        except ClientError as e:
+            code = e.response.get("Error", {}).get("Code")
+            if code in ("PreconditionFailed", "ConditionalRequestConflict", "412"):
+                logger.warning(
+                    "Checkpoint manifest was modified concurrently; not written")
+                return None
+            logger.exception(f"Failed to write checkpoint manifest, {e}")
+            raise
+
+    def _bootstrap_key(self, table_name: str) -> str:
+        return f"checkpoints/{table_name}_bootstrap.json"
+
+    def get_bootstrap_progress(self, table_name: str) -> dict | None:
+        """
+        Returns the saved progress of an unfinished chunked full load, or None.
+        """
+        key = self._bootstrap_key(table_name)
+        try:
+            response = self.s3.get_object(Bucket=self.bucket, Key=key)
+            progress = json.loads(response["Body"].read().decode("utf-8"))
+            logger.info(
+                f"Retrieved full-load progress for table '{table_name}': {progress}")
+            return progress
+        except self.s3.exceptions.NoSuchKey:
+            return None
+        except Exception as e:
+            logger.exception(
+                f"Failed to retrieve full-load progress for table '{table_name}', {e}")
+            raise
+
+    def write_bootstrap_progress(self, table_name: str, progress: dict):
+        key = self._bootstrap_key(table_name)
+        try:
+            self.s3.put_object(
+                Bucket=self.bucket,
+                Key=key,
+                Body=json.dumps(progress, default=str),
+                ContentType="application/json",
+            )
+            logger.info(
+                f"Saved full-load progress for table '{table_name}': {progress}")
+        except Exception as e:
+            logger.exception(
+                f"Failed to write full-load progress for table '{table_name}', {e}")
+            raise
+
+    def delete_bootstrap_progress(self, table_name: str):
+        key = self._bootstrap_key(table_name)
+        try:
+            self.s3.delete_object(Bucket=self.bucket, Key=key)
+            logger.info(f"Cleared full-load progress for table '{table_name}'")
+        except Exception as e:
+            logger.exception(
+                f"Failed to clear full-load progress for table '{table_name}', {e}")
+            raise
+
+    def get_change_counters(self) -> dict[str, int]:
+        """
+        Returns the {table: change counter} values saved by the previous
+        run's change probe, or {} if none were saved yet.
+        """
+        try:
+            response = self.s3.get_object(Bucket=self.bucket, Key=CHANGE_COUNTERS_KEY)
+            data = json.loads(response["Body"].read().decode("utf-8"))
+            return data.get("tables", {})
+        except self.s3.exceptions.NoSuchKey:
+            logger.info("No saved change counters found")
+            return {}
+        except Exception as e:
+            logger.exception(f"Failed to retrieve change counters, {e}")
+            raise
+
+    def write_change_counters(self, counters: dict[str, int]):
+        data = {
+            "tables": dict(sorted(counters.items())),
+            "updated_at": datetime.now(timezone.utc).isoformat(),
+        }
+        try:
+            self.s3.put_object(
+                Bucket=self.bucket,
+                Key=CHANGE_COUNTERS_KEY,
+                Body=json.dumps(data),
+                ContentType="application/json",
+            )
+            logger.info(f"Saved change counters for {len(counters)} tables")
+        except Exception as e:
+            logger.exception(f"Failed to write change counters, {e}")
+            raise
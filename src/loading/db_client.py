@@ -1,10 +1,14 @@
-import json
 import logging
 import os
 from contextlib import AbstractContextManager
 from typing import Any, List, Optional, Sequence, Tuple, Dict
-import boto3
 import pg8000.dbapi
+from common.resources import (
+    acquire_connection,
+    close_connection,
+    get_secret,
+    release_connection,
+)
 
 logger = logging.getLogger(__name__)
 logger.setLevel(os.getenv("LOG_LEVEL", "INFO"))
@@ -51,16 +55,8 @@ class WarehouseDBClient(AbstractContextManager):
         if not secret_id:
             raise ValueError("Missing required env var: DW_SECRET_ARN")
 
-        client = boto3.client("secretsmanager")
-        resp = client.get_secret_value(SecretId=secret_id)
-
-        # Secrets Manager can store secret as SecretString or SecretBinary.
-        if "SecretString" in resp and resp["SecretString"]:
-            secret_raw = resp["SecretString"]
-        else:
-            secret_raw = resp["SecretBinary"].decode("utf-8")
-
-        cfg = json.loads(secret_raw)
+        # Cached across warm invocations (see common.resources)
+        cfg = get_secret(secret_id)
 
         # Fail fast if essential keys are missing
         required_any_user = bool(cfg.get("user") or cfg.get("username"))
@@ -73,20 +69,40 @@ class WarehouseDBClient(AbstractContextManager):
         return cfg
 
     def __enter__(self) -> "WarehouseDBClient":
-        self.conn = pg8000.dbapi.connect(
+        # Warm invocations reuse an idle connection that passes a health check
+        self.conn = acquire_connection(
+            self._pool_key(), self._connect, self._ping)
+        self.conn.autocommit = False
+        logger.info("Database connection established")
+        return self
+
+    def _pool_key(self) -> Tuple[Any, ...]:
+        return ("warehouse", self.host, self.port, self.database, self.user)
+
+    def _connect(self):
+        return pg8000.dbapi.connect(
             host=self.host,
             port=self.port,
             database=self.database,
             user=self.user,
             password=self.password,
         )
-        self.conn.autocommit = False
-        logger.info("Database connection established")
-        return self
+
+    @staticmethod
+    def _ping(conn) -> None:
+        cur = conn.cursor()
+        try:
+            cur.execute("SELECT 1")
+            cur.fetchall()
+        finally:
+            cur.close()
+        # leave no transaction open behind the health check
+        conn.rollback()
 
     def __exit__(self, exc_type, exc_value, traceback) -> None:
         if self.conn is None:
             return False
+        finished = False
         try:
             if exc_type is None:
                 self.conn.commit()
@@ -96,12 +112,15 @@ class WarehouseDBClient(AbstractContextManager):
                 logger.info(
                     "Transaction rolled back due to exception: %s",
                     exc_value)
+            finished = True
         finally:
-            try:
-                self.conn.close()
+            if finished:
+                release_connection(self._pool_key(), self.conn)
+                logger.info("Database connection released for reuse")
+            else:
+                # commit/rollback failed: the connection state is unknown
+                close_connection(self.conn)
                 logger.info("Database connection closed")
-            except Exception as e:
-                logger.exception("Error closing database connection: %s", e)
             self.conn = None
 
     def _require_connection(self) -> None:
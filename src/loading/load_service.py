@@ -18,6 +18,15 @@ from loading.schema_coercion import SchemaCoercer
 logger = logging.getLogger(__name__)
 logger.setLevel(os.getenv("LOG_LEVEL", "INFO"))
 
+# Fact keys generated by the warehouse (BIGSERIAL) when delta files leave
+# them out; full-mode files carry explicit values, which do not advance the
+# sequence
+SERIAL_KEYS = {"fact_purchase_order": "purchase_record_id"}
+
+# Dimensions the transform may write as deltas (DIM_DATE_MODE=incremental):
+# loaded like facts, every file since the checkpoint, then upserted
+DELTA_DIMS = ("dim_date",)
+
 
 class LoadService:
 
@@ -86,6 +95,11 @@ class LoadService:
 
     def _is_fact(self, table: str) -> bool:
         return table.startswith("fact_")
+
+    def _tracks_files(self, table: str) -> bool:
+        # tables whose files may be deltas (output_mode="delta"), so every
+        # file since the checkpointed key has to be loaded
+        return self._is_fact(table) or table in DELTA_DIMS
     
     def _get_pk_column(self, table: str) -> str:
         sql = """
@@ -130,15 +144,15 @@ class LoadService:
 
         latest_key = parquet_keys[-1]
 
-        # 2) Check checkpoint (for facts: skip if same parquet already loaded)
-        # 2) Checkpoint (facts only)
+        # 2) Check checkpoint (facts and DELTA_DIMS: skip if same parquet
+        # already loaded)
         ckpt: Dict[str, Any] = {}
-        if self._is_fact(table):
+        if self._tracks_files(table):
             ckpt = self._read_checkpoint(table)
 
-        if self._is_fact(table) and ckpt.get("last_loaded_key") == latest_key:
+        if self._tracks_files(table) and ckpt.get("last_loaded_key") == latest_key:
             logger.info(
-                "Skip fact table=%s (already loaded key=%s).",
+                "Skip table=%s (already loaded key=%s).",
                 table,
                 latest_key)
             return {
@@ -147,8 +161,11 @@ class LoadService:
                 "reason": "already_loaded",
                 "latest_key": latest_key}
 
-        # 3) Read latest parquet
-        df = self.s3_client.read_parquet_to_df(latest_key)
+        # 3) Read latest parquet (plus unloaded delta files where they occur)
+        if self._tracks_files(table):
+            df = self._read_unloaded_files(table, parquet_keys, ckpt)
+        else:
+            df = self.s3_client.read_parquet_to_df(latest_key)
         if df is None or df.empty:
             logger.warning(
                 "Skip table=%s (empty parquet). key=%s",
@@ -156,7 +173,7 @@ class LoadService:
                 latest_key)
             # checkpoint key so we don't reprocess the same empty file
             # repeatedly
-            if self._is_fact(table):
+            if self._tracks_files(table):
                 self._write_checkpoint(
                     table,
                     last_loaded_key=latest_key,
@@ -178,6 +195,11 @@ class LoadService:
         if self._should_truncate(table):
             inserted = self._upsert_df_dim(table, df)
             logger.info("Loaded dim snapshot (upsert) table=%s rows=%s", table, inserted)
+            if self._tracks_files(table):
+                self._write_checkpoint(
+                    table,
+                    last_loaded_key=latest_key,
+                    last_loaded_ts=ckpt.get("last_loaded_ts"))
             return {
                 "table": table,
                 "status": "loaded",
@@ -204,6 +226,14 @@ class LoadService:
                 before,
                 len(df_to_insert))
 
+        serial_key = SERIAL_KEYS.get(table)
+        if serial_key and not df_to_insert.empty and (
+                serial_key not in df_to_insert.columns
+                or df_to_insert[serial_key].isna().any()):
+            # delta rows (alone or concatenated after a full file) take
+            # their keys from the sequence
+            df_to_insert = df_to_insert.drop(columns=[serial_key], errors="ignore")
+            self._sync_serial_sequence(table, serial_key)
         inserted = self._insert_df(table, df_to_insert)
 
         # Update checkpoint:
@@ -232,8 +262,52 @@ class LoadService:
             "watermark": wm_name,
         }
 
+    def _read_unloaded_files(self,
+                             table: str,
+                             parquet_keys: List[str],
+                             ckpt: Dict[str, Any]) -> pd.DataFrame:
+        """
+        Delta files (df.attrs["output_mode"] == "delta", set by the
+        transform for facts and incremental dim_date) each hold only their
+        own changes, so every file written
+        after the checkpointed key is read, newest first, back to the most
+        recent full snapshot. Without a known checkpoint key (fresh
+        warehouse, lost checkpoint, pruned listing) the walk goes back to
+        the newest full snapshot, so no delta is skipped.
+        """
+        last_key = ckpt.get("last_loaded_key")
+        if last_key in parquet_keys:
+            unloaded = parquet_keys[parquet_keys.index(last_key) + 1:]
+        else:
+            unloaded = parquet_keys
+
+        frames: List[pd.DataFrame] = []
+        for key in reversed(unloaded):
+            frame = self.s3_client.read_parquet_to_df(key)
+            frames.append(frame)
+            if frame.attrs.get("output_mode") != "delta":
+                break
+        if len(frames) == 1:
+            return frames[0]
+
+        logger.info("Reading %s unloaded files for table=%s", len(frames), table)
+        return pd.concat(frames[::-1], ignore_index=True)
+
     # DB helpers (MVP)
 
+    def _sync_serial_sequence(self, table: str, column: str) -> None:
+        """
+        Moves the column's sequence past the largest existing value, so
+        generated keys never collide with ids loaded explicitly (e.g. by
+        full-mode files before the switch to delta).
+        """
+        sql = (
+            f"SELECT setval(pg_get_serial_sequence('\"{table}\"', '{column}'), "
+            f'COALESCE((SELECT MAX("{column}") FROM "{table}"), 0) + 1, false);'
+        )
+        logger.info("Syncing sequence of %s.%s to its max value", table, column)
+        self.db.execute(sql)
+
     def create_table_if_not_exists(self, table: str, df: pd.DataFrame) -> None:
 
         ddl = CREATE_TABLE_SQL.get(table)
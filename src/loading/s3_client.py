@@ -3,7 +3,8 @@ import os
 from io import BytesIO
 from typing import List, Optional
 import pandas as pd
-import boto3
+from common.resources import get_client
+from common.disk_cache import read_through
 
 
 logger = logging.getLogger(__name__)
@@ -13,7 +14,7 @@ logger.setLevel(os.getenv("LOG_LEVEL", "INFO"))
 class S3LoadingClient:
     def __init__(self, bucket: str):
         self.bucket_name = bucket
-        self.s3 = boto3.client("s3")
+        self.s3 = get_client("s3")
         logger.info("Initialising S3LoadingClient. bucket=%s", self.bucket_name)
 
     def list_parquet_keys(self, table_name: str) -> List[str]:
@@ -46,11 +47,10 @@ class S3LoadingClient:
 
     def read_parquet_to_df(self, key: str) -> pd.DataFrame:
         logger.info("Reading parquet from s3://%s/%s", self.bucket_name, key)
-        response = self.s3.get_object(Bucket=self.bucket_name, Key=key)
-        body_bytes = response["Body"].read()
-        buffer = BytesIO(body_bytes)
-
-        df = pd.read_parquet(buffer)
+        # served from the local disk cache when the object is unchanged
+        df = read_through(
+            self.s3, self.bucket_name, key,
+            lambda body: pd.read_parquet(BytesIO(body)))
         logger.info("Loaded parquet rows=%s cols=%s key=%s",
                     len(df), len(df.columns), key)
         return df
@@ -152,7 +152,12 @@ class SchemaCoercer:
         """
         Convert values to strings, keep None as None.
         If NOT NULL, fill missing with text_default (BI-friendly).
+        Categorical columns (dictionary-encoded Parquet from the transform
+        step) are decoded to plain values first.
         """
+        if isinstance(s.dtype, pd.CategoricalDtype):
+            s = s.astype(object).where(s.notna(), None)
+
         def to_text(v: Any) -> Any:
             if v is None:
                 return None
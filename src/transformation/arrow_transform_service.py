@@ -0,0 +1,285 @@
+import json
+import logging
+import threading
+from typing import Dict
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from transformation.transform_service import OUTPUT_MODE_ATTR, TransformService
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+ROW = "__row"
+
+
+def latest_by_key(table: pa.Table, key: str) -> pa.Table:
+    """
+    Arrow counterpart of drop_duplicates(subset=[key], keep="last"): the
+    last row of every key, in the order those rows appear in the table.
+    """
+    numbered = table.append_column(ROW, pa.array(range(table.num_rows), pa.int64()))
+    last_rows = numbered.group_by(key).aggregate([(ROW, "max")])[f"{ROW}_max"]
+    return table.take(last_rows.take(pc.sort_indices(last_rows)))
+
+
+def left_join(left: pa.Table, right: pa.Table, left_key: str, right_key: str) -> pa.Table:
+    """
+    Left outer join that keeps the left table's row order, as
+    DataFrame.join does (Arrow's hash join does not).
+    """
+    numbered = left.append_column(ROW, pa.array(range(left.num_rows), pa.int64()))
+    joined = numbered.join(right, keys=left_key, right_keys=right_key, join_type="left outer")
+    return joined.sort_by(ROW).drop_columns([ROW])
+
+
+def rename(table: pa.Table, columns: dict) -> pa.Table:
+    return table.rename_columns([columns.get(name, name) for name in table.column_names])
+
+
+class ArrowTransformService(TransformService):
+    """
+    TransformService whose builders run on pyarrow Tables with
+    pyarrow.compute. Outputs match the pandas builders, but dates and times
+    stay date32/time64 columns all the way to Parquet instead of becoming
+    Python objects row by row.
+
+    Raw tables are still read and typed by the pandas path, then converted,
+    so loading a table briefly holds both copies: peak memory is not lower
+    than the pandas engine's. Outside TRANSFORM_FACT_MODE=delta (whose
+    watermark filter runs in pandas) the service's pandas copies are dropped
+    once converted, leaving only the Arrow table for the builders.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._arrow: Dict[str, pa.Table] = {}
+        self._arrow_lock = threading.Lock()
+
+    def _get_arrow_table(self, table_name: str) -> pa.Table:
+        # the typed table converted once; builders only ever read it
+        with self._arrow_lock:
+            if table_name not in self._arrow:
+                self._arrow[table_name] = pa.Table.from_pandas(
+                    self._get_typed_table(table_name), preserve_index=False)
+                if self.fact_mode != "delta":
+                    # every builder reads the Arrow table from here on
+                    self._typed.pop(table_name, None)
+                    self._cache.pop(table_name, None)
+            return self._arrow[table_name]
+
+    def _load_source(self, table_name: str) -> float:
+        seconds = super()._load_source(table_name)
+        self._get_arrow_table(table_name)
+        return seconds
+
+    def _with_output_mode(self, table: pa.Table, output_mode: str) -> pa.Table:
+        # the key pandas.read_parquet restores into DataFrame.attrs
+        metadata = dict(table.schema.metadata or {})
+        metadata[b"PANDAS_ATTRS"] = json.dumps({OUTPUT_MODE_ATTR: output_mode})
+        return table.replace_schema_metadata(metadata)
+
+    def _latest(self, table_name: str) -> pa.Table:
+        return latest_by_key(self._get_arrow_table(table_name), f"{table_name}_id")
+
+    # Dimensions
+    def make_dim_currency(self) -> pa.Table:
+        logger.info("Creating dim_currency (arrow)")
+        return self._latest("currency").select(["currency_id", "currency_code"])
+
+    def make_dim_staff(self) -> pa.Table:
+        logger.info("Creating dim_staff (arrow)")
+        department = self._latest("department").select(["department_id", "department_name"])
+        dim = left_join(self._latest("staff"), department, "department_id", "department_id")
+        return dim.select([
+            "staff_id",
+            "first_name",
+            "last_name",
+            "department_name",
+            "location",
+            "email_address",
+        ])
+
+    def make_dim_location(self) -> pa.Table:
+        logger.info("Creating dim_location (arrow)")
+        dim = rename(self._latest("address"), {"address_id": "location_id"})
+        return dim.select([
+            "location_id",
+            "address_line_1",
+            "address_line_2",
+            "district",
+            "city",
+            "postal_code",
+            "country",
+            "phone",
+        ])
+
+    def make_dim_counterparty(self) -> pa.Table:
+        logger.info("Creating dim_counterparty (arrow)")
+        address = rename(self._latest("address").select([
+            "address_id",
+            "address_line_1",
+            "address_line_2",
+            "district",
+            "city",
+            "postal_code",
+            "country",
+            "phone",
+        ]), {
+            "address_line_1": "counterparty_legal_address_line_1",
+            "address_line_2": "counterparty_legal_address_line_2",
+            "district": "counterparty_legal_district",
+            "city": "counterparty_legal_city",
+            "postal_code": "counterparty_legal_postal_code",
+            "country": "counterparty_legal_country",
+            "phone": "counterparty_legal_phone_number",
+        })
+        dim = left_join(self._latest("counterparty"), address, "legal_address_id", "address_id")
+        return dim.select([
+            "counterparty_id",
+            "counterparty_legal_name",
+            "counterparty_legal_address_line_1",
+            "counterparty_legal_address_line_2",
+            "counterparty_legal_district",
+            "counterparty_legal_city",
+            "counterparty_legal_postal_code",
+            "counterparty_legal_country",
+            "counterparty_legal_phone_number",
+        ])
+
+    def make_dim_design(self) -> pa.Table:
+        logger.info("Creating dim_design (arrow)")
+        return self._latest("design").select(
+            ["design_id", "design_name", "file_location", "file_name"])
+
+    def make_dim_payment_type(self) -> pa.Table:
+        logger.info("Creating dim_payment_type (arrow)")
+        return self._latest("payment_type").select(["payment_type_id", "payment_type_name"])
+
+    def make_dim_transaction(self) -> pa.Table:
+        logger.info("Creating dim_transaction (arrow)")
+        return self._latest("transaction").select([
+            "transaction_id",
+            "transaction_type",
+            "sales_order_id",
+            "purchase_order_id",
+        ])
+
+    def _source_dates(self) -> pd.Series:
+        columns = {
+            "payment": ("created_at", "last_updated", "payment_date"),
+            "sales_order": ("created_at", "last_updated", "agreed_delivery_date", "agreed_payment_date"),
+            "purchase_order": ("created_at", "last_updated", "agreed_delivery_date", "agreed_payment_date"),
+        }
+        logger.info("Collating dates from payment, sales_order and purchase_order (arrow)")
+        # timestamps are UTC underneath, so the cast gives the UTC date
+        dates = pa.chunked_array([
+            chunk
+            for table_name, names in columns.items()
+            for name in names
+            for chunk in pc.cast(self._get_arrow_table(table_name)[name], pa.date32()).chunks
+        ], type=pa.date32())
+        unique = pc.unique(dates.drop_null())
+        unique = unique.take(pc.sort_indices(unique))
+        # only the distinct dates go back to pandas for the shared
+        # range/incremental handling of TransformService._dim_dates
+        return pd.Series(pd.to_datetime(unique.to_numpy(zero_copy_only=False)))
+
+    @classmethod
+    def _calendar(cls, dt: pd.Series) -> pa.Table:
+        dates = pc.cast(pa.array(dt, type=pa.timestamp("ns")), pa.date32())
+        stamps = pc.cast(dates, pa.timestamp("s"))
+        year = pc.year(dates)
+        month = pc.month(dates)
+        day = pc.day(dates)
+        date_id = pc.add(pc.add(pc.multiply(year, 10000), pc.multiply(month, 100)), day)
+        return pa.table({
+            "date_id": pc.cast(date_id, pa.int64()),
+            "date": dates,
+            "year": pc.cast(year, pa.int32()),
+            "month": pc.cast(month, pa.int32()),
+            "day": pc.cast(day, pa.int32()),
+            "day_of_week": pc.cast(pc.day_of_week(dates), pa.int32()),
+            "day_name": pc.strftime(stamps, format="%A"),
+            "month_name": pc.strftime(stamps, format="%B"),
+            "quarter": pc.cast(pc.quarter(dates), pa.int32()),
+        })
+
+    # Fact Tables
+    def _arrow_fact_source(self, output_name: str, table_name: str) -> pa.Table:
+        if self.fact_mode != "delta":
+            return self._get_arrow_table(table_name)
+        return pa.Table.from_pandas(
+            self._fact_source(output_name, table_name), preserve_index=False)
+
+    @staticmethod
+    def _date(table: pa.Table, name: str) -> pa.ChunkedArray:
+        return pc.cast(table[name], pa.date32())
+
+    @staticmethod
+    def _time(table: pa.Table, name: str) -> pa.ChunkedArray:
+        # Python time objects (the pandas builders) hold microseconds
+        return pc.cast(table[name], pa.time64("us"), safe=False)
+
+    def make_fact_sales_order(self) -> pa.Table:
+        logger.info("Creating fact_sales_order (arrow)")
+        so = self._arrow_fact_source("fact_sales_order", "sales_order")
+        fact = pa.table({
+            "sales_order_id": so["sales_order_id"],
+            "created_date": self._date(so, "created_at"),
+            "created_time": self._time(so, "created_at"),
+            "last_updated_date": self._date(so, "last_updated"),
+            "last_updated_time": self._time(so, "last_updated"),
+            "sales_staff_id": so["staff_id"],
+            "sales_counterparty_id": so["counterparty_id"],
+            "units_sold": so["units_sold"],
+            "unit_price": so["unit_price"],
+            "currency_id": so["currency_id"],
+            "design_id": so["design_id"],
+            "agreed_payment_date": self._date(so, "agreed_payment_date"),
+            "agreed_delivery_date": self._date(so, "agreed_delivery_date"),
+            "agreed_delivery_location_id": so["agreed_delivery_location_id"],
+        })
+        logger.info(f"Transformation successful: fact_sales_order rows={fact.num_rows}")
+        return fact
+
+    def make_fact_payment(self) -> pa.Table:
+        logger.info("Creating fact_payment (arrow)")
+        payment = self._arrow_fact_source("fact_payment", "payment")
+        return pa.table({
+            "payment_id": payment["payment_id"],
+            "transaction_id": payment["transaction_id"],
+            "counterparty_id": payment["counterparty_id"],
+            "payment_amount": payment["payment_amount"],
+            "currency_id": payment["currency_id"],
+            "payment_type_id": payment["payment_type_id"],
+            "payment_date": self._date(payment, "payment_date"),
+            "paid": payment["paid"],
+        })
+
+    def make_fact_purchase_order(self) -> pa.Table:
+        logger.info("Creating fact_purchase_order (arrow)")
+        po = self._arrow_fact_source("fact_purchase_order", "purchase_order")
+        fact = pa.table({
+            "purchase_order_id": po["purchase_order_id"],
+            "created_date": self._date(po, "created_at"),
+            "created_time": self._time(po, "created_at"),
+            "last_updated_date": self._date(po, "last_updated"),
+            "last_updated_time": self._time(po, "last_updated"),
+            "staff_id": po["staff_id"],
+            "counterparty_id": po["counterparty_id"],
+            "item_code": po["item_code"],
+            "item_quantity": po["item_quantity"],
+            "item_unit_price": po["item_unit_price"],
+            "currency_id": po["currency_id"],
+            "agreed_delivery_date": self._date(po, "agreed_delivery_date"),
+            "agreed_payment_date": self._date(po, "agreed_payment_date"),
+            "agreed_delivery_location_id": po["agreed_delivery_location_id"],
+        })
+        if self.fact_mode == "delta":
+            # see TransformService.make_fact_purchase_order
+            return fact
+        return fact.add_column(
+            0, "purchase_record_id", pa.array(range(1, fact.num_rows + 1), pa.int64()))
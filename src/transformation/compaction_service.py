@@ -0,0 +1,115 @@
+import logging
+import os
+
+import pandas as pd
+
+from transformation.s3_client import (
+    ARCHIVE_PREFIX, HISTORY_TABLES, RAW_SUFFIXES, S3TransformationClient)
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+# Move raw files folded into a snapshot under _archive/ instead of leaving them
+ARCHIVE_MERGED_FILES = os.getenv(
+    "COMPACTION_ARCHIVE", "false").lower() in ("1", "true", "yes")
+
+
+class CompactionService:
+    """
+    Folds the raw deltas of each landing table into one Parquet snapshot
+    holding the latest version of every primary key. HISTORY_TABLES (fact
+    sources) keep every version in raw key order instead, so full-mode facts
+    and their purchase_record_id numbering are the same with or without
+    compaction.
+    """
+
+    def __init__(self, landing_bucket: str, archive: bool = ARCHIVE_MERGED_FILES):
+        self.landing_s3 = S3TransformationClient(landing_bucket)
+        self.archive = archive
+        logger.info(
+            f"CompactionService initialised. landing={landing_bucket}, archive={archive}")
+
+    @staticmethod
+    def primary_key(table_name: str, df: pd.DataFrame) -> str:
+        # Totesys tables are keyed by <table>_id
+        key = f"{table_name}_id"
+        if key not in df.columns:
+            raise ValueError(f"No primary key column '{key}' in table '{table_name}'")
+        return key
+
+    def _history_keys(self, table_name: str) -> tuple[list[str], str | None]:
+        """
+        Every raw object of the table, archived or not, in raw key order,
+        and the last raw key among them.
+        """
+        archived = {key[len(ARCHIVE_PREFIX) + 1:]: key
+                    for key in self.landing_s3.list_keys(f"{ARCHIVE_PREFIX}/{table_name}/")}
+        current = {key: key for key in self.landing_s3.list_keys(f"{table_name}/")}
+        originals = sorted(key for key in {**archived, **current} if key.endswith(RAW_SUFFIXES))
+        return [current.get(key, archived.get(key)) for key in originals], (
+            originals[-1] if originals else None)
+
+    def compact_table(self, table_name: str) -> dict:
+        pointer = self.landing_s3.get_compacted_pointer(table_name)
+        all_versions = table_name in HISTORY_TABLES
+        if all_versions and pointer is not None and not pointer.get("all_versions"):
+            # written when every table was deduplicated: rebuilt from all raw
+            # files, archived ones included, so the history comes back
+            logger.warning(f"Rebuilding latest-version snapshot of history table '{table_name}'")
+            keys, last_key = self._history_keys(table_name)
+            base = None
+        else:
+            start_after = pointer["last_key"] if pointer is not None else None
+            keys = [key for key in self.landing_s3.list_keys(f"{table_name}/", start_after=start_after)
+                    if key.endswith(RAW_SUFFIXES)]
+            last_key = keys[-1] if keys else None
+            base = (self.landing_s3.read_parquet(pointer["snapshot_key"])
+                    if pointer is not None and keys else None)
+        if not keys:
+            logger.info(f"Compaction: '{table_name}' is up to date")
+            return {"table": table_name, "status": "up_to_date"}
+
+        delta = self.landing_s3.read_keys(keys)
+        frames = [frame for frame in (base, delta) if frame is not None]
+        if not frames:
+            logger.info(f"Compaction: no rows in the new files of '{table_name}'")
+            return {"table": table_name, "status": "up_to_date"}
+        merged = frames[0] if len(frames) == 1 else pd.concat(frames, ignore_index=True)
+
+        key_column = self.primary_key(table_name, merged)
+        if all_versions:
+            compacted = merged.reset_index(drop=True)
+        else:
+            compacted = merged.drop_duplicates(
+                subset=[key_column], keep="last").reset_index(drop=True)
+        new_pointer = self.landing_s3.write_compacted(
+            table_name, compacted, last_key=last_key, primary_key=key_column,
+            previous=pointer, all_versions=all_versions)
+
+        if self.archive:
+            self.landing_s3.archive_keys(
+                [key for key in keys if not key.startswith(f"{ARCHIVE_PREFIX}/")])
+
+        logger.info(
+            f"Compacted '{table_name}': {len(keys)} raw files, "
+            f"{len(merged)} rows → {len(compacted)} "
+            f"{'versions' if all_versions else 'latest versions'}")
+        return {
+            "table": table_name,
+            "status": "success",
+            "files_merged": len(keys),
+            "rows": len(compacted),
+            "snapshot_key": new_pointer["snapshot_key"],
+        }
+
+    def run(self, tables: list[str] | None = None) -> dict:
+        tables = tables or self.landing_s3.list_table_prefixes()
+        logger.info(f"Starting compaction for {len(tables)} tables")
+        results = {}
+        for table in tables:
+            try:
+                results[table] = self.compact_table(table)
+            except Exception as e:
+                logger.exception(f"Compaction FAILED for table '{table}'")
+                results[table] = {"table": table, "status": "error", "error": str(e)}
+        return results
@@ -0,0 +1,405 @@
+import itertools
+import json
+import logging
+import os
+import threading
+import time
+from datetime import timezone
+
+import boto3
+import pandas as pd
+import pyarrow as pa
+
+from transformation.s3_client import RAW_SUFFIXES
+from transformation.transform_service import (
+    OUTPUT_MODE_ATTR, TRANSFORM_GRAPH, TransformService)
+
+try:
+    import duckdb
+except ModuleNotFoundError:
+    duckdb = None
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+# In-process engine settings. DuckDB spills to DUCKDB_TEMP_DIR once it
+# reaches DUCKDB_MEMORY_LIMIT, so inputs may be larger than the Lambda's
+# memory; scans and joins run on DUCKDB_THREADS threads.
+DUCKDB_MEMORY_LIMIT = os.getenv("DUCKDB_MEMORY_LIMIT") or None
+DUCKDB_TEMP_DIR = os.getenv("DUCKDB_TEMP_DIR", "/tmp/duckdb")
+DUCKDB_THREADS = int(os.getenv("DUCKDB_THREADS", str(os.cpu_count() or 1)))
+# Where the httpfs extension is found (e.g. bundled in a Lambda layer)
+DUCKDB_EXTENSION_DIR = os.getenv("DUCKDB_EXTENSION_DIR") or None
+
+# Raw tables are exposed as two views per table:
+#   raw_<table>    every row of every landing file, with __file_order giving
+#                  the file's position (compacted snapshot first, then raw
+#                  keys in key order)
+#   latest_<table> the latest version of each <table>_id: the row from the
+#                  newest file, then with the newest last_updated
+# and every output is one query over them.
+OUTPUT_SQL = {
+    "dim_currency": """
+        SELECT currency_id, currency_code
+        FROM latest_currency
+        ORDER BY currency_id
+    """,
+    "dim_staff": """
+        SELECT s.staff_id, s.first_name, s.last_name, d.department_name,
+               s.location, s.email_address
+        FROM latest_staff s
+        LEFT JOIN latest_department d ON s.department_id = d.department_id
+        ORDER BY s.staff_id
+    """,
+    "dim_location": """
+        SELECT address_id AS location_id, address_line_1, address_line_2,
+               district, city, postal_code, country, phone
+        FROM latest_address
+        ORDER BY location_id
+    """,
+    "dim_counterparty": """
+        SELECT c.counterparty_id,
+               c.counterparty_legal_name,
+               a.address_line_1 AS counterparty_legal_address_line_1,
+               a.address_line_2 AS counterparty_legal_address_line_2,
+               a.district AS counterparty_legal_district,
+               a.city AS counterparty_legal_city,
+               a.postal_code AS counterparty_legal_postal_code,
+               a.country AS counterparty_legal_country,
+               a.phone AS counterparty_legal_phone_number
+        FROM latest_counterparty c
+        LEFT JOIN latest_address a ON c.legal_address_id = a.address_id
+        ORDER BY c.counterparty_id
+    """,
+    "dim_design": """
+        SELECT design_id, design_name, file_location, file_name
+        FROM latest_design
+        ORDER BY design_id
+    """,
+    "dim_payment_type": """
+        SELECT payment_type_id, payment_type_name
+        FROM latest_payment_type
+        ORDER BY payment_type_id
+    """,
+    "dim_transaction": """
+        SELECT transaction_id, transaction_type, sales_order_id, purchase_order_id
+        FROM latest_transaction
+        ORDER BY transaction_id
+    """,
+    # dim_date_dates is registered per run from TransformService._dim_dates
+    "dim_date": """
+        SELECT CAST(year(d) * 10000 + month(d) * 100 + day(d) AS BIGINT) AS date_id,
+               d AS date,
+               CAST(year(d) AS INTEGER) AS year,
+               CAST(month(d) AS INTEGER) AS month,
+               CAST(day(d) AS INTEGER) AS day,
+               CAST(isodow(d) - 1 AS INTEGER) AS day_of_week,
+               dayname(d) AS day_name,
+               monthname(d) AS month_name,
+               CAST(quarter(d) AS INTEGER) AS quarter
+        FROM dim_date_dates
+        ORDER BY d
+    """,
+    # {delta} is "" or the watermark filter of TRANSFORM_FACT_MODE=delta
+    "fact_sales_order": """
+        SELECT sales_order_id,
+               CAST(CAST(created_at AS TIMESTAMPTZ) AS DATE) AS created_date,
+               CAST(CAST(CAST(created_at AS TIMESTAMPTZ) AS TIMESTAMP) AS TIME) AS created_time,
+               CAST(CAST(last_updated AS TIMESTAMPTZ) AS DATE) AS last_updated_date,
+               CAST(CAST(CAST(last_updated AS TIMESTAMPTZ) AS TIMESTAMP) AS TIME) AS last_updated_time,
+               staff_id AS sales_staff_id,
+               counterparty_id AS sales_counterparty_id,
+               units_sold, unit_price, currency_id, design_id,
+               CAST(agreed_payment_date AS DATE) AS agreed_payment_date,
+               CAST(agreed_delivery_date AS DATE) AS agreed_delivery_date,
+               agreed_delivery_location_id
+        FROM raw_sales_order
+        {delta}
+        ORDER BY __file_order, last_updated
+    """,
+    "fact_purchase_order": """
+        SELECT {record_id}
+               purchase_order_id,
+               CAST(CAST(created_at AS TIMESTAMPTZ) AS DATE) AS created_date,
+               CAST(CAST(CAST(created_at AS TIMESTAMPTZ) AS TIMESTAMP) AS TIME) AS created_time,
+               CAST(CAST(last_updated AS TIMESTAMPTZ) AS DATE) AS last_updated_date,
+               CAST(CAST(CAST(last_updated AS TIMESTAMPTZ) AS TIMESTAMP) AS TIME) AS last_updated_time,
+               staff_id, counterparty_id, item_code, item_quantity,
+               item_unit_price, currency_id,
+               CAST(agreed_delivery_date AS DATE) AS agreed_delivery_date,
+               CAST(agreed_payment_date AS DATE) AS agreed_payment_date,
+               agreed_delivery_location_id
+        FROM raw_purchase_order
+        {delta}
+        ORDER BY __file_order, last_updated
+    """,
+    "fact_payment": """
+        SELECT payment_id, transaction_id, counterparty_id, payment_amount,
+               currency_id, payment_type_id,
+               CAST(payment_date AS DATE) AS payment_date,
+               paid
+        FROM raw_payment
+        {delta}
+        ORDER BY __file_order, last_updated
+    """,
+}
+
+FACT_SOURCES = {
+    "fact_sales_order": "sales_order",
+    "fact_purchase_order": "purchase_order",
+    "fact_payment": "payment",
+}
+
+DIM_DATE_SOURCE_COLUMNS = {
+    "payment": ("created_at", "last_updated", "payment_date"),
+    "sales_order": ("created_at", "last_updated", "agreed_delivery_date", "agreed_payment_date"),
+    "purchase_order": ("created_at", "last_updated", "agreed_delivery_date", "agreed_payment_date"),
+}
+
+
+def _sql_string(value: str) -> str:
+    return "'" + value.replace("'", "''") + "'"
+
+
+def _sql_list(values: list) -> str:
+    return "[" + ", ".join(_sql_string(v) for v in values) + "]"
+
+
+class DuckDBTransformService(TransformService):
+    """
+    TransformService backend that runs every output as a SQL query in an
+    in-process DuckDB database. Raw landing files are scanned in place by
+    DuckDB (read_parquet / read_json over s3://), in parallel and without
+    going through pandas, and results are streamed to Parquet batch by
+    batch. Requires the optional duckdb package.
+    """
+
+    def __init__(self, *args, database: str = ":memory:", **kwargs):
+        if duckdb is None:
+            raise RuntimeError("duckdb is required for TRANSFORM_ENGINE=duckdb")
+        super().__init__(*args, **kwargs)
+        self._con = duckdb.connect(database)
+        self._con.execute("SET TimeZone = 'UTC'")
+        self._con.execute(f"SET threads = {max(1, DUCKDB_THREADS)}")
+        self._con.execute(f"SET temp_directory = {_sql_string(DUCKDB_TEMP_DIR)}")
+        if DUCKDB_MEMORY_LIMIT:
+            self._con.execute(f"SET memory_limit = {_sql_string(DUCKDB_MEMORY_LIMIT)}")
+        self._s3_configured = False
+        self._views = set()
+        self._lock = threading.Lock()
+
+    def _configure_s3(self):
+        # caller holds the lock
+        if self._s3_configured:
+            return
+        # Lambda's home directory is read-only
+        self._con.execute("SET home_directory = '/tmp'")
+        if DUCKDB_EXTENSION_DIR:
+            self._con.execute(f"SET extension_directory = {_sql_string(DUCKDB_EXTENSION_DIR)}")
+        self._con.execute("LOAD httpfs")
+        session = boto3.session.Session()
+        settings = {"s3_region": session.region_name or os.getenv("AWS_REGION", "eu-west-2")}
+        credentials = session.get_credentials()
+        if credentials is None:
+            # e.g. a public bucket; DuckDB then sends unsigned requests
+            logger.warning("No AWS credentials resolved; DuckDB S3 reads are unsigned")
+        else:
+            credentials = credentials.get_frozen_credentials()
+            settings.update({
+                "s3_access_key_id": credentials.access_key,
+                "s3_secret_access_key": credentials.secret_key,
+                "s3_session_token": credentials.token or "",
+            })
+        for name, value in settings.items():
+            self._con.execute(f"SET {name} = {_sql_string(value)}")
+        self._s3_configured = True
+
+    def raw_files(self, table_name: str) -> list[str]:
+        """
+        URLs of the table's landing files in read order: the compacted
+        snapshot (if any), then the raw files listed after it.
+        """
+        pointer = self.ingest_s3.get_compacted_pointer(table_name)
+        start_after = pointer["last_key"] if pointer is not None else None
+        keys = [key for key in self.ingest_s3.list_keys(f"{table_name}/", start_after=start_after)
+                if key.endswith(RAW_SUFFIXES)]
+        if pointer is not None:
+            keys.insert(0, pointer["snapshot_key"])
+        if not keys:
+            raise FileNotFoundError(f"No raw data for table '{table_name}'")
+        return [f"s3://{self.ingest_bucket}/{key}" for key in keys]
+
+    def _register_table(self, table_name: str):
+        files = self.raw_files(table_name)
+        scans = []
+        readers = (
+            (".parquet", "read_parquet({files}, filename = true, union_by_name = true)"),
+            (".json", "read_json({files}, format = 'array', filename = true, union_by_name = true)"),
+            (".jsonl", "read_json({files}, format = 'newline_delimited', filename = true, union_by_name = true)"),
+        )
+        for suffix, reader in readers:
+            matching = [f for f in files if f.endswith(suffix)]
+            if matching:
+                scans.append(f"SELECT * FROM {reader.format(files=_sql_list(matching))}")
+        with self._lock:
+            if any(f.startswith("s3://") for f in files):
+                self._configure_s3()
+            self._con.execute(f"""
+                CREATE OR REPLACE VIEW raw_{table_name} AS
+                SELECT * EXCLUDE (filename),
+                       list_position({_sql_list(files)}, filename) AS __file_order
+                FROM ({" UNION ALL BY NAME ".join(scans)})
+            """)
+            columns = {row[0] for row in self._con.execute(f"DESCRIBE raw_{table_name}").fetchall()}
+            # not every raw table carries last_updated; file order alone then
+            order = "__file_order DESC" + (", last_updated DESC" if "last_updated" in columns else "")
+            self._con.execute(f"""
+                CREATE OR REPLACE VIEW latest_{table_name} AS
+                SELECT * EXCLUDE (__file_order)
+                FROM raw_{table_name}
+                QUALIFY row_number() OVER (
+                    PARTITION BY {table_name}_id
+                    ORDER BY {order}) = 1
+            """)
+            self._views.add(table_name)
+        logger.info(f"Registered DuckDB views for '{table_name}' over {len(files)} files")
+
+    def _load_source(self, table_name: str) -> float:
+        # defines the views; DuckDB reads the files when an output runs
+        started = time.perf_counter()
+        self._register_table(table_name)
+        return time.perf_counter() - started
+
+    def _query(self, sql: str, params: list | None = None) -> pa.RecordBatchReader:
+        # a cursor per call: DuckDB connections are not shared across threads
+        cursor = self._con.cursor()
+        return cursor.execute(sql, params or []).to_arrow_reader()
+
+    def _ensure_views(self, *tables: str):
+        for table in tables:
+            if table not in self._views:
+                self._register_table(table)
+
+    # Outputs
+    def _dim_output(self, output_name: str) -> pa.RecordBatchReader:
+        self._ensure_views(*TRANSFORM_GRAPH[output_name]["sources"])
+        return self._query(OUTPUT_SQL[output_name])
+
+    def make_dim_currency(self):
+        return self._dim_output("dim_currency")
+
+    def make_dim_staff(self):
+        return self._dim_output("dim_staff")
+
+    def make_dim_location(self):
+        return self._dim_output("dim_location")
+
+    def make_dim_counterparty(self):
+        return self._dim_output("dim_counterparty")
+
+    def make_dim_design(self):
+        return self._dim_output("dim_design")
+
+    def make_dim_payment_type(self):
+        return self._dim_output("dim_payment_type")
+
+    def make_dim_transaction(self):
+        return self._dim_output("dim_transaction")
+
+    def _source_dates(self) -> pd.Series:
+        self._ensure_views(*DIM_DATE_SOURCE_COLUMNS)
+        selects = " UNION ALL ".join(
+            f"SELECT CAST(CAST({column} AS TIMESTAMPTZ) AS DATE) AS d FROM raw_{table}"
+            for table, columns in DIM_DATE_SOURCE_COLUMNS.items()
+            for column in columns)
+        dates = self._query(
+            f"SELECT DISTINCT d FROM ({selects}) WHERE d IS NOT NULL ORDER BY d").read_all()
+        return pd.Series(pd.to_datetime(dates["d"].to_numpy(zero_copy_only=False)))
+
+    def make_dim_date(self):
+        logger.info("Creating dim_date (duckdb)")
+        dates = pa.table({"d": pa.array(self._dim_dates().dt.date, type=pa.date32())})
+        cursor = self._con.cursor()
+        cursor.register("dim_date_dates", dates)
+        return cursor.execute(OUTPUT_SQL["dim_date"]).to_arrow_reader()
+
+    def _fact_output(self, output_name: str) -> pa.RecordBatchReader:
+        table_name = FACT_SOURCES[output_name]
+        self._ensure_views(table_name)
+        delta, params = "", []
+        if self.fact_mode == "delta":
+            watermark = (self.processed_s3.get_state(output_name) or {}).get("last_updated")
+            if watermark is not None:
+                self._output_modes[output_name] = "delta"
+                delta = "WHERE CAST(last_updated AS TIMESTAMPTZ) > CAST(? AS TIMESTAMPTZ)"
+                params = [watermark]
+            newest = self._con.cursor().execute(
+                f"SELECT max(CAST(last_updated AS TIMESTAMPTZ)) FROM raw_{table_name} {delta}",
+                params).fetchone()[0]
+            if newest is not None:
+                self._pending_state[output_name] = {
+                    "last_updated": newest.astimezone(timezone.utc).replace(tzinfo=None).isoformat()}
+        # full snapshots number purchase records like the pandas builder;
+        # delta rows leave purchase_record_id to the warehouse's BIGSERIAL
+        record_id = ("" if self.fact_mode == "delta" else
+                     "row_number() OVER (ORDER BY __file_order, last_updated) AS purchase_record_id,")
+        sql = OUTPUT_SQL[output_name].format(delta=delta, record_id=record_id)
+        return self._query(sql, params)
+
+    def make_fact_sales_order(self):
+        return self._fact_output("fact_sales_order")
+
+    def make_fact_purchase_order(self):
+        return self._fact_output("fact_purchase_order")
+
+    def make_fact_payment(self):
+        return self._fact_output("fact_payment")
+
+    def _build_output(self, output_name: str) -> dict:
+        """
+        Streams the output's result batches straight into write_parquet;
+        nothing is written when the query returns no rows.
+        """
+        builder = TRANSFORM_GRAPH[output_name]["builder"]
+        started = time.perf_counter()
+        reader = getattr(self, builder)()
+        batches = (batch for batch in reader if batch.num_rows)
+        first = next(batches, None)
+        built = time.perf_counter()
+        output_mode = self._output_modes.get(output_name, "full")
+
+        rows = 0
+        s3_key = None
+        if first is None:
+            logger.info(f"'{output_name}' has no rows; nothing written")
+            self._pending_state.pop(output_name, None)
+        else:
+            counts = []
+
+            def counted():
+                for batch in itertools.chain([first], batches):
+                    counts.append(batch.num_rows)
+                    yield batch
+
+            schema = reader.schema.with_metadata(
+                {b"PANDAS_ATTRS": json.dumps({OUTPUT_MODE_ATTR: output_mode})})
+            logger.info(f"Streaming '{output_name}' from DuckDB ({output_mode})")
+            s3_key = self.processed_s3.write_parquet(
+                output_name, pa.RecordBatchReader.from_batches(schema, counted()))
+            self._commit_state(output_name)
+            rows = sum(counts)
+        written = time.perf_counter()
+
+        logger.info(
+            f"'{output_name}' first rows after {built - started:.3f}s, "
+            f"{rows} rows written in {written - built:.3f}s")
+        return {
+            "method": builder,
+            "output": output_name,
+            "status": "success",
+            "output_mode": output_mode,
+            "rows": rows,
+            "s3_key": s3_key,
+            "build_seconds": round(built - started, 3),
+            "write_seconds": round(written - built, 3),
+        }
@@ -1,12 +1,45 @@
 import os
 import json
 import logging
-from transformation.transform_service import TransformService
+from transformation.transform_service import TransformService, TRANSFORM_ENGINE
+from transformation.arrow_transform_service import ArrowTransformService
+from transformation.duckdb_transform_service import DuckDBTransformService
+from transformation.compaction_service import CompactionService
+from transformation.s3_client import COMPACTED_PREFIX, ARCHIVE_PREFIX
 import urllib.parse
 
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
+# Landing keys written by the pipeline itself rather than by table ingestion
+SKIP_PREFIXES = {
+    "checkpoint": ("checkpoint/", "checkpoints/"),
+    "compaction": (f"{COMPACTED_PREFIX}/", f"{ARCHIVE_PREFIX}/"),
+}
+
+
+def _is_sqs_event(event) -> bool:
+    records = event.get("Records") or []
+    return bool(records) and records[0].get("eventSource") == "aws:sqs"
+
+
+def _object_keys(records) -> list:
+    """
+    Object keys of every record, whether S3 notifications invoked the
+    function directly or were batched through SQS (one notification per
+    message body; s3:TestEvent bodies carry no Records).
+    """
+    keys = []
+    for record in records:
+        if record.get("eventSource") == "aws:sqs":
+            body = json.loads(record.get("body") or "{}")
+            keys.extend(_object_keys(body.get("Records") or []))
+            continue
+        raw_key = record.get("s3", {}).get("object", {}).get("key")
+        if raw_key:
+            keys.append(urllib.parse.unquote_plus(raw_key))
+    return keys
+
 
 def lambda_handler(event, context):
     logger.info(f"Transformation Lambda triggered with event={event}")
@@ -20,32 +53,51 @@ def lambda_handler(event, context):
             raise ValueError(
                 "Missing LANDING_BUCKET or PROCESSED_BUCKET env vars")
 
+        # Scheduled compaction of the raw zone: {"mode": "compact"}
+        if event.get("mode") == "compact":
+            result = CompactionService(landing_bucket).run(event.get("tables"))
+            logger.info(f"Compaction result: {result}")
+            return {"statusCode": 200, "body": json.dumps(result)}
+
         # Extract S3 event info
         records = event.get("Records")
         if not records:
             raise ValueError("No Records found in event")
 
-        raw_key = records[0].get("s3", {}).get("object", {}).get("key")
-
-        if not raw_key:
+        keys = _object_keys(records)
+        if not keys and not _is_sqs_event(event):
             raise ValueError("No S3 object key found in event")
 
-        source_key = urllib.parse.unquote_plus(raw_key)
-
-        if source_key.startswith("checkpoint/"):
-            logger.info(f"Skipping checkpoint file{source_key}")
-            return {"statusCode": 200, "body": json.dumps(
-                {"status": "skipped", "reason": "checkpoint", "key": source_key}), }
-
-        table_name = source_key.split("/")[0]
-        logger.info(f"Detected table '{table_name}' from S3 key '{raw_key}'")
-
-        service = TransformService(
+        tables, skipped = [], []
+        for source_key in keys:
+            reason = next((reason for reason, prefixes in SKIP_PREFIXES.items()
+                           if source_key.startswith(prefixes)), None)
+            if reason:
+                logger.info(f"Skipping {reason} file {source_key}")
+                skipped.append((source_key, reason))
+                continue
+            table_name = source_key.split("/")[0]
+            logger.info(f"Detected table '{table_name}' from S3 key '{source_key}'")
+            tables.append(table_name)
+
+        if not tables:
+            return {"statusCode": 200, "body": json.dumps({
+                "status": "skipped",
+                "reason": skipped[0][1] if skipped else "no_objects",
+                "keys": [key for key, _ in skipped]}), }
+
+        # one service for the whole batch: each source table is read once
+        # and each affected output is rebuilt once
+        service_class = {
+            "arrow": ArrowTransformService,
+            "duckdb": DuckDBTransformService,
+        }.get(TRANSFORM_ENGINE, TransformService)
+        service = service_class(
             ingest_bucket=landing_bucket,
             processed_bucket=processed_bucket
         )
 
-        result = service.run_single_table(table_name)
+        result = service.run_tables(list(dict.fromkeys(tables)))
 
         logger.info(f"Transformation result: {result}")
 
@@ -55,6 +107,9 @@ def lambda_handler(event, context):
 
     except Exception as e:
         logger.exception("Transformation Lambda failed")
+        if _is_sqs_event(event):
+            # fail the batch so SQS redelivers it (and dead-letters it)
+            raise
 
         return {
             "statusCode": 500,
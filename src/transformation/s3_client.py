@@ -1,6 +1,14 @@
+import hashlib
 import json
-import boto3
+import os
+from concurrent.futures import ThreadPoolExecutor
+from common.resources import get_client
+from common.disk_cache import read_through
+from common.s3_stream import MIN_PART_SIZE, PartSink, S3StreamWriter
 import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+import pyarrow.parquet as pq
 from uuid import uuid4
 from io import BytesIO
 from datetime import datetime, timezone
@@ -9,48 +17,458 @@ import logging
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
+# Compacted raw-table state kept in the processed bucket. Stored as Arrow
+# IPC (.arrow) so it never fires the loading Lambda's .parquet trigger.
+RAW_STATE_PREFIX = "_raw_state"
+RAW_SUFFIXES = (".parquet", ".json", ".jsonl")
+
+# Raw objects downloaded and decoded at once by read_keys; the S3 client's
+# connection pool is sized to match
+READ_CONCURRENCY = int(os.getenv("TRANSFORM_READ_CONCURRENCY", "8"))
+
+# Small JSON state objects kept by TransformService (e.g. emitted dates)
+TRANSFORM_STATE_PREFIX = "_transform_state"
+
+# Per-table Parquet snapshots written by the compaction job in the landing
+# bucket, and where merged raw files are moved when archiving
+COMPACTED_PREFIX = "_compacted"
+ARCHIVE_PREFIX = "_archive"
+# Raw tables the full-mode facts are built from: every historical version
+# of a row is a fact row, so their snapshots keep all versions instead of
+# the latest per key (pointer "all_versions": true)
+HISTORY_TABLES = ("sales_order", "purchase_order", "payment")
+
+
+# Processed outputs are encoded straight into a bounded multipart upload
+PARQUET_PART_SIZE = max(
+    MIN_PART_SIZE, int(os.getenv("TRANSFORM_PARQUET_PART_SIZE_BYTES", str(8 * 1024 * 1024))))
+
+# Parquet writer options by output-name prefix. Dimensions are small and
+# rewritten often, so they compress harder into one row group; facts are
+# larger and split into row groups the loader can read a piece at a time.
+PARQUET_DEFAULTS = {
+    "dim_": {
+        "compression": "zstd",
+        "compression_level": 9,
+        "row_group_size": None,
+        "use_dictionary": True,
+        "write_statistics": True,
+    },
+    "fact_": {
+        "compression": "zstd",
+        "compression_level": 3,
+        "row_group_size": 128 * 1024,
+        "use_dictionary": True,
+        "write_statistics": True,
+    },
+}
+PARQUET_FALLBACK = {
+    "compression": "snappy",
+    "compression_level": None,
+    "row_group_size": None,
+    "use_dictionary": True,
+    "write_statistics": True,
+}
+# JSON overrides, e.g. {"*": {"compression": "snappy"},
+# "fact_payment": {"row_group_size": 50000}}
+PARQUET_OVERRIDES = json.loads(os.getenv("TRANSFORM_PARQUET_OPTIONS") or "{}")
+
+
+def parquet_options(output_name: str, **overrides) -> dict:
+    """
+    Writer options for an output: prefix defaults, then the "*" and
+    per-output entries of TRANSFORM_PARQUET_OPTIONS, then overrides.
+    """
+    options = dict(next(
+        (defaults for prefix, defaults in PARQUET_DEFAULTS.items()
+         if output_name.startswith(prefix)),
+        PARQUET_FALLBACK))
+    options.update(PARQUET_OVERRIDES.get("*", {}))
+    options.update(PARQUET_OVERRIDES.get(output_name, {}))
+    options.update(overrides)
+    unknown = set(options) - set(PARQUET_FALLBACK)
+    if unknown:
+        raise ValueError(f"Unknown parquet writer options {sorted(unknown)}")
+    return options
+
 
 class S3TransformationClient:
-    def __init__(self, bucket: str):
+    def __init__(self, bucket: str, read_concurrency: int = READ_CONCURRENCY):
         self.bucket = bucket
-        self.s3 = boto3.client("s3")
+        self.read_concurrency = max(1, read_concurrency)
+        self.s3 = get_client("s3", max_pool_connections=max(10, self.read_concurrency))
         logger.info(f"Initialising S3 client. Raw data:  {self.bucket}")
 
     def read_json(self, key: str):
         logger.info(f"Reading raw JSON from s3://{self.bucket}/{key}")
         obj = self.s3.get_object(Bucket=self.bucket, Key=key)
-        raw_data = obj["Body"].read().decode("utf-8")
+        return self._decode_json(key, obj["Body"].read())
+
+    @staticmethod
+    def _decode_json(key: str, body: bytes):
+        raw_data = body.decode("utf-8")
+        if key.endswith(".jsonl"):
+            # streamed ingestion writes newline-delimited JSON
+            return [json.loads(line) for line in raw_data.splitlines() if line]
         return json.loads(raw_data)
 
+    def read_json_frame(self, key: str) -> pd.DataFrame:
+        """
+        Raw JSON object as a DataFrame, served from the local disk cache
+        when the object is unchanged (see common.disk_cache).
+        """
+        logger.info(f"Reading raw JSON from s3://{self.bucket}/{key}")
+        return read_through(
+            self.s3, self.bucket, key,
+            lambda body: pd.DataFrame(self._decode_json(key, body)))
+
+    def read_parquet(self, key: str) -> pd.DataFrame:
+        logger.info(f"Reading raw Parquet from s3://{self.bucket}/{key}")
+        return read_through(
+            self.s3, self.bucket, key, lambda body: pd.read_parquet(BytesIO(body)))
+
+    def list_objects(self, prefix: str, start_after: str | None = None) -> list[dict]:
+        """
+        Returns the listing entries (Key, ETag, Size, ...) of every object
+        under prefix in key order, following continuation tokens past the
+        1000-object page limit. With start_after, only keys sorting after it
+        are listed.
+        """
+        params = {"Bucket": self.bucket, "Prefix": prefix}
+        if start_after:
+            params["StartAfter"] = start_after
+        objects: list[dict] = []
+        while True:
+            response = self.s3.list_objects_v2(**params)
+            objects.extend(response.get("Contents", []))
+            if not response.get("IsTruncated"):
+                return objects
+            params["ContinuationToken"] = response["NextContinuationToken"]
+
+    def list_keys(self, prefix: str, start_after: str | None = None) -> list[str]:
+        return [obj["Key"] for obj in self.list_objects(prefix, start_after=start_after)]
+
+    def fingerprint(self, table_name: str) -> str:
+        """
+        Digest of the table's raw listing (keys, ETags, sizes): changes
+        whenever a raw object is added, replaced or archived.
+        Once the table is compacted, the pointer (snapshot and last key)
+        stands for every raw key it covers, so only the keys listed after
+        its last_key are fetched, not the table's whole history.
+        """
+        digest = hashlib.sha256()
+        pointer = self.get_compacted_pointer(table_name)
+        start_after = None
+        if pointer is not None:
+            start_after = pointer["last_key"]
+            digest.update(f"{pointer['snapshot_key']}\0{start_after}\n".encode("utf-8"))
+        for obj in self.list_objects(f"{table_name}/", start_after=start_after):
+            digest.update(f"{obj['Key']}\0{obj.get('ETag', '')}\0{obj.get('Size', '')}\n".encode("utf-8"))
+        return digest.hexdigest()
+
+    def read_keys(self, keys: list[str]) -> pd.DataFrame | None:
+        """
+        Reads the given raw_*.json / raw_*.jsonl / raw_*.parquet objects into
+        one DataFrame, keeping rows in key order. Returns None if they hold
+        no rows.
+        Objects are fetched and decoded on up to read_concurrency threads;
+        results are still assembled in key order so keep="last" dedupe
+        downstream sees the newest version last.
+        """
+        keys = [key for key in keys if key.endswith(RAW_SUFFIXES)]
+        if self.read_concurrency > 1 and len(keys) > 1:
+            with ThreadPoolExecutor(
+                    max_workers=min(self.read_concurrency, len(keys)),
+                    thread_name_prefix="s3-read") as pool:
+                # map() yields results in input order
+                decoded = list(pool.map(self._read_raw_object, keys))
+        else:
+            decoded = [self._read_raw_object(key) for key in keys]
+
+        frames = [frame for frame in decoded if not frame.empty]
+        if not frames:
+            return None
+        if len(frames) == 1:
+            return frames[0]
+        return pd.concat(frames, ignore_index=True)
+
+    def _read_raw_object(self, key: str) -> pd.DataFrame:
+        if key.endswith(".parquet"):
+            # Parquet landing files are already typed: no JSON parsing
+            return self.read_parquet(key)
+        return self.read_json_frame(key)
+
     def read_table(self, table_name: str) -> pd.DataFrame:
         """
-        Reads ALL raw_*.json files for a table and returns a DataFrame.
+        Reads ALL raw_*.json / raw_*.jsonl / raw_*.parquet files for a table
+        and returns a DataFrame, keeping rows in key order.
+        If the table has been compacted, starts from the compacted snapshot
+        and reads only the raw files that arrived after it.
         """
-        prefix = f"{table_name}/"
-        response = self.s3.list_objects_v2(
-            Bucket=self.bucket,
-            Prefix=prefix,
-        )
-        if "Contents" not in response:
+        base, start_after = self.read_compacted(table_name)
+        keys = self.list_keys(f"{table_name}/", start_after=start_after)
+        if not keys and base is None:
             raise FileNotFoundError(f"No raw data for table '{table_name}'")
-        rows: list[dict] = []
-        for obj in response["Contents"]:
-            key = obj["Key"]
-            if not key.endswith(".json"):
-                continue
-            rows.extend(self.read_json(key))
-        if not rows:
+        delta = self.read_keys([key for key in keys if key.endswith(RAW_SUFFIXES)])
+        frames = [frame for frame in (base, delta) if frame is not None]
+        if not frames:
             raise ValueError(f"No rows found for table '{table_name}'")
-        return pd.DataFrame(rows)
+        if len(frames) == 1:
+            return frames[0]
+        return pd.concat(frames, ignore_index=True)
+
+    def read_table_incremental(self, table_name: str, state_client: "S3TransformationClient") -> pd.DataFrame:
+        """
+        Same result as read_table, but starts from the compacted state kept
+        by state_client and only fetches raw objects listed after the last
+        key folded into it; the state is then advanced to include them.
+        If compaction has moved past the state (its snapshot covers raw keys
+        the state has not seen, which COMPACTION_ARCHIVE may have moved out
+        of the table's prefix), the state is rebased onto that snapshot.
+        """
+        state = state_client.get_raw_state(table_name)
+        base = None
+        start_after = None
+        rebased = False
+        if state is not None:
+            pointer = self.get_compacted_pointer(table_name)
+            if (pointer is not None and pointer["last_key"] > state["last_key"]
+                    and (table_name not in HISTORY_TABLES or pointer.get("all_versions"))):
+                logger.info(
+                    f"Compacted snapshot of '{table_name}' covers up to {pointer['last_key']}, "
+                    f"past the raw state's {state['last_key']}; rebasing onto it")
+                base, start_after = self.read_compacted(table_name)
+                rebased = base is not None
+        if state is not None and not rebased:
+            try:
+                base = state_client.read_arrow(state["snapshot_key"])
+                start_after = state["last_key"]
+            except self.s3.exceptions.NoSuchKey:
+                logger.warning(
+                    f"Raw state snapshot for '{table_name}' is gone; re-reading all raw files")
+                state = None
 
-    def write_parquet(self, table_name: str, df: pd.DataFrame):
+        if state is None:
+            base, start_after = self.read_compacted(table_name)
+        keys = [key for key in self.list_keys(f"{table_name}/", start_after=start_after)
+                if key.endswith(RAW_SUFFIXES)]
+        logger.info(
+            f"Incremental read of '{table_name}': {len(keys)} new raw objects after {start_after}")
+        if not keys:
+            if base is None:
+                raise FileNotFoundError(f"No raw data for table '{table_name}'")
+            if rebased:
+                state_client.write_raw_state(table_name, base, last_key=start_after, previous=state)
+            return base
+
+        delta = self.read_keys(keys)
+        frames = [frame for frame in (base, delta) if frame is not None]
+        if not frames:
+            raise ValueError(f"No rows found for table '{table_name}'")
+        df = frames[0] if len(frames) == 1 else pd.concat(frames, ignore_index=True)
+        state_client.write_raw_state(table_name, df, last_key=keys[-1], previous=state)
+        return df
+
+    def get_compacted_pointer(self, table_name: str) -> dict | None:
+        """
+        Returns {"snapshot_key", "last_key", "primary_key", "row_count",
+        "all_versions"} for the table's latest compacted snapshot, or None
+        if never compacted.
+        """
+        key = f"{COMPACTED_PREFIX}/{table_name}/_pointer.json"
+        try:
+            obj = self.s3.get_object(Bucket=self.bucket, Key=key)
+        except self.s3.exceptions.NoSuchKey:
+            return None
+        return json.loads(obj["Body"].read().decode("utf-8"))
+
+    def read_compacted(self, table_name: str):
+        """
+        Returns (snapshot DataFrame, last raw key folded into it), or
+        (None, None) if the table has not been compacted.
+        """
+        for attempt in range(2):
+            pointer = self.get_compacted_pointer(table_name)
+            if pointer is None:
+                return None, None
+            logger.info(
+                f"Reading compacted snapshot s3://{self.bucket}/{pointer['snapshot_key']} "
+                f"(raw files up to {pointer['last_key']})")
+            try:
+                return self.read_parquet(pointer["snapshot_key"]), pointer["last_key"]
+            except self.s3.exceptions.NoSuchKey:
+                if attempt:
+                    raise
+                # replaced (and its grace period over) since the pointer was read
+                logger.warning(
+                    f"Compacted snapshot {pointer['snapshot_key']} is gone; re-reading the pointer")
+
+    def write_compacted(self, table_name: str, df: pd.DataFrame, last_key: str,
+                        primary_key: str, previous: dict | None = None,
+                        all_versions: bool = False) -> dict:
+        """
+        Writes df as the table's compacted snapshot covering every raw key
+        up to last_key, then moves the pointer to it. The snapshot it
+        replaces is kept (as "previous_snapshot_key") until the next
+        compaction, so readers holding the old pointer can still read it;
+        the one before that is removed.
+        """
+        timestamp = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H-%M-%S")
+        snapshot_key = f"{COMPACTED_PREFIX}/{table_name}/snapshot_{timestamp}_{uuid4().hex}.parquet"
+        self._put_parquet(snapshot_key, df, parquet_options(table_name))
+        pointer = {
+            "table": table_name,
+            "snapshot_key": snapshot_key,
+            "last_key": last_key,
+            "primary_key": primary_key,
+            "row_count": len(df),
+            "all_versions": all_versions,
+            "previous_snapshot_key": previous["snapshot_key"] if previous is not None else None,
+            "updated_at": datetime.now(timezone.utc).isoformat(),
+        }
+        self.s3.put_object(
+            Bucket=self.bucket,
+            Key=f"{COMPACTED_PREFIX}/{table_name}/_pointer.json",
+            Body=json.dumps(pointer),
+            ContentType="application/json",
+        )
+        logger.info(f"Compacted snapshot for '{table_name}' → s3://{self.bucket}/{snapshot_key}")
+        expired = (previous or {}).get("previous_snapshot_key")
+        if expired:
+            self.s3.delete_object(Bucket=self.bucket, Key=expired)
+        return pointer
+
+    def archive_keys(self, keys: list[str]):
+        """
+        Moves raw objects under ARCHIVE_PREFIX (copy, then delete).
+        """
+        for key in keys:
+            self.s3.copy_object(
+                Bucket=self.bucket,
+                Key=f"{ARCHIVE_PREFIX}/{key}",
+                CopySource={"Bucket": self.bucket, "Key": key},
+            )
+            self.s3.delete_object(Bucket=self.bucket, Key=key)
+        logger.info(f"Archived {len(keys)} raw objects under {ARCHIVE_PREFIX}/")
+
+    def list_table_prefixes(self) -> list[str]:
+        """
+        Returns the top-level table prefixes of the bucket, skipping internal
+        ones (checkpoints, compaction state).
+        """
+        params = {"Bucket": self.bucket, "Delimiter": "/"}
+        tables: list[str] = []
+        while True:
+            response = self.s3.list_objects_v2(**params)
+            for prefix in response.get("CommonPrefixes", []):
+                name = prefix["Prefix"].rstrip("/")
+                if not name.startswith("_") and name != "checkpoints":
+                    tables.append(name)
+            if not response.get("IsTruncated"):
+                return tables
+            params["ContinuationToken"] = response["NextContinuationToken"]
+
+    def get_state(self, name: str) -> dict | None:
+        key = f"{TRANSFORM_STATE_PREFIX}/{name}.json"
+        try:
+            obj = self.s3.get_object(Bucket=self.bucket, Key=key)
+        except self.s3.exceptions.NoSuchKey:
+            return None
+        return json.loads(obj["Body"].read().decode("utf-8"))
+
+    def put_state(self, name: str, state: dict):
+        key = f"{TRANSFORM_STATE_PREFIX}/{name}.json"
+        self.s3.put_object(
+            Bucket=self.bucket,
+            Key=key,
+            Body=json.dumps(state, default=str),
+            ContentType="application/json",
+        )
+        logger.info(f"Saved transform state s3://{self.bucket}/{key}")
+
+    def get_raw_state(self, table_name: str) -> dict | None:
+        """
+        Returns {"last_key", "snapshot_key", "row_count"} for the table's
+        compacted raw state, or None if there is none yet.
+        """
+        key = f"{RAW_STATE_PREFIX}/{table_name}/_state.json"
+        try:
+            obj = self.s3.get_object(Bucket=self.bucket, Key=key)
+        except self.s3.exceptions.NoSuchKey:
+            return None
+        return json.loads(obj["Body"].read().decode("utf-8"))
+
+    def read_arrow(self, key: str) -> pd.DataFrame:
+        obj = self.s3.get_object(Bucket=self.bucket, Key=key)
+        return feather.read_table(pa.BufferReader(obj["Body"].read())).to_pandas()
+
+    def write_raw_state(self, table_name: str, df: pd.DataFrame, last_key: str, previous: dict | None = None):
+        """
+        Saves df as the table's compacted raw state covering every raw key up
+        to last_key. The snapshot is written under a fresh key before the
+        pointer moves to it, so readers never see a half-written state.
+        Failures only cost the next run a longer read.
+        """
+        snapshot_key = f"{RAW_STATE_PREFIX}/{table_name}/snapshot_{uuid4().hex}.arrow"
+        try:
+            buffer = BytesIO()
+            feather.write_feather(df, buffer)
+            self.s3.put_object(Bucket=self.bucket, Key=snapshot_key, Body=buffer.getvalue())
+            state = {
+                "table": table_name,
+                "last_key": last_key,
+                "snapshot_key": snapshot_key,
+                "row_count": len(df),
+                "updated_at": datetime.now(timezone.utc).isoformat(),
+            }
+            self.s3.put_object(
+                Bucket=self.bucket,
+                Key=f"{RAW_STATE_PREFIX}/{table_name}/_state.json",
+                Body=json.dumps(state),
+                ContentType="application/json",
+            )
+            logger.info(f"Raw state for '{table_name}' advanced to {last_key} ({len(df)} rows)")
+        except Exception as e:
+            logger.warning(f"Could not save raw state for '{table_name}': {e}")
+            return
+        if previous is not None:
+            try:
+                self.s3.delete_object(Bucket=self.bucket, Key=previous["snapshot_key"])
+            except Exception as e:
+                logger.warning(f"Could not delete old raw state {previous['snapshot_key']}: {e}")
+
+    def write_parquet(self, table_name: str,
+                      df: pd.DataFrame | pa.Table | pa.RecordBatchReader, **options):
+        """
+        Writes df as a new processed_<timestamp> Parquet object for the
+        output, with parquet_options(table_name, **options). Row groups are
+        encoded into the upload's part buffer as they are written, so no
+        second copy of the file is held in memory. df may be a DataFrame,
+        an Arrow table or a RecordBatchReader, which is consumed batch by
+        batch without holding the whole output.
+        """
         timestamp = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
         run_id = uuid4().hex
         key = f"{table_name}/processed_{timestamp}_{run_id}.parquet"
         # key = f"{table_name}/latest.parquet"
-        buffer = BytesIO()
-        df.to_parquet(buffer, index=False)
-        buffer.seek(0)
-        self.s3.put_object(Bucket=self.bucket, Key=key, Body=buffer.read())
-        logger.info(f"Parquet written → s3://{self.bucket}/{key}")
+        size = self._put_parquet(key, df, parquet_options(table_name, **options))
+        logger.info(f"Parquet written → s3://{self.bucket}/{key} ({size} bytes)")
         return key
+
+    def _put_parquet(self, key: str, df: pd.DataFrame | pa.Table | pa.RecordBatchReader,
+                     options: dict) -> int:
+        if isinstance(df, pd.DataFrame):
+            df = pa.Table.from_pandas(df, preserve_index=False)
+        row_group_size = options.get("row_group_size")
+        writer_options = {
+            name: value for name, value in options.items()
+            if name != "row_group_size" and value is not None}
+        with S3StreamWriter(self.s3, self.bucket, key, PARQUET_PART_SIZE,
+                            content_type="application/vnd.apache.parquet") as stream:
+            with pq.ParquetWriter(PartSink(stream), df.schema, **writer_options) as writer:
+                if isinstance(df, pa.RecordBatchReader):
+                    for batch in df:
+                        writer.write_batch(batch, row_group_size=row_group_size)
+                else:
+                    writer.write_table(df, row_group_size=row_group_size)
+        return stream.bytes_written
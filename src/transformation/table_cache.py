@@ -0,0 +1,63 @@
+import logging
+import os
+import threading
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+import pandas as pd
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+# Ingest tables kept in module state, so warm invocations of the transform
+# Lambda (a new TransformService each time) reuse them. Entries are keyed by
+# (bucket, table) and only served while the table's raw-listing fingerprint
+# is unchanged; least recently used tables are evicted past MAX_BYTES.
+
+ENABLED = os.getenv("TRANSFORM_TABLE_CACHE", "false").lower() in ("1", "true", "yes")
+MAX_BYTES = int(os.getenv("TRANSFORM_TABLE_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+
+_lock = threading.Lock()
+# (bucket, table) -> (fingerprint, frame, bytes)
+_entries: "OrderedDict[Tuple[str, str], Tuple[str, pd.DataFrame, int]]" = OrderedDict()
+_total = 0
+
+
+def get(bucket: str, table_name: str, fingerprint: str) -> Optional[pd.DataFrame]:
+    """
+    Returns the cached frame if it was read at this fingerprint, else None.
+    """
+    with _lock:
+        entry = _entries.get((bucket, table_name))
+        if entry is None or entry[0] != fingerprint:
+            return None
+        _entries.move_to_end((bucket, table_name))
+        logger.info(f"Table cache hit for '{table_name}'")
+        return entry[1]
+
+
+def put(bucket: str, table_name: str, fingerprint: str, df: pd.DataFrame,
+        max_bytes: int | None = None) -> None:
+    global _total
+    max_bytes = MAX_BYTES if max_bytes is None else max_bytes
+    size = int(df.memory_usage(deep=True).sum())
+    with _lock:
+        old = _entries.pop((bucket, table_name), None)
+        if old is not None:
+            _total -= old[2]
+        if size > max_bytes:
+            logger.info(f"Not caching '{table_name}': {size} bytes exceeds the table cache")
+            return
+        _entries[(bucket, table_name)] = (fingerprint, df, size)
+        _total += size
+        while _total > max_bytes:
+            (_, evicted), (_, _, evicted_size) = _entries.popitem(last=False)
+            _total -= evicted_size
+            logger.info(f"Evicted '{evicted}' from table cache ({evicted_size} bytes)")
+
+
+def clear() -> None:
+    global _total
+    with _lock:
+        _entries.clear()
+        _total = 0
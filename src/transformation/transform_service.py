@@ -1,60 +1,252 @@
 import pandas as pd
 
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from typing import Dict
 import logging
+import os
+import time
 from transformation.s3_client import S3TransformationClient
+from transformation import table_cache
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
+# Read raw tables from a compacted state in the processed bucket plus only
+# the raw objects that arrived since, instead of the full history
+INCREMENTAL_RAW_READS = os.getenv(
+    "TRANSFORM_INCREMENTAL_READS", "false").lower() in ("1", "true", "yes")
+
+
+# dim_date: "full" re-emits every date, "incremental" only dates not emitted
+# by an earlier run (tracked in the processed bucket's transform state)
+DIM_DATE_MODE = os.getenv("DIM_DATE_MODE", "full").lower()
+# Optional fixed "YYYY-MM-DD:YYYY-MM-DD" calendar: every day in the range,
+# generated without reading the fact sources
+DIM_DATE_RANGE = os.getenv("DIM_DATE_RANGE") or None
+
+# Facts: "full" emits the whole history, "delta" only rows whose source
+# last_updated is newer than the watermark saved by the previous run
+FACT_OUTPUT_MODE = os.getenv("TRANSFORM_FACT_MODE", "full").lower()
+# Written outputs carry df.attrs[OUTPUT_MODE_ATTR] = "full" | "delta" in
+# their Parquet metadata, so the loader knows what a file holds
+OUTPUT_MODE_ATTR = "output_mode"
+
+# Builder implementation: "pandas" (TransformService), "arrow"
+# (ArrowTransformService, pyarrow.compute on Arrow tables) or "duckdb"
+# (DuckDBTransformService, SQL over the raw files; needs duckdb installed)
+TRANSFORM_ENGINE = os.getenv("TRANSFORM_ENGINE", "pandas").lower()
+
+# Worker threads used by the output scheduler for table loads and builds
+DEFAULT_MAX_WORKERS = int(os.getenv("TRANSFORM_MAX_WORKERS", "4"))
+
+# Source columns parsed once per table by _get_typed_table
+TIMESTAMP_COLUMNS = ("created_at", "last_updated")
+DATE_COLUMNS = ("payment_date", "agreed_payment_date", "agreed_delivery_date")
+
+# Shrink raw tables as they are read (see compact_dtypes)
+COMPACT_DTYPES = os.getenv(
+    "TRANSFORM_COMPACT_DTYPES", "true").lower() in ("1", "true", "yes")
+# Text columns held as categoricals whenever a value repeats, plus any other
+# text column with at least CATEGORY_MIN_ROWS rows and at most
+# CATEGORY_MAX_RATIO distinct values per row
+CATEGORY_COLUMNS = (
+    "country", "city", "department_name", "location", "currency_code",
+    "transaction_type", "payment_type_name")
+# Prices and amounts: raw JSON carries them as decimal strings, which must
+# stay values, never categories
+AMOUNT_COLUMNS = ("unit_price", "item_unit_price", "payment_amount")
+CATEGORY_MIN_ROWS = int(os.getenv("TRANSFORM_CATEGORY_MIN_ROWS", "1000"))
+CATEGORY_MAX_RATIO = float(os.getenv("TRANSFORM_CATEGORY_MAX_RATIO", "0.5"))
+INT32_MIN, INT32_MAX = -2**31, 2**31 - 1
+
+
+def parse_datetime_column(values: pd.Series) -> pd.Series:
+    """
+    Parses ISO-8601 timestamp/date strings in one vectorised pass.
+    Columns that are already datetime64 (Parquet landing files) are returned
+    as they are. If any value is not ISO-8601, the column falls back to the
+    slower per-element "mixed" inference. Unparseable values become NaT.
+    """
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return values
+    try:
+        parsed = pd.to_datetime(values, format="ISO8601", errors="coerce")
+        if not (parsed.isna() & values.notna()).any():
+            return parsed
+    except ValueError:
+        # e.g. naive and offset-aware strings in one column
+        pass
+    logger.info(f"Falling back to mixed-format parsing for '{values.name}'")
+    return pd.to_datetime(values, format="mixed", errors="coerce")
 
-TRANSFORM_MAP = {
-    "payment": ["make_fact_payment", "make_dim_date"],
-    "sales_order": ["make_fact_sales_order", "make_dim_date"],
-    "purchase_order": ["make_fact_purchase_order", "make_dim_date"],
 
-    "currency": ["make_dim_currency"],
-    "staff": ["make_dim_staff"],
-    "address": ["make_dim_location"],
-    "counterparty": ["make_dim_counterparty"],
-    "design": ["make_dim_design"],
-    "payment_type": ["make_dim_payment_type"],
-    "transaction": ["make_dim_transaction"],
-}
+def _fits_int32(values: pd.Series) -> bool:
+    return values.empty or (values.min() >= INT32_MIN and values.max() <= INT32_MAX)
 
 
-OUTPUT_NAME = {
-    "make_dim_date": "dim_date",
-    "make_fact_payment": "fact_payment",
-    "make_fact_sales_order": "fact_sales_order",
-    "make_fact_purchase_order": "fact_purchase_order",
-    "make_dim_currency": "dim_currency",
-    "make_dim_staff": "dim_staff",
-    "make_dim_location": "dim_location",
-    "make_dim_counterparty": "dim_counterparty",
-    "make_dim_design": "dim_design",
-    "make_dim_payment_type": "dim_payment_type",
-    "make_dim_transaction": "dim_transaction",
+def compact_dtypes(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Returns df with smaller dtypes:
+    - integer columns that fit become int32 (Int32 when nullable). Every id
+      gets the same width, so join keys still match across tables, in
+      pandas and in Arrow joins alike
+    - *_id columns read as float64 because of missing values become Int32
+    - CATEGORY_COLUMNS and other low-cardinality text become categoricals
+      (dictionary-encoded in the written Parquet)
+    Timestamp/date columns, AMOUNT_COLUMNS (numbers or decimal strings) and
+    other non-integer numbers are left alone.
+    """
+    df = df.copy(deep=False)
+    for column in df.columns:
+        values = df[column]
+        if column in TIMESTAMP_COLUMNS + DATE_COLUMNS + AMOUNT_COLUMNS:
+            continue
+        if pd.api.types.is_bool_dtype(values):
+            continue
+        if pd.api.types.is_integer_dtype(values):
+            if _fits_int32(values.dropna()):
+                nullable = isinstance(values.dtype, pd.api.extensions.ExtensionDtype)
+                df[column] = values.astype("Int32" if nullable else "int32")
+        elif pd.api.types.is_float_dtype(values) and column.endswith("_id"):
+            present = values.dropna()
+            if (present % 1 == 0).all() and _fits_int32(present):
+                df[column] = values.astype("Int32")
+        elif pd.api.types.is_object_dtype(values) or pd.api.types.is_string_dtype(values):
+            if pd.api.types.infer_dtype(values, skipna=True) != "string":
+                continue
+            distinct = values.nunique()
+            # a categorical only pays for itself once values repeat
+            if (column in CATEGORY_COLUMNS and distinct < len(values)) or (
+                    len(values) >= CATEGORY_MIN_ROWS
+                    and distinct <= CATEGORY_MAX_RATIO * len(values)):
+                df[column] = values.astype("category")
+    return df
+
+
+def _utc_naive(values: pd.Series) -> pd.Series:
+    # naive timestamps are taken to be UTC, as with pd.to_datetime(utc=True)
+    if getattr(values.dt, "tz", None) is not None:
+        return values.dt.tz_convert("UTC").dt.tz_localize(None)
+    return values
+
+
+# Output table -> the builder that produces it and the ingest tables it reads.
+# Outputs only depend on ingest tables, so every output whose sources are
+# loaded can be built and written independently of the others.
+TRANSFORM_GRAPH = {
+    "dim_currency": {"builder": "make_dim_currency", "sources": ("currency",)},
+    "dim_staff": {"builder": "make_dim_staff", "sources": ("staff", "department")},
+    "dim_location": {"builder": "make_dim_location", "sources": ("address",)},
+    "dim_counterparty": {"builder": "make_dim_counterparty", "sources": ("counterparty", "address")},
+    "dim_design": {"builder": "make_dim_design", "sources": ("design",)},
+    "dim_payment_type": {"builder": "make_dim_payment_type", "sources": ("payment_type",)},
+    "dim_transaction": {"builder": "make_dim_transaction", "sources": ("transaction",)},
+    "dim_date": {"builder": "make_dim_date", "sources": ("payment", "sales_order", "purchase_order")},
+    "fact_sales_order": {"builder": "make_fact_sales_order", "sources": ("sales_order",)},
+    "fact_purchase_order": {"builder": "make_fact_purchase_order", "sources": ("purchase_order",)},
+    "fact_payment": {"builder": "make_fact_payment", "sources": ("payment",)},
 }
 
 
+def _affected_outputs(graph: dict) -> Dict[str, list]:
+    index: Dict[str, list] = {}
+    for output, node in graph.items():
+        for source in node["sources"]:
+            index.setdefault(source, []).append(output)
+    return index
+
+
+# Reverse index: ingest table -> every output that reads it, so a change to
+# one table rebuilds exactly the outputs it feeds
+AFFECTED_OUTPUTS = _affected_outputs(TRANSFORM_GRAPH)
+
+
 class TransformService:
     """
     Transform service tightly coupled to S3TransformationClient
     """
 
-    def __init__(self, ingest_bucket: str, processed_bucket: str):
+    def __init__(self, ingest_bucket: str, processed_bucket: str,
+                 incremental_reads: bool = INCREMENTAL_RAW_READS,
+                 shared_cache: bool = table_cache.ENABLED,
+                 dim_date_mode: str = DIM_DATE_MODE,
+                 dim_date_range: str | None = DIM_DATE_RANGE,
+                 max_workers: int = DEFAULT_MAX_WORKERS,
+                 fact_mode: str = FACT_OUTPUT_MODE,
+                 compact: bool = COMPACT_DTYPES):
+        self.ingest_bucket = ingest_bucket
         self.ingest_s3 = S3TransformationClient(ingest_bucket)
         self.processed_s3 = S3TransformationClient(processed_bucket)
+        self.incremental_reads = incremental_reads
+        self.shared_cache = shared_cache
+        if dim_date_mode not in ("full", "incremental"):
+            raise ValueError(f"Unknown DIM_DATE_MODE '{dim_date_mode}'")
+        self.dim_date_mode = dim_date_mode
+        self.dim_date_range = dim_date_range
+        self.max_workers = max_workers
+        if fact_mode not in ("full", "delta"):
+            raise ValueError(f"Unknown TRANSFORM_FACT_MODE '{fact_mode}'")
+        self.fact_mode = fact_mode
+        self.compact = compact
+        # table -> {"before": bytes, "after": bytes} of compacted reads
+        self.memory_bytes: Dict[str, dict] = {}
+        # output -> "delta" when the builder emitted only changes
+        self._output_modes: Dict[str, str] = {}
+        # state to save once the output it describes has been written
+        self._pending_state: Dict[str, dict] = {}
         self._cache: Dict[str, pd.DataFrame] = {}
+        self._typed: Dict[str, pd.DataFrame] = {}
         logger.info(
             f"TransformService initialised. ingest={ingest_bucket}, processed={processed_bucket}")
 
     def _get_ingest_table(self, table_name: str) -> pd.DataFrame:
         if table_name not in self._cache:
-            logger.info(f"Fetching ingest table: {table_name}")
-            self._cache[table_name] = self.ingest_s3.read_table(table_name)
+            if self.shared_cache:
+                # one listing decides whether the process-level copy is current
+                fingerprint = self.ingest_s3.fingerprint(table_name)
+                df = table_cache.get(self.ingest_bucket, table_name, fingerprint)
+                if df is None:
+                    df = self._read_ingest_table(table_name)
+                    table_cache.put(self.ingest_bucket, table_name, fingerprint, df)
+                # builders assign columns on their table; a shallow copy keeps
+                # those assignments out of the shared frame
+                self._cache[table_name] = df.copy(deep=False)
+            else:
+                self._cache[table_name] = self._read_ingest_table(table_name)
         return self._cache[table_name]
 
+    def _get_typed_table(self, table_name: str) -> pd.DataFrame:
+        """
+        The ingest table with its known timestamp/date columns parsed to
+        datetime64, parsed once per service and shared by every builder.
+        """
+        if table_name not in self._typed:
+            typed = self._get_ingest_table(table_name).copy(deep=False)
+            for column in TIMESTAMP_COLUMNS + DATE_COLUMNS:
+                if column in typed.columns:
+                    typed[column] = parse_datetime_column(typed[column])
+            self._typed[table_name] = typed
+        return self._typed[table_name]
+
+    def _read_ingest_table(self, table_name: str) -> pd.DataFrame:
+        logger.info(f"Fetching ingest table: {table_name}")
+        if self.incremental_reads:
+            df = self.ingest_s3.read_table_incremental(table_name, self.processed_s3)
+        else:
+            df = self.ingest_s3.read_table(table_name)
+        if self.compact:
+            df = self._compact(table_name, df)
+        return df
+
+    def _compact(self, table_name: str, df: pd.DataFrame) -> pd.DataFrame:
+        before = int(df.memory_usage(deep=True).sum())
+        df = compact_dtypes(df)
+        after = int(df.memory_usage(deep=True).sum())
+        self.memory_bytes[table_name] = {"before": before, "after": after}
+        logger.info(
+            f"Compacted '{table_name}' dtypes: {before / 2**20:.2f} MiB -> "
+            f"{after / 2**20:.2f} MiB ({len(df)} rows)")
+        return df
+
     # Dimensions
     def make_dim_currency(self) -> pd.DataFrame:
         logger.info("Creating dim_currency")
@@ -67,8 +259,11 @@ class TransformService:
         logger.info("Creating dim_staff")
         staff = self._get_ingest_table("staff").drop_duplicates(
             subset=["staff_id"], keep="last")
-        department = self._get_ingest_table("department").drop_duplicates(
-            subset=["department_id"], keep="last")
+        department = (
+            self._get_ingest_table("department")
+            .drop_duplicates(subset=["department_id"], keep="last")
+            .set_index("department_id")
+        )
         dim = staff.join(department, on="department_id", rsuffix="_dept")
         return dim[
             [
@@ -152,36 +347,61 @@ class TransformService:
         return payment_type[["payment_type_id", "payment_type_name"]]
 
     def make_dim_date(self) -> pd.DataFrame:
+        """
+        One row per calendar date with a stable yyyymmdd date_id, so ids
+        never shift when earlier dates appear and loads are plain upserts.
+        In incremental mode only dates not emitted before are returned.
+        """
         logger.info("Creating dim_date")
-        payments = self._get_ingest_table("payment")
-        purchases = self._get_ingest_table("purchase_order")
-        sales = self._get_ingest_table("sales_order")
-        logger.info("Getting dates from payment")
-        payment_dates = pd.melt(
-            payments[["created_at", "last_updated", "payment_date"]]
-        )["value"]
-        logger.info("Getting dates from sales_order")
-        sales_dates = pd.melt(
-            sales[["created_at", "last_updated", "agreed_delivery_date", "agreed_payment_date"]]
-        )["value"]
-        logger.info("Getting dates from purchase_order")
-        purchase_dates = pd.melt(
-            purchases[["created_at", "last_updated", "agreed_delivery_date", "agreed_payment_date"]]
-        )["value"]
-        logger.info("Collating dates")
+        return self._calendar(self._dim_dates())
+
+    def _dim_dates(self) -> pd.Series:
+        """
+        The sorted datetime64 dates dim_date emits: the fixed range or the
+        source dates, less those already emitted in incremental mode.
+        """
+        if self.dim_date_range:
+            start, end = self.dim_date_range.split(":")
+            dt = pd.Series(pd.date_range(start, end, freq="D"))
+        else:
+            dt = self._source_dates()
+
+        if self.dim_date_mode == "incremental":
+            state = self.processed_s3.get_state("dim_date") or {}
+            emitted = set(state.get("date_ids", []))
+            if emitted:
+                self._output_modes["dim_date"] = "delta"
+            date_ids = self._date_ids(dt)
+            new = ~date_ids.isin(emitted)
+            dt = dt[new].reset_index(drop=True)
+            logger.info(f"dim_date: {len(dt)} new dates ({len(emitted)} already emitted)")
+            self._pending_state["dim_date"] = {
+                "date_ids": sorted(emitted.union(date_ids[new].tolist())),
+            }
+        return dt
+
+    def _source_dates(self) -> pd.Series:
+        payments = self._get_typed_table("payment")
+        purchases = self._get_typed_table("purchase_order")
+        sales = self._get_typed_table("sales_order")
+        logger.info("Collating dates from payment, sales_order and purchase_order")
+        date_columns = (
+            [payments[c] for c in ("created_at", "last_updated", "payment_date")]
+            + [sales[c] for c in ("created_at", "last_updated", "agreed_delivery_date", "agreed_payment_date")]
+            + [purchases[c] for c in ("created_at", "last_updated", "agreed_delivery_date", "agreed_payment_date")]
+        )
         total_dates = pd.concat(
-            [payment_dates, sales_dates, purchase_dates], ignore_index=True)
-        total_dates = pd.to_datetime(
-            total_dates,
-            format="mixed",
-            errors="coerce",
-            utc=True)
-        total_dates = total_dates.dropna().dt.normalize().drop_duplicates().sort_values()
-        dates = pd.DataFrame({"date": total_dates.dt.date})
-        dt = pd.to_datetime(
-            dates["date"],
-            format="mixed",
-            errors="coerce")  # guaranteed datetime64[ns]
+            [_utc_naive(column) for column in date_columns], ignore_index=True)
+        return total_dates.dropna().dt.normalize().drop_duplicates().sort_values(
+            ignore_index=True)
+
+    @staticmethod
+    def _date_ids(dt: pd.Series) -> pd.Series:
+        return (dt.dt.year * 10000 + dt.dt.month * 100 + dt.dt.day).astype("int64")
+
+    @classmethod
+    def _calendar(cls, dt: pd.Series) -> pd.DataFrame:
+        dates = pd.DataFrame({"date_id": cls._date_ids(dt), "date": dt.dt.date})
         dates["year"] = dt.dt.year
         dates["month"] = dt.dt.month
         dates["day"] = dt.dt.day
@@ -189,9 +409,14 @@ class TransformService:
         dates["day_name"] = dt.dt.day_name()
         dates["month_name"] = dt.dt.month_name()
         dates["quarter"] = dt.dt.quarter
-        dates.insert(0, "date_id", range(1, len(dates) + 1))
         return dates
 
+    def _commit_state(self, output_name: str):
+        # only after the output was written, so a failed write is retried
+        state = self._pending_state.pop(output_name, None)
+        if state is not None:
+            self.processed_s3.put_state(output_name, state)
+
     def make_dim_transaction(self) -> pd.DataFrame:
         logger.info("Creating dim_transaction")
         txn = self._get_ingest_table("transaction").drop_duplicates(
@@ -205,24 +430,39 @@ class TransformService:
             ]
         ]
 
-        # Fact Tables
+    # Fact Tables
+    def _fact_source(self, output_name: str, table_name: str) -> pd.DataFrame:
+        """
+        The typed source rows of a fact output: all of them in full mode,
+        in delta mode only those updated after the output's watermark.
+        """
+        typed = self._get_typed_table(table_name)
+        if self.fact_mode != "delta":
+            return typed.copy(deep=False)
+
+        last_updated = _utc_naive(typed["last_updated"])
+        watermark = (self.processed_s3.get_state(output_name) or {}).get("last_updated")
+        if watermark is not None:
+            self._output_modes[output_name] = "delta"
+            changed = last_updated > pd.Timestamp(watermark)
+            typed, last_updated = typed[changed], last_updated[changed]
+        logger.info(
+            f"{output_name}: {len(typed)} rows updated after watermark {watermark}")
+        if len(typed):
+            self._pending_state[output_name] = {
+                "last_updated": last_updated.max().isoformat()}
+        return typed.copy(deep=False)
+
     def make_fact_sales_order(self) -> pd.DataFrame:
         table_name = "fact_sales_order"
         logger.info(f"Creating {table_name}")
-        sales_order = self._get_ingest_table("sales_order")
-        # source_count = len(sales_order)
-        sales_order["created_date"] = pd.to_datetime(
-            sales_order["created_at"], format="mixed", errors="coerce").dt.date
-        sales_order["created_time"] = pd.to_datetime(
-            sales_order["created_at"], format="mixed", errors="coerce").dt.time
-        sales_order["last_updated_date"] = pd.to_datetime(
-            sales_order["last_updated"], format="mixed", errors="coerce").dt.date
-        sales_order["last_updated_time"] = pd.to_datetime(
-            sales_order["last_updated"], format="mixed", errors="coerce").dt.time
-        sales_order["agreed_payment_date"] = pd.to_datetime(
-            sales_order["agreed_payment_date"], format="mixed", errors="coerce").dt.date
-        sales_order["agreed_delivery_date"] = pd.to_datetime(
-            sales_order["agreed_delivery_date"], format="mixed", errors="coerce").dt.date
+        sales_order = self._fact_source(table_name, "sales_order")
+        sales_order["created_date"] = sales_order["created_at"].dt.date
+        sales_order["created_time"] = sales_order["created_at"].dt.time
+        sales_order["last_updated_date"] = sales_order["last_updated"].dt.date
+        sales_order["last_updated_time"] = sales_order["last_updated"].dt.time
+        sales_order["agreed_payment_date"] = sales_order["agreed_payment_date"].dt.date
+        sales_order["agreed_delivery_date"] = sales_order["agreed_delivery_date"].dt.date
         fact = sales_order[
             ["sales_order_id",
              "created_date",
@@ -250,9 +490,8 @@ class TransformService:
 
     def make_fact_payment(self) -> pd.DataFrame:
         logger.info("Creating fact_payment")
-        payment = self._get_ingest_table("payment")
-        payment["payment_date"] = pd.to_datetime(
-            payment["payment_date"], format="mixed", errors="coerce").dt.date
+        payment = self._fact_source("fact_payment", "payment")
+        payment["payment_date"] = payment["payment_date"].dt.date
         return payment[
             [
                 "payment_id",
@@ -268,12 +507,7 @@ class TransformService:
 
     def make_fact_purchase_order(self) -> pd.DataFrame:
         logger.info("Creating fact_purchase_order")
-        po = self._get_ingest_table("purchase_order")
-        # Parse timestamps
-        po["created_at"] = pd.to_datetime(
-            po["created_at"], format="mixed", errors="coerce")
-        po["last_updated"] = pd.to_datetime(
-            po["last_updated"], format="mixed", errors="coerce")
+        po = self._fact_source("fact_purchase_order", "purchase_order")
         # Split date/time (as your fact table shows created_date/created_time
         # etc.)
         po["created_date"] = po["created_at"].dt.date
@@ -281,13 +515,8 @@ class TransformService:
         po["last_updated_date"] = po["last_updated"].dt.date
         po["last_updated_time"] = po["last_updated"].dt.time
         # Ensure agreed dates are pure dates
-        # po["agreed_delivery_date"] = pd.to_datetime(format="mixed", errors="coercepo["agreed_delivery_date"], errors="coerce").dt.date
-        # po["agreed_payment_date"] = pd.to_datetime(format="mixed",
-        # errors="coercepo["agreed_payment_date"], errors="coerce").dt.date
-        po["agreed_payment_date"] = pd.to_datetime(
-            po["agreed_payment_date"], format="mixed", errors="coerce").dt.date
-        po["agreed_delivery_date"] = pd.to_datetime(
-            po["agreed_delivery_date"], format="mixed", errors="coerce").dt.date
+        po["agreed_payment_date"] = po["agreed_payment_date"].dt.date
+        po["agreed_delivery_date"] = po["agreed_delivery_date"].dt.date
         fact = po[
             [
                 "purchase_order_id",
@@ -307,66 +536,182 @@ class TransformService:
             ]
         ]
 
+        if self.fact_mode == "delta":
+            # positional ids would collide with rows already loaded; the
+            # warehouse's BIGSERIAL assigns purchase_record_id instead
+            return fact
         fact.insert(0, "purchase_record_id", range(1, len(fact) + 1))
         return fact
 
     # Orchestration
 
-    def run(self):
-        logger.info("Starting transformation run")
-        logger.info(f"TRANSFORM_MAP contains: {list(TRANSFORM_MAP.keys())}")
-        outputs = {
-            "dim_transaction": self.make_dim_transaction(),
-            "dim_staff": self.make_dim_staff(),
-            "dim_payment_type": self.make_dim_payment_type(),
-            "dim_location": self.make_dim_location(),
-            "dim_design": self.make_dim_design(),
-            "dim_date": self.make_dim_date(),
-            "dim_currency": self.make_dim_currency(),
-            "dim_counterparty": self.make_dim_counterparty(),
-            "fact_sales_order": self.make_fact_sales_order(),
-            "fact_purchase_orders": self.make_fact_purchase_order(),
-            "fact_payment": self.make_fact_payment(),
-        }
-
-        logger.info(f"Generated {len(outputs)} tables: {list(outputs.keys())}")
-
-        for name, df in outputs.items():
-            logger.info(f"Writing {name} ({len(df)} rows)")
-            if df is not None and len(df) > 0:
-                self.processed_s3.write_parquet(name, df)
-            else:
-                logger.warning(f"{name} is empty or None, skipping")
-            self.processed_s3.write_parquet(name, df)
-        logger.info("Transformation run completed successfully")
+    def _sources(self, output_name: str) -> tuple:
+        if output_name == "dim_date" and self.dim_date_range:
+            # a fixed calendar reads no fact tables
+            return ()
+        return TRANSFORM_GRAPH[output_name]["sources"]
+
+    def _load_source(self, table_name: str) -> float:
+        started = time.perf_counter()
+        # loads the ingest table and parses its date columns once, before
+        # any builder that shares the table runs
+        self._get_typed_table(table_name)
+        return time.perf_counter() - started
+
+    def _build_output(self, output_name: str) -> dict:
+        builder = TRANSFORM_GRAPH[output_name]["builder"]
+        started = time.perf_counter()
+        df = getattr(self, builder)()
+        built = time.perf_counter()
+        output_mode = self._output_modes.get(output_name, "full")
+
+        if df is None or len(df) == 0:
+            logger.info(f"'{output_name}' has no rows; nothing written")
+            self._pending_state.pop(output_name, None)
+            s3_key = None
+        else:
+            logger.info(
+                f"Writing '{output_name}' from '{builder}' ({len(df)} rows, {output_mode})")
+            df = self._with_output_mode(df, output_mode)
+            s3_key = self.processed_s3.write_parquet(output_name, df)
+            self._commit_state(output_name)
+        written = time.perf_counter()
 
-    def run_single_table(self, table_name: str):
-        logger.info(f"Running single-table transformation for '{table_name}'")
+        logger.info(
+            f"'{output_name}' built in {built - started:.3f}s, "
+            f"written in {written - built:.3f}s")
+        return {
+            "method": builder,
+            "output": output_name,
+            "status": "success",
+            "output_mode": output_mode,
+            "rows": 0 if df is None else len(df),
+            "s3_key": s3_key,
+            "build_seconds": round(built - started, 3),
+            "write_seconds": round(written - built, 3),
+        }
 
-        methods = TRANSFORM_MAP.get(table_name)
-        if not methods:
-            logger.warning(f"No transformation mapped for '{table_name}'")
+    def _with_output_mode(self, df: pd.DataFrame, output_mode: str) -> pd.DataFrame:
+        df.attrs[OUTPUT_MODE_ATTR] = output_mode
+        return df
+
+    def _run_outputs(self, outputs: list) -> dict:
+        """
+        Builds and writes the given outputs. Each source table is loaded
+        once; an output is submitted to the pool as soon as all of its
+        sources are loaded and is written as soon as it is built.
+        Returns {"results": [...] in output order, "load_seconds": {...},
+        "memory_bytes": {...}} (memory_bytes for tables compacted on read).
+        """
+        unknown = [name for name in outputs if name not in TRANSFORM_GRAPH]
+        if unknown:
+            raise ValueError(f"Unknown transform outputs: {unknown}")
+
+        waiting = {name: set(self._sources(name)) for name in outputs}
+        sources = sorted(set().union(*waiting.values())) if waiting else []
+        results: Dict[str, dict] = {}
+        load_seconds: Dict[str, float] = {}
+        workers = max(1, min(self.max_workers, max(len(sources), len(outputs))))
+        logger.info(
+            f"Scheduling {len(outputs)} outputs over {len(sources)} source tables "
+            f"(max_workers={workers})")
+
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="transform") as pool:
+            builds = {}
+
+            def submit_ready():
+                for name, pending in waiting.items():
+                    if not pending and name not in builds and name not in results:
+                        builds[name] = pool.submit(self._build_output, name)
+
+            loads = {pool.submit(self._load_source, table): table for table in sources}
+            submit_ready()
+            for future in as_completed(loads):
+                table = loads[future]
+                try:
+                    load_seconds[table] = round(future.result(), 3)
+                except Exception as e:
+                    logger.exception(f"Loading source table '{table}' FAILED")
+                    for name, pending in waiting.items():
+                        if table in pending and name not in results:
+                            results[name] = {
+                                "method": TRANSFORM_GRAPH[name]["builder"],
+                                "output": name,
+                                "status": "error",
+                                "error": f"source '{table}' failed: {e}",
+                            }
+                    continue
+                for pending in waiting.values():
+                    pending.discard(table)
+                submit_ready()
+
+            for name, future in builds.items():
+                try:
+                    results[name] = future.result()
+                except Exception as e:
+                    logger.exception(f"Transform of '{name}' FAILED")
+                    results[name] = {
+                        "method": TRANSFORM_GRAPH[name]["builder"],
+                        "output": name,
+                        "status": "error",
+                        "error": str(e),
+                    }
+
+        return {"results": [results[name] for name in outputs],
+                "load_seconds": load_seconds,
+                "memory_bytes": {table: self.memory_bytes[table] for table in sources
+                                 if table in self.memory_bytes}}
+
+    def run(self, outputs: list | None = None) -> dict:
+        """
+        Full rebuild of every output in TRANSFORM_GRAPH (or just `outputs`).
+        """
+        outputs = list(outputs or TRANSFORM_GRAPH)
+        logger.info(f"Starting transformation run for {outputs}")
+        started = time.perf_counter()
+        summary = self._run_outputs(outputs)
+        failed = [r["output"] for r in summary["results"] if r["status"] == "error"]
+        status = "error" if failed else "success"
+        logger.info(
+            f"Transformation run finished in {time.perf_counter() - started:.3f}s "
+            f"(status={status}, failed={failed})")
+        return {"status": status, **summary}
+
+    def affected_outputs(self, table_name: str) -> list:
+        return [output for output in AFFECTED_OUTPUTS.get(table_name, [])
+                if table_name in self._sources(output)]
+
+    def run_tables(self, table_names: list) -> dict:
+        """
+        Rebuilds every output that reads any of the changed tables, each
+        output once and each shared source loaded once.
+        """
+        tables = list(dict.fromkeys(table_names))
+        outputs = [output for output in TRANSFORM_GRAPH
+                   if any(output in self.affected_outputs(t) for t in tables)]
+        skipped = [t for t in tables if not self.affected_outputs(t)]
+        if skipped:
+            logger.warning(f"No transformation mapped for {skipped}")
+        if not outputs:
             return {
-                "table": table_name,
+                "tables": tables,
                 "status": "skipped",
                 "reason": "no_transform_defined"}
 
-        results = []
-
-        for method_name in methods:
-            transform_method = getattr(self, method_name)
-            df = transform_method()
+        logger.info(f"Tables {tables} feed {outputs}")
+        summary = self._run_outputs(outputs)
+        failed = [r for r in summary["results"] if r["status"] == "error"]
+        if failed:
+            raise RuntimeError(
+                f"Transform failed for {[r['output'] for r in failed]}: "
+                f"{failed[0]['error']}")
 
-            output_name = OUTPUT_NAME.get(method_name, method_name)
-            logger.info(
-                f"Writing '{output_name}' from '{method_name}' ({len(df)} rows)")
-            s3_key = self.processed_s3.write_parquet(output_name, df)
+        return {"tables": tables, "status": "success",
+                "skipped": skipped, "results": summary["results"]}
 
-            results.append({
-                "method": method_name,
-                "output": output_name,
-                "rows": len(df),
-                "s3_key": s3_key,
-            })
-
-        return {"table": table_name, "status": "success", "results": results}
+    def run_single_table(self, table_name: str):
+        logger.info(f"Running single-table transformation for '{table_name}'")
+        result = self.run_tables([table_name])
+        del result["tables"]
+        result.pop("skipped", None)
+        return {"table": table_name, **result}
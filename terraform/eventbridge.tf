@@ -23,4 +23,26 @@ resource "aws_lambda_permission" "eventbridge_ingestion" {
   function_name = aws_lambda_function.ingestion.function_name
   principal     = "events.amazonaws.com"
   source_arn    = aws_cloudwatch_event_rule.ingestion_schedule.arn
-}
\ No newline at end of file
+}
+# Compact raw landing files into per-table snapshots
+resource "aws_cloudwatch_event_rule" "compaction_schedule" {
+  name        = "${var.project_name}-compaction-schedule"
+  description = "Fold raw landing deltas into per-table Parquet snapshots"
+
+  schedule_expression = var.compaction_schedule
+}
+
+resource "aws_cloudwatch_event_target" "compaction_target" {
+  rule      = aws_cloudwatch_event_rule.compaction_schedule.name
+  target_id = "transform-lambda-compaction"
+  arn       = aws_lambda_function.transform.arn
+  input     = jsonencode({ mode = "compact" })
+}
+
+resource "aws_lambda_permission" "eventbridge_compaction" {
+  statement_id  = "AllowEventBridgeInvokeCompaction"
+  action        = "lambda:InvokeFunction"
+  function_name = aws_lambda_function.transform.function_name
+  principal     = "events.amazonaws.com"
+  source_arn    = aws_cloudwatch_event_rule.compaction_schedule.arn
+}
@@ -100,12 +100,21 @@ resource "aws_iam_role_policy" "ingestion_lambda_s3_permissions" {
       {
         Effect = "Allow"
         Action = [
-          "s3:PutObject"
+          "s3:PutObject",
+          "s3:GetObject",
+          "s3:DeleteObject",
+          "s3:AbortMultipartUpload"
         ]
         Resource = [
           "${aws_s3_bucket.landing_zone.arn}/*"
         ]
       },
+      {
+        # lets a missing checkpoint/manifest surface as NoSuchKey, not 403
+        Effect   = "Allow"
+        Action   = "s3:ListBucket"
+        Resource = aws_s3_bucket.landing_zone.arn
+      },
       {
         Effect    = "Allow"
         Action    = "secretsmanager:GetSecretValue"
@@ -115,6 +124,12 @@ resource "aws_iam_role_policy" "ingestion_lambda_s3_permissions" {
         Effect     = "Allow"
         Action     = "sqs:SendMessage"
         Resource   = aws_sqs_queue.ingestion_dlq.arn
+      },
+      {
+        # INGEST_SELF_REINVOKE: continue a run cut short by the time budget
+        Effect   = "Allow"
+        Action   = "lambda:InvokeFunction"
+        Resource = "arn:aws:lambda:${var.aws_region}:*:function:${var.project_name}-ingestion-${var.environment}"
       }
     ]
   })
@@ -144,6 +159,44 @@ resource "aws_iam_role_policy" "transform_lambda_s3_permissions" {
         Action   = "s3:PutObject"
         Resource = "${aws_s3_bucket.processed_zone.arn}/*"
       },
+      {
+        # compaction mode: snapshots and archived raw files in the landing bucket
+        Effect   = "Allow"
+        Action   = "s3:PutObject"
+        Resource = [
+          "${aws_s3_bucket.landing_zone.arn}/_compacted/*",
+          "${aws_s3_bucket.landing_zone.arn}/_archive/*"
+        ]
+      },
+      {
+        # Compaction deletes the snapshot a new one replaces. Raw landing
+        # files are only ever deleted when compaction_archive is on, and only
+        # after they have been copied under _archive/ (a move), so the role
+        # can delete raw_* objects in that case alone.
+        Effect = "Allow"
+        Action = "s3:DeleteObject"
+        Resource = concat(
+          ["${aws_s3_bucket.landing_zone.arn}/_compacted/*"],
+          var.compaction_archive ? ["${aws_s3_bucket.landing_zone.arn}/*/raw_*"] : []
+        )
+      },
+      {
+        # TRANSFORM_INCREMENTAL_READS: compacted raw state under _raw_state/
+        Effect   = "Allow"
+        Action   = ["s3:GetObject", "s3:DeleteObject"]
+        Resource = "${aws_s3_bucket.processed_zone.arn}/_raw_state/*"
+      },
+      {
+        # DIM_DATE_MODE / TRANSFORM_FACT_MODE watermarks under _transform_state/
+        Effect   = "Allow"
+        Action   = "s3:GetObject"
+        Resource = "${aws_s3_bucket.processed_zone.arn}/_transform_state/*"
+      },
+      {
+        Effect   = "Allow"
+        Action   = "s3:ListBucket"
+        Resource = aws_s3_bucket.processed_zone.arn
+      },
       {
         Effect     = "Allow"
         Action     = "sqs:SendMessage"
@@ -156,6 +209,27 @@ resource "aws_iam_role_policy" "transform_lambda_s3_permissions" {
 
 # Loading Lambda S3 permissions
 
+resource "aws_iam_role_policy" "transform_lambda_sqs_events" {
+  count = var.transform_batching ? 1 : 0
+  name  = "${var.project_name}-transform-sqs-events"
+  role  = aws_iam_role.transform_lambda_role.id
+
+  policy = jsonencode({
+    Version = "2012-10-17"
+    Statement = [
+      {
+        Effect = "Allow"
+        Action = [
+          "sqs:ReceiveMessage",
+          "sqs:DeleteMessage",
+          "sqs:GetQueueAttributes",
+        ]
+        Resource = aws_sqs_queue.transform_events[0].arn
+      }
+    ]
+  })
+}
+
 resource "aws_iam_role_policy" "loading_lambda_s3_permissions" {
   name = "${var.project_name}-loading-lambda-s3-permissions"
   role = aws_iam_role.loading_lambda_role.id
@@ -12,3 +12,11 @@ resource "aws_lambda_layer_version" "dependencies" {
   description         = "Python dependencies for ingestion lambda"
 }
 
+
+resource "aws_lambda_layer_version" "transform_dependencies" {
+  layer_name          = "${var.project_name}-transform-dependencies"
+  filename            = "${path.module}/../dist/transform_layer.zip"
+  source_code_hash    = filebase64sha256("${path.module}/../dist/transform_layer.zip")
+  compatible_runtimes = ["python3.11"]
+  description         = "duckdb and its httpfs extension for TRANSFORM_ENGINE=duckdb"
+}
@@ -51,6 +51,7 @@ resource "aws_lambda_function" "loading" {
       ENVIRONMENT           = var.environment
       DW_SECRET_ARN         = aws_secretsmanager_secret.dw_creds.arn
       LOG_LEVEL             = "INFO"
+      S3_DISK_CACHE         = "true"
     }
   }
 
@@ -31,7 +31,10 @@ resource "aws_lambda_function" "transform" {
 
   architectures = ["x86_64"]
 
-  layers = ["arn:aws:lambda:eu-west-2:336392948345:layer:AWSSDKPandas-Python311:24"]
+  layers = [
+    "arn:aws:lambda:eu-west-2:336392948345:layer:AWSSDKPandas-Python311:24",
+    aws_lambda_layer_version.transform_dependencies.arn
+  ]
 
 
 
@@ -44,6 +47,10 @@ resource "aws_lambda_function" "transform" {
       PROCESSED_BUCKET_NAME = aws_s3_bucket.processed_zone.bucket
       ENVIRONMENT           = var.environment
       LOG_LEVEL             = "INFO"
+      S3_DISK_CACHE         = "true"
+      TRANSFORM_TABLE_CACHE = "true"
+      DUCKDB_EXTENSION_DIR  = "/opt/duckdb_extensions"
+      COMPACTION_ARCHIVE    = tostring(var.compaction_archive)
     }
   }
 
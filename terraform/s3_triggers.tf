@@ -7,16 +7,91 @@ resource "aws_lambda_permission" "allow_s3_invoke_transform" {
 }
 
 
+locals {
+  landing_raw_suffixes = [".json", ".jsonl", ".parquet"]
+}
+
+# Without batching every landing file invokes the transform Lambda directly;
+# with var.transform_batching the events are queued and delivered in batches
 resource "aws_s3_bucket_notification" "landing_triggers_transform" {
   bucket = aws_s3_bucket.landing_zone.id
 
-  lambda_function {
-    lambda_function_arn = aws_lambda_function.transform.arn
-    events              = ["s3:ObjectCreated:*"]
-    filter_suffix       = ".json"
+  dynamic "lambda_function" {
+    for_each = var.transform_batching ? [] : local.landing_raw_suffixes
+    content {
+      lambda_function_arn = aws_lambda_function.transform.arn
+      events              = ["s3:ObjectCreated:*"]
+      filter_suffix       = lambda_function.value
+    }
+  }
+
+  dynamic "queue" {
+    for_each = var.transform_batching ? local.landing_raw_suffixes : []
+    content {
+      queue_arn     = aws_sqs_queue.transform_events[0].arn
+      events        = ["s3:ObjectCreated:*"]
+      filter_suffix = queue.value
+    }
+  }
+
+  depends_on = [
+    aws_lambda_permission.allow_s3_invoke_transform,
+    aws_sqs_queue_policy.transform_events,
+  ]
+}
+
+resource "aws_sqs_queue" "transform_events" {
+  count = var.transform_batching ? 1 : 0
+
+  name                       = "${var.project_name}-transform-events-${var.environment}"
+  visibility_timeout_seconds = var.lambda_timeout * 6
+  message_retention_seconds  = 86400 # 1 day
+
+  redrive_policy = jsonencode({
+    deadLetterTargetArn = aws_sqs_queue.transform_dlq.arn
+    maxReceiveCount     = 3
+  })
+
+  tags = {
+    Name    = "${var.project_name}-transform-events"
+    Stage   = "Week2-Transform"
+    Project = var.project_name
   }
+}
+
+resource "aws_sqs_queue_policy" "transform_events" {
+  count     = var.transform_batching ? 1 : 0
+  queue_url = aws_sqs_queue.transform_events[0].id
 
-  depends_on = [aws_lambda_permission.allow_s3_invoke_transform]
+  policy = jsonencode({
+    Version = "2012-10-17"
+    Statement = [
+      {
+        Effect    = "Allow"
+        Principal = { Service = "s3.amazonaws.com" }
+        Action    = "sqs:SendMessage"
+        Resource  = aws_sqs_queue.transform_events[0].arn
+        Condition = {
+          ArnEquals = { "aws:SourceArn" = aws_s3_bucket.landing_zone.arn }
+        }
+      }
+    ]
+  })
+}
+
+resource "aws_lambda_event_source_mapping" "transform_events" {
+  count = var.transform_batching ? 1 : 0
+
+  event_source_arn                   = aws_sqs_queue.transform_events[0].arn
+  function_name                      = aws_lambda_function.transform.arn
+  batch_size                         = 100
+  maximum_batching_window_in_seconds = var.transform_batch_window
+
+  scaling_config {
+    # the lowest SQS allows: events pile into few large batches instead of
+    # fanning out into many small concurrent runs
+    maximum_concurrency = 2
+  }
 }
 
 
@@ -50,6 +50,30 @@ variable "ingestion_schedule" {
   default     = "rate(15 minutes)"
 }
 
+variable "compaction_schedule" {
+  description = "EventBridge schedule expression for raw-zone compaction"
+  type        = string
+  default     = "rate(1 day)"
+}
+
+variable "compaction_archive" {
+  description = "Move raw landing files folded into a compacted snapshot under _archive/ (COMPACTION_ARCHIVE)"
+  type        = bool
+  default     = false
+}
+
+variable "transform_batching" {
+  description = "Queue landing-zone events in SQS and invoke the transform Lambda once per batch"
+  type        = bool
+  default     = false
+}
+
+variable "transform_batch_window" {
+  description = "Seconds SQS gathers landing-zone events before invoking the transform Lambda"
+  type        = number
+  default     = 60
+}
+
 # warehouse variables
 variable "dw_db_username" {
   description = "Data warehouse database username"
@@ -0,0 +1,83 @@
+import json
+import os
+
+import boto3
+import pandas as pd
+import pytest
+from moto import mock_aws
+
+from common.disk_cache import DiskCache, read_through
+
+
+@pytest.fixture
+def s3():
+    with mock_aws():
+        client = boto3.client("s3", region_name="us-east-1")
+        client.create_bucket(Bucket="bkt")
+        yield client
+
+
+def decode(body):
+    return pd.DataFrame(json.loads(body))
+
+
+def test_read_through_serves_unchanged_object_from_disk(s3, tmp_path):
+    cache = DiskCache(str(tmp_path))
+    s3.put_object(Bucket="bkt", Key="staff/raw.json", Body=json.dumps([{"staff_id": 1}]))
+    decoded = []
+
+    def counting_decode(body):
+        decoded.append(body)
+        return decode(body)
+
+    first = read_through(s3, "bkt", "staff/raw.json", counting_decode, cache=cache)
+    second = read_through(s3, "bkt", "staff/raw.json", counting_decode, cache=cache)
+
+    assert len(decoded) == 1
+    pd.testing.assert_frame_equal(first, second)
+
+    # a new version of the object (new ETag) is downloaded again
+    s3.put_object(Bucket="bkt", Key="staff/raw.json", Body=json.dumps([{"staff_id": 2}]))
+    third = read_through(s3, "bkt", "staff/raw.json", counting_decode, cache=cache)
+    assert list(third["staff_id"]) == [2]
+    assert len(decoded) == 2
+    assert len(list(tmp_path.glob("*.arrow"))) == 1
+
+
+def test_cache_evicts_least_recently_used_and_survives_restart(s3, tmp_path):
+    df = pd.DataFrame({"value": range(1000)})
+    probe = DiskCache(str(tmp_path / "probe"))
+    probe.put("bkt", "probe", '"e0"', df)
+    entry_size = probe._total
+
+    cache = DiskCache(str(tmp_path / "cache"), max_bytes=int(entry_size * 2.5))
+    cache.put("bkt", "a", '"e1"', df)
+    cache.put("bkt", "b", '"e2"', df)
+    assert cache.get("bkt", "a", '"e1"') is not None  # a is now most recent
+    cache.put("bkt", "c", '"e3"', df)
+
+    assert cache.get("bkt", "b", '"e2"') is None
+    assert cache.get("bkt", "a", '"e1"') is not None
+
+    # a new process rebuilds the index from the warm directory
+    reopened = DiskCache(str(tmp_path / "cache"), max_bytes=cache.max_bytes)
+    assert reopened.etag("bkt", "c") == '"e3"'
+    pd.testing.assert_frame_equal(reopened.get("bkt", "c", '"e3"'), df)
+
+
+def test_scan_removes_tmp_files_of_dead_writers(tmp_path):
+    import subprocess
+
+    dead = subprocess.Popen(["true"])
+    dead.wait()
+    orphan = tmp_path / f"abc.e1.arrow.{dead.pid}.1.tmp"
+    legacy = tmp_path / "abc.e1.arrow.12345.tmp"
+    live = tmp_path / f"abc.e1.arrow.{os.getpid()}.1.tmp"
+    for path in (orphan, legacy, live):
+        path.write_bytes(b"partial")
+
+    DiskCache(str(tmp_path))
+
+    assert not orphan.exists() and not legacy.exists()
+    # a put still in progress in this process is left alone
+    assert live.exists()
@@ -0,0 +1,50 @@
+import json
+
+from common import resources
+
+
+def test_get_client_is_cached_per_service(mocker):
+    client_factory = mocker.patch("boto3.client", side_effect=lambda service: mocker.Mock(name=service))
+
+    s3_a = resources.get_client("s3")
+    s3_b = resources.get_client("s3")
+    sm = resources.get_client("secretsmanager")
+
+    assert s3_a is s3_b
+    assert sm is not s3_a
+    assert client_factory.call_count == 2
+
+
+def test_get_secret_is_cached_until_ttl(mocker):
+    sm = mocker.Mock()
+    sm.get_secret_value.return_value = {"SecretString": json.dumps({"host": "db"})}
+    mocker.patch("boto3.client", return_value=sm)
+    clock = mocker.patch("common.resources.time.monotonic", return_value=100.0)
+
+    assert resources.get_secret("arn:secret") == {"host": "db"}
+    assert resources.get_secret("arn:secret") == {"host": "db"}
+    assert sm.get_secret_value.call_count == 1
+
+    clock.return_value = 100.0 + resources.SECRET_TTL_SECONDS + 1
+    resources.get_secret("arn:secret")
+    assert sm.get_secret_value.call_count == 2
+
+
+def test_get_secret_reads_secret_binary(mocker):
+    sm = mocker.Mock()
+    sm.get_secret_value.return_value = {"SecretBinary": json.dumps({"host": "db"}).encode("utf-8")}
+    mocker.patch("boto3.client", return_value=sm)
+
+    assert resources.get_secret("arn:secret") == {"host": "db"}
+
+
+def test_release_closes_connections_beyond_idle_limit(mocker):
+    mocker.patch.object(resources, "MAX_IDLE_CONNECTIONS", 1)
+    kept, surplus = mocker.Mock(), mocker.Mock()
+
+    resources.release_connection("db", kept)
+    resources.release_connection("db", surplus)
+
+    surplus.close.assert_called_once()
+    kept.close.assert_not_called()
+    assert resources.acquire_connection("db", connect=mocker.Mock(), ping=mocker.Mock()) is kept
@@ -0,0 +1,11 @@
+import pytest
+
+from common import resources
+
+
+@pytest.fixture(autouse=True)
+def reset_resource_registry():
+    # cached clients/connections must not leak between tests
+    resources.clear()
+    yield
+    resources.clear()
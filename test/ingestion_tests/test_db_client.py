@@ -1,7 +1,8 @@
 import os
 import pytest
+from datetime import datetime, timezone
 from unittest.mock import MagicMock
-from ingestion.db_client import DatabaseClient
+from ingestion.db_client import DatabaseClient, clear_catalog_cache, CATALOG_TTL_SECONDS
 
 
 def test_db_client_initialises_correctly(mocker):
@@ -93,7 +94,7 @@ def test_fetch_preview_calls_run_with_limit(mocker):
     assert isinstance(result, dict)
 
 
-def test_close_calls_connection_close(mocker):
+def test_close_releases_connection_for_next_client(mocker):
     mocker.patch.dict(
         os.environ,
         {
@@ -106,9 +107,246 @@ def test_close_calls_connection_close(mocker):
     )
 
     fake_conn = mocker.Mock()
-    mocker.patch("ingestion.db_client.Connection", return_value=fake_conn)
+    connection = mocker.patch("ingestion.db_client.Connection", return_value=fake_conn)
 
     client = DatabaseClient()
     client.close()
 
-    fake_conn.close.assert_called_once()
+    # kept open for the next (warm) invocation, which health-checks it
+    fake_conn.close.assert_not_called()
+    reused = DatabaseClient()
+    assert reused.conn is fake_conn
+    connection.assert_called_once()
+    fake_conn.run.assert_called_once_with("SELECT 1")
+
+
+def test_stale_connection_is_replaced(mocker):
+    mocker.patch.dict(
+        os.environ,
+        {
+            "DB_HOST": "localhost",
+            "DB_NAME": "testdb",
+            "DB_USER": "user",
+            "DB_PASSWORD": "pass",
+            "DB_PORT": "5432",
+        },
+    )
+
+    stale_conn = mocker.Mock()
+    fresh_conn = mocker.Mock()
+    mocker.patch("ingestion.db_client.Connection", side_effect=[stale_conn, fresh_conn])
+
+    DatabaseClient().close()
+    stale_conn.run.side_effect = Exception("server closed the connection")
+
+    client = DatabaseClient()
+
+    assert client.conn is fresh_conn
+    stale_conn.close.assert_called_once()
+
+
+def test_stream_fetches_batches_through_named_cursor(mocker):
+    mocker.patch.dict(
+        os.environ,
+        {
+            "DB_HOST": "localhost",
+            "DB_NAME": "testdb",
+            "DB_USER": "user",
+            "DB_PASSWORD": "pass",
+            "DB_PORT": "5432",
+        },
+    )
+
+    fake_conn = mocker.Mock()
+    fake_conn.columns = [{"name": "id"}]
+    fetches = iter([[(1,), (2,)], [(3,)], []])
+
+    def fake_run(sql, **params):
+        if sql.startswith("FETCH"):
+            return next(fetches)
+        return []
+
+    fake_conn.run.side_effect = fake_run
+    mocker.patch("ingestion.db_client.Connection", return_value=fake_conn)
+
+    client = DatabaseClient()
+    batches = list(client.stream("SELECT * FROM staff;", batch_size=2))
+
+    assert batches == [[{"id": 1}, {"id": 2}], [{"id": 3}]]
+    statements = [c.args[0] for c in fake_conn.run.call_args_list]
+    assert statements[0] == "BEGIN"
+    assert statements[1].startswith("DECLARE ingest_cursor_")
+    assert statements[1].endswith("CURSOR FOR SELECT * FROM staff")
+    assert statements[2].startswith("FETCH FORWARD 2 FROM ingest_cursor_")
+    assert statements[-1] == "COMMIT"
+
+
+def test_stream_rolls_back_on_error(mocker):
+    mocker.patch.dict(
+        os.environ,
+        {
+            "DB_HOST": "localhost",
+            "DB_NAME": "testdb",
+            "DB_USER": "user",
+            "DB_PASSWORD": "pass",
+            "DB_PORT": "5432",
+        },
+    )
+
+    fake_conn = mocker.Mock()
+
+    def fake_run(sql, **params):
+        if sql.startswith("FETCH"):
+            raise Exception("connection lost")
+        return []
+
+    fake_conn.run.side_effect = fake_run
+    mocker.patch("ingestion.db_client.Connection", return_value=fake_conn)
+
+    client = DatabaseClient()
+
+    with pytest.raises(Exception, match="connection lost"):
+        list(client.stream("SELECT * FROM staff", batch_size=2))
+
+    assert fake_conn.run.call_args_list[-1].args[0] == "ROLLBACK"
+
+
+def test_catalog_snapshot_answers_all_catalog_lookups_with_one_query(mocker):
+    mocker.patch.dict(
+        os.environ,
+        {
+            "DB_HOST": "localhost",
+            "DB_NAME": "testdb",
+            "DB_USER": "user",
+            "DB_PASSWORD": "pass",
+            "DB_PORT": "5432",
+        },
+    )
+    clear_catalog_cache()
+
+    fake_conn = mocker.Mock()
+    fake_conn.run.return_value = [
+        ("currency", "currency_id", "integer", None, None, None),
+        ("currency", "last_updated", "timestamp without time zone", None, None, None),
+        ("staff", "staff_id", "integer", None, None, 1),
+        ("staff", "created_at", "timestamp without time zone", None, None, None),
+        ("staff", "last_updated", "timestamp without time zone", None, None, None),
+    ]
+    fake_conn.columns = [
+        {"name": "table_name"},
+        {"name": "column_name"},
+        {"name": "data_type"},
+        {"name": "numeric_precision"},
+        {"name": "numeric_scale"},
+        {"name": "primary_key_position"},
+    ]
+    mocker.patch("ingestion.db_client.Connection", return_value=fake_conn)
+
+    client = DatabaseClient()
+
+    assert client.list_tables() == ["currency", "staff"]
+    assert client.get_columns("currency") == [
+        {"column_name": "currency_id", "data_type": "integer"},
+        {"column_name": "last_updated", "data_type": "timestamp without time zone"},
+    ]
+    assert client.infer_timestamp_column("staff") == "last_updated"
+    assert client.infer_timestamp_column("currency") == "last_updated"
+    assert client.get_primary_key("staff") == ["staff_id"]
+    assert client.get_primary_key("currency") == []
+
+    # a second client on the same database reuses the module-level snapshot
+    DatabaseClient().list_tables()
+
+    fake_conn.run.assert_called_once()
+    clear_catalog_cache()
+
+
+def test_catalog_snapshot_reloads_after_ttl(mocker):
+    mocker.patch.dict(
+        os.environ,
+        {
+            "DB_HOST": "localhost",
+            "DB_NAME": "testdb",
+            "DB_USER": "user",
+            "DB_PASSWORD": "pass",
+            "DB_PORT": "5432",
+        },
+    )
+    clear_catalog_cache()
+
+    fake_conn = mocker.Mock()
+    fake_conn.run.return_value = [("currency", "currency_id", "integer", None, None)]
+    fake_conn.columns = [
+        {"name": "table_name"},
+        {"name": "column_name"},
+        {"name": "data_type"},
+        {"name": "numeric_precision"},
+        {"name": "numeric_scale"},
+    ]
+    mocker.patch("ingestion.db_client.Connection", return_value=fake_conn)
+    clock = mocker.patch("ingestion.db_client.time.monotonic", return_value=1000.0)
+
+    client = DatabaseClient()
+    client.list_tables()
+    clock.return_value = 1000.0 + CATALOG_TTL_SECONDS + 1
+    client.list_tables()
+
+    assert fake_conn.run.call_count == 2
+    clear_catalog_cache()
+
+
+
+def test_catalog_snapshot_is_not_shared_between_users(mocker):
+    mocker.patch.dict(
+        os.environ,
+        {
+            "DB_HOST": "localhost",
+            "DB_NAME": "testdb",
+            "DB_USER": "reader",
+            "DB_PASSWORD": "pass",
+            "DB_PORT": "5432",
+        },
+    )
+    clear_catalog_cache()
+
+    fake_conn = mocker.Mock()
+    fake_conn.run.return_value = [("currency", "currency_id", "integer", None, None)]
+    fake_conn.columns = [
+        {"name": "table_name"},
+        {"name": "column_name"},
+        {"name": "data_type"},
+        {"name": "numeric_precision"},
+        {"name": "numeric_scale"},
+    ]
+    mocker.patch("ingestion.db_client.Connection", return_value=fake_conn)
+
+    DatabaseClient().list_tables()
+    mocker.patch.dict(os.environ, {"DB_USER": "admin"})
+    DatabaseClient().list_tables()
+
+    assert fake_conn.run.call_count == 2
+    clear_catalog_cache()
+
+def test_fetch_changes_resumes_after_composite_watermark(mocker):
+    mocker.patch.dict(
+        os.environ,
+        {
+            "DB_HOST": "localhost",
+            "DB_NAME": "testdb",
+            "DB_USER": "user",
+            "DB_PASSWORD": "pass",
+            "DB_PORT": "5432",
+        },
+    )
+    mocker.patch("ingestion.db_client.Connection")
+    client = DatabaseClient()
+    mocker.patch.object(client, "infer_timestamp_column", return_value="last_updated")
+    run = mocker.patch.object(client, "run", return_value=[])
+    since = datetime(2025, 1, 1, tzinfo=timezone.utc)
+
+    client.fetch_changes("staff", since=since, key_column="staff_id", after_key=42)
+
+    sql, params = run.call_args.args
+    assert "(last_updated, staff_id) > (:since, :after_key)" in sql
+    assert "ORDER BY last_updated ASC, staff_id ASC" in sql
+    assert params == {"since": since, "after_key": 42}
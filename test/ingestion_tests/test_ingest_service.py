@@ -78,29 +78,33 @@ def test_ingest_table_changes_success_updates_checkpoint(mocker):
     mock_s3 = mocker.patch("ingestion.ingest_service.S3Client")
     fake_db_instance = mock_db.return_value
     fake_s3_instance = mock_s3.return_value
-    fake_s3_instance.get_checkpoint.return_value = "2025-01-01T00:00:00+00:00"
+    fake_s3_instance.get_checkpoint_state.return_value = ("2025-01-01T00:00:00+00:00", None)
     ts1 = datetime(2025, 1, 2, 10, 0, 0, tzinfo=timezone.utc)
     ts2 = datetime(2025, 1, 3, 11, 0, 0, tzinfo=timezone.utc)
-    fake_db_instance.fetch_changes.return_value = [
+    rows = [
         {"id": 1, "updated_at": ts1},
         {"id": 2, "updated_at": ts2},
     ]
+    fake_db_instance.fetch_changes.return_value = iter([rows])
     fake_db_instance.infer_timestamp_column.return_value = "updated_at"
-    fake_s3_instance.write_json.return_value = "staff/changes_2025-01-03.json"
-    service = IngestionService(bucket="test-bucket")
+    writer = fake_s3_instance.open_stream.return_value
+    writer.row_count = 2
+    writer.close.return_value = "staff/changes_2025-01-03.json"
+    service = IngestionService(bucket="test-bucket", batch_size=100)
     result = service.ingest_table_changes("staff")
     assert result["table"] == "staff"
     assert result["row_count"] == 2
     assert result["s3_key"] == "staff/changes_2025-01-03.json"
     assert result["checkpoint"] == ts2.isoformat()
-    fake_s3_instance.get_checkpoint.assert_called_once_with("staff")
-    fake_db_instance.fetch_changes.assert_called_once_with("staff", since="2025-01-01T00:00:00+00:00")
-    fake_s3_instance.write_json.assert_called_once_with(
-        table_name="staff",
-        data=fake_db_instance.fetch_changes.return_value,
-    )
+    fake_s3_instance.get_checkpoint_state.assert_called_once_with("staff")
+    fake_db_instance.fetch_changes.assert_called_once_with(
+        "staff", since="2025-01-01T00:00:00+00:00", stream=True, batch_size=100,
+        key_column=None, after_key=None)
+    fake_s3_instance.open_stream.assert_called_once_with("staff", columns=None)
+    writer.write_rows.assert_called_once_with(rows)
+    writer.close.assert_called_once()
     fake_db_instance.infer_timestamp_column.assert_called_once_with("staff")
-    fake_s3_instance.write_checkpoint.assert_called_once_with("staff", timestamp=ts2)
+    fake_s3_instance.write_checkpoint.assert_called_once_with("staff", timestamp=ts2, resume_key=None)
 
 
 def test_ingest_table_changes_no_changes_skips_upload(mocker):
@@ -108,9 +112,10 @@ def test_ingest_table_changes_no_changes_skips_upload(mocker):
     mock_s3 = mocker.patch("ingestion.ingest_service.S3Client")
     fake_db_instance = mock_db.return_value
     fake_s3_instance = mock_s3.return_value
-    fake_s3_instance.get_checkpoint.return_value = "2025-01-01T00:00:00+00:00"
-    fake_db_instance.fetch_changes.return_value = []
-    service = IngestionService(bucket="test-bucket")
+    fake_s3_instance.get_checkpoint_state.return_value = ("2025-01-01T00:00:00+00:00", None)
+    fake_db_instance.fetch_changes.return_value = iter([])
+    fake_s3_instance.open_stream.return_value.row_count = 0
+    service = IngestionService(bucket="test-bucket", batch_size=100)
     result = service.ingest_table_changes("staff")
     assert result == {
         "table": "staff",
@@ -118,8 +123,10 @@ def test_ingest_table_changes_no_changes_skips_upload(mocker):
         "s3_key": None,
         "status": "no_changes",
     }
-    fake_db_instance.fetch_changes.assert_called_once_with("staff", since="2025-01-01T00:00:00+00:00")
-    fake_s3_instance.write_json.assert_not_called()
+    fake_db_instance.fetch_changes.assert_called_once_with(
+        "staff", since="2025-01-01T00:00:00+00:00", stream=True, batch_size=100,
+        key_column=None, after_key=None)
+    fake_s3_instance.open_stream.return_value.close.assert_not_called()
     fake_s3_instance.write_checkpoint.assert_not_called()
 
 
@@ -128,10 +135,11 @@ def test_ingest_table_changes_no_timestamp_column_checkpoint_none(mocker):
     mock_s3 = mocker.patch("ingestion.ingest_service.S3Client")
     fake_db_instance = mock_db.return_value
     fake_s3_instance = mock_s3.return_value
-    fake_s3_instance.get_checkpoint.return_value = None
-    fake_db_instance.fetch_changes.return_value = [{"id": 1}, {"id": 2}]
+    fake_s3_instance.get_checkpoint_state.return_value = (None, None)
+    fake_db_instance.fetch_changes.return_value = iter([[{"id": 1}, {"id": 2}]])
     fake_db_instance.infer_timestamp_column.return_value = None
-    fake_s3_instance.write_json.return_value = "staff/changes.json"
+    fake_s3_instance.open_stream.return_value.row_count = 2
+    fake_s3_instance.open_stream.return_value.close.return_value = "staff/changes.json"
     service = IngestionService(bucket="test-bucket")
     result = service.ingest_table_changes("staff")
     assert result["table"] == "staff"
@@ -143,10 +151,332 @@ def test_ingest_table_changes_no_timestamp_column_checkpoint_none(mocker):
 
 def test_ingest_table_changes_handles_error(mocker):
     mock_db = mocker.patch("ingestion.ingest_service.DatabaseClient")
-    mocker.patch("ingestion.ingest_service.S3Client")
+    mock_s3 = mocker.patch("ingestion.ingest_service.S3Client")
+    mock_s3.return_value.get_checkpoint_state.return_value = (None, None)
     fake_db_instance = mock_db.return_value
     fake_db_instance.fetch_changes.side_effect = Exception("DB failed!")
     service = IngestionService(bucket="test-bucket")
     with pytest.raises(Exception) as exc_info:
         service.ingest_table_changes("staff")
     assert "DB failed!" in str(exc_info.value)
+
+
+def test_ingest_table_changes_streams_every_batch_into_one_object(mocker):
+    mock_db = mocker.patch("ingestion.ingest_service.DatabaseClient")
+    mock_s3 = mocker.patch("ingestion.ingest_service.S3Client")
+    fake_db_instance = mock_db.return_value
+    fake_s3_instance = mock_s3.return_value
+    fake_s3_instance.get_checkpoint_state.return_value = (None, None)
+    ts1 = datetime(2025, 1, 2, 10, 0, 0, tzinfo=timezone.utc)
+    ts2 = datetime(2025, 1, 3, 11, 0, 0, tzinfo=timezone.utc)
+    ts3 = datetime(2025, 1, 4, 12, 0, 0, tzinfo=timezone.utc)
+    batch1 = [{"id": 1, "updated_at": ts1}, {"id": 2, "updated_at": ts2}]
+    batch2 = [{"id": 3, "updated_at": ts3}]
+    fake_db_instance.fetch_changes.return_value = iter([batch1, batch2])
+    fake_db_instance.infer_timestamp_column.return_value = "updated_at"
+    writer = fake_s3_instance.open_stream.return_value
+    writer.row_count = 3
+    writer.close.return_value = "staff/raw.jsonl"
+    service = IngestionService(bucket="test-bucket", batch_size=2)
+    result = service.ingest_table_changes("staff")
+    assert result["row_count"] == 3
+    assert result["s3_key"] == "staff/raw.jsonl"
+    assert [c.args[0] for c in writer.write_rows.call_args_list] == [batch1, batch2]
+    writer.close.assert_called_once()
+    fake_s3_instance.write_checkpoint.assert_called_once_with("staff", timestamp=ts3, resume_key=None)
+
+
+def test_ingest_table_changes_aborts_stream_when_extract_fails(mocker):
+    mock_db = mocker.patch("ingestion.ingest_service.DatabaseClient")
+    mock_s3 = mocker.patch("ingestion.ingest_service.S3Client")
+    fake_db_instance = mock_db.return_value
+    fake_s3_instance = mock_s3.return_value
+    fake_s3_instance.get_checkpoint_state.return_value = (None, None)
+
+    def failing_batches():
+        yield [{"id": 1}]
+        raise Exception("cursor lost")
+
+    fake_db_instance.fetch_changes.return_value = failing_batches()
+    fake_db_instance.infer_timestamp_column.return_value = None
+    writer = fake_s3_instance.open_stream.return_value
+    service = IngestionService(bucket="test-bucket")
+    with pytest.raises(Exception, match="cursor lost"):
+        service.ingest_table_changes("staff")
+    writer.abort.assert_called_once()
+    writer.close.assert_not_called()
+
+
+def test_ingest_all_tables_parallel_isolates_errors_and_keeps_order(mocker):
+    worker_dbs = []
+
+    def make_db():
+        db = mocker.Mock()
+        db.list_tables.return_value = ["currency", "staff", "_prisma_migrations", "design"]
+        worker_dbs.append(db)
+        return db
+
+    mocker.patch("ingestion.ingest_service.DatabaseClient", side_effect=make_db)
+    mocker.patch("ingestion.ingest_service.S3Client")
+    service = IngestionService(bucket="test-bucket", max_workers=2)
+
+    def fake_ingest(table_name, db=None, checkpoints=None, resume_keys=None):
+        if table_name == "staff":
+            raise Exception("boom")
+        return {"table": table_name, "row_count": 1}
+
+    mocker.patch.object(service, "ingest_table_changes", side_effect=fake_ingest)
+
+    results = service.ingest_all_tables()
+
+    assert list(results.keys()) == ["currency", "staff", "design"]
+    assert results["currency"] == {"status": "success", "table": "currency", "row_count": 1}
+    assert results["staff"] == {"status": "error", "error": "boom"}
+    assert results["design"]["status"] == "success"
+
+    # main connection + at most one connection per worker, all closed after the run
+    opened_by_workers = worker_dbs[1:]
+    assert 1 <= len(opened_by_workers) <= 2
+    for db in opened_by_workers:
+        db.close.assert_called_once()
+    for call in service.ingest_table_changes.call_args_list:
+        assert call.kwargs["db"] in opened_by_workers
+
+
+def test_ingest_all_tables_single_worker_uses_main_connection(mocker):
+    mock_db = mocker.patch("ingestion.ingest_service.DatabaseClient")
+    mocker.patch("ingestion.ingest_service.S3Client")
+    service = IngestionService(bucket="test-bucket", max_workers=1)
+    mocker.patch.object(service, "ingest_table_changes", return_value={"row_count": 0})
+
+    results = service.ingest_all_tables(tables=["currency", "staff"])
+
+    assert results == {
+        "currency": {"status": "success", "row_count": 0},
+        "staff": {"status": "success", "row_count": 0},
+    }
+    mock_db.assert_called_once()
+    for call in service.ingest_table_changes.call_args_list:
+        assert call.kwargs["db"] is service.db
+
+
+def test_ingest_all_tables_with_manifest_reads_and_writes_once(mocker):
+    mock_db = mocker.patch("ingestion.ingest_service.DatabaseClient")
+    mock_s3 = mocker.patch("ingestion.ingest_service.S3Client")
+    fake_db_instance = mock_db.return_value
+    fake_s3_instance = mock_s3.return_value
+    staff_ckpt = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    legacy_ckpt = datetime(2024, 12, 1, tzinfo=timezone.utc)
+    new_ts = datetime(2025, 1, 5, tzinfo=timezone.utc)
+    fake_s3_instance.get_checkpoint_manifest.return_value = ({"staff": staff_ckpt}, {}, '"etag-1"')
+    # "currency" is not in the manifest yet -> migrated from its legacy file
+    fake_s3_instance.get_checkpoint_state.return_value = (legacy_ckpt, None)
+    fake_s3_instance.write_checkpoint_manifest.return_value = '"etag-2"'
+
+    def fake_fetch(table_name, since=None, stream=True, batch_size=None, key_column=None, after_key=None):
+        if table_name == "staff":
+            return iter([[{"id": 1, "last_updated": new_ts}]])
+        return iter([])
+
+    fake_db_instance.fetch_changes.side_effect = fake_fetch
+    fake_db_instance.infer_timestamp_column.return_value = "last_updated"
+    fake_s3_instance.open_stream.return_value.row_count = 1
+
+    service = IngestionService(bucket="test-bucket", max_workers=1, use_manifest=True)
+    results = service.ingest_all_tables(tables=["staff", "currency"])
+
+    assert results["staff"]["status"] == "success"
+    fake_s3_instance.get_checkpoint_manifest.assert_called_once()
+    fake_s3_instance.get_checkpoint_state.assert_called_once_with("currency")
+    fake_s3_instance.write_checkpoint.assert_not_called()
+    fake_s3_instance.write_checkpoint_manifest.assert_called_once_with(
+        {"staff": new_ts, "currency": legacy_ckpt}, etag='"etag-1"', resume_keys={})
+
+
+def test_manifest_conflict_merges_newest_watermarks_and_retries(mocker):
+    mocker.patch("ingestion.ingest_service.DatabaseClient")
+    mock_s3 = mocker.patch("ingestion.ingest_service.S3Client")
+    fake_s3_instance = mock_s3.return_value
+    ours = datetime(2025, 1, 5, tzinfo=timezone.utc)
+    theirs = datetime(2025, 1, 6, tzinfo=timezone.utc)
+    fake_s3_instance.write_checkpoint_manifest.side_effect = [None, '"etag-3"']
+    fake_s3_instance.get_checkpoint_manifest.return_value = (
+        {"staff": theirs, "design": theirs}, {"design": {"column": "design_id", "value": 3}}, '"etag-2"')
+
+    service = IngestionService(bucket="test-bucket", use_manifest=True)
+    checkpoints = {"staff": ours, "currency": ours}
+    service._save_checkpoint_manifest(checkpoints, '"etag-1"')
+
+    last_call = fake_s3_instance.write_checkpoint_manifest.call_args
+    assert last_call.args[0] == {"staff": theirs, "currency": ours, "design": theirs}
+    assert last_call.kwargs["etag"] == '"etag-2"'
+    assert last_call.kwargs["resume_keys"] == {"design": {"column": "design_id", "value": 3}}
+
+
+def _chunked_service(mocker, rows, progress=None, chunk_size=2):
+    mock_db = mocker.patch("ingestion.ingest_service.DatabaseClient")
+    mock_s3 = mocker.patch("ingestion.ingest_service.S3Client")
+    fake_db_instance = mock_db.return_value
+    fake_s3_instance = mock_s3.return_value
+    fake_s3_instance.get_checkpoint_state.return_value = (None, None)
+    fake_s3_instance.get_bootstrap_progress.return_value = progress
+    fake_db_instance.get_primary_key.return_value = ["id"]
+    fake_db_instance.infer_timestamp_column.return_value = "last_updated"
+    fake_db_instance.fetch_max.return_value = datetime(2025, 1, 9, tzinfo=timezone.utc)
+
+    def fake_chunk(table_name, key_column, after=None, limit=None):
+        remaining = [r for r in rows if after is None or r["id"] > after]
+        return remaining[:limit]
+
+    fake_db_instance.fetch_chunk.side_effect = fake_chunk
+    saved = []
+    fake_s3_instance.write_bootstrap_progress.side_effect = lambda table, p: saved.append(dict(p))
+    service = IngestionService(bucket="test-bucket", chunked_full_load=True, chunk_size=chunk_size)
+    return service, fake_db_instance, fake_s3_instance, saved
+
+
+def test_chunked_full_load_writes_numbered_parts_and_saves_progress(mocker):
+    rows = [{"id": i, "last_updated": datetime(2025, 1, i, tzinfo=timezone.utc)} for i in range(1, 6)]
+    service, fake_db, fake_s3, saved = _chunked_service(mocker, rows)
+
+    result = service.ingest_table_changes("staff")
+
+    assert result["mode"] == "chunked_full_load"
+    assert result["row_count"] == 5
+    assert result["parts"] == 3
+    parts = [c.kwargs["part"] for c in fake_s3.open_stream.call_args_list]
+    assert parts == [1, 2, 3]
+    assert len({c.kwargs["timestamp"] for c in fake_s3.open_stream.call_args_list}) == 1
+    assert [p["last_key"] for p in saved] == [2, 4, 5]
+    fake_db.fetch_changes.assert_not_called()
+    # checkpoint is the high watermark taken before the first chunk
+    fake_s3.write_checkpoint.assert_called_once_with(
+        "staff", timestamp=datetime(2025, 1, 9, tzinfo=timezone.utc), resume_key=None)
+    fake_s3.delete_bootstrap_progress.assert_called_once_with("staff")
+
+
+def test_chunked_full_load_resumes_from_saved_progress(mocker):
+    rows = [{"id": i, "last_updated": datetime(2025, 1, i, tzinfo=timezone.utc)} for i in range(1, 6)]
+    progress = {
+        "table": "staff",
+        "key_column": "id",
+        "last_key": 4,
+        "parts_written": 2,
+        "rows_written": 4,
+        "started_at": "2025-01-01T00-00-00",
+        "high_watermark": "2025-01-05T00:00:00+00:00",
+    }
+    service, fake_db, fake_s3, saved = _chunked_service(mocker, rows, progress=progress)
+
+    result = service.ingest_table_changes("staff")
+
+    assert result["row_count"] == 5
+    fake_db.fetch_chunk.assert_any_call("staff", "id", after=4, limit=2)
+    fake_s3.open_stream.assert_called_once_with(
+        "staff", columns=None, timestamp="2025-01-01T00-00-00", part=3)
+    fake_db.fetch_max.assert_not_called()
+    fake_s3.write_checkpoint.assert_called_once_with(
+        "staff", timestamp=datetime(2025, 1, 5, tzinfo=timezone.utc), resume_key=None)
+
+
+def test_chunked_full_load_falls_back_without_single_primary_key(mocker):
+    service, fake_db, fake_s3, _ = _chunked_service(mocker, [])
+    fake_db.get_primary_key.return_value = []
+    fake_db.fetch_changes.return_value = iter([])
+    fake_s3.open_stream.return_value.row_count = 0
+
+    result = service.ingest_table_changes("staff")
+
+    assert result["status"] == "no_changes"
+    fake_db.fetch_chunk.assert_not_called()
+    fake_db.fetch_changes.assert_called_once()
+
+
+def test_ingest_table_changes_stops_on_time_budget_with_composite_watermark(mocker):
+    mock_db = mocker.patch("ingestion.ingest_service.DatabaseClient")
+    mock_s3 = mocker.patch("ingestion.ingest_service.S3Client")
+    fake_db_instance = mock_db.return_value
+    fake_s3_instance = mock_s3.return_value
+    since = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    ts = datetime(2025, 1, 2, tzinfo=timezone.utc)
+    fake_s3_instance.get_checkpoint_state.return_value = (since, {"column": "id", "value": 3})
+    fake_db_instance.get_primary_key.return_value = ["id"]
+    fake_db_instance.infer_timestamp_column.return_value = "updated_at"
+    # every row shares one timestamp: only the key can tell where to resume
+    batch1 = [{"id": 4, "updated_at": ts}, {"id": 5, "updated_at": ts}]
+    batch2 = [{"id": 6, "updated_at": ts}]
+    fake_db_instance.fetch_changes.return_value = iter([batch1, batch2])
+    writer = fake_s3_instance.open_stream.return_value
+    writer.row_count = 2
+    writer.close.return_value = "staff/raw.jsonl"
+    service = IngestionService(bucket="test-bucket", time_reserve_ms=1000)
+    service._time_remaining = lambda: 500
+
+    result = service.ingest_table_changes("staff")
+
+    fake_db_instance.fetch_changes.assert_called_once_with(
+        "staff", since=since, stream=True, batch_size=service.batch_size,
+        key_column="id", after_key=3)
+    writer.write_rows.assert_called_once_with(batch1)
+    writer.close.assert_called_once()
+    assert result["status"] == "partial"
+    assert result["resume_key"] == {"column": "id", "value": 5}
+    fake_s3_instance.write_checkpoint.assert_called_once_with(
+        "staff", timestamp=ts, resume_key={"column": "id", "value": 5})
+
+
+def test_ingest_all_tables_defers_tables_once_time_budget_is_spent(mocker):
+    mocker.patch("ingestion.ingest_service.DatabaseClient")
+    mocker.patch("ingestion.ingest_service.S3Client")
+    service = IngestionService(bucket="test-bucket", max_workers=1, time_reserve_ms=1000)
+    remaining = iter([5000, 500])
+    mocker.patch.object(service, "ingest_table_changes", return_value={"row_count": 1})
+
+    results = service.ingest_all_tables(
+        tables=["currency", "staff"], time_remaining=lambda: next(remaining))
+
+    assert results == {
+        "currency": {"status": "success", "row_count": 1},
+        "staff": {"status": "deferred"},
+    }
+    service.ingest_table_changes.assert_called_once()
+
+
+def test_change_probe_skips_unchanged_tables_and_saves_baseline(mocker):
+    mock_db = mocker.patch("ingestion.ingest_service.DatabaseClient")
+    mock_s3 = mocker.patch("ingestion.ingest_service.S3Client")
+    fake_s3_instance = mock_s3.return_value
+    mock_db.return_value.fetch_change_counters.return_value = {
+        "currency": 10, "staff": 25, "design": 7}
+    fake_s3_instance.get_change_counters.return_value = {"currency": 10, "staff": 20, "design": 6}
+    service = IngestionService(bucket="test-bucket", max_workers=1, change_probe=True)
+
+    def fake_ingest(table_name, db=None, checkpoints=None, resume_keys=None):
+        if table_name == "design":
+            raise Exception("boom")
+        return {"table": table_name, "row_count": 5}
+
+    mocker.patch.object(service, "ingest_table_changes", side_effect=fake_ingest)
+
+    results = service.ingest_all_tables(tables=["currency", "staff", "design"])
+
+    assert list(results) == ["currency", "staff", "design"]
+    assert results["currency"] == {"status": "unchanged"}
+    assert results["staff"]["status"] == "success"
+    assert [c.args[0] for c in service.ingest_table_changes.call_args_list] == ["staff", "design"]
+    # the failed table loses its baseline so the next run reads it again
+    fake_s3_instance.write_change_counters.assert_called_once_with({"currency": 10, "staff": 25})
+
+
+def test_change_probe_failure_ingests_every_table(mocker):
+    mock_db = mocker.patch("ingestion.ingest_service.DatabaseClient")
+    mock_s3 = mocker.patch("ingestion.ingest_service.S3Client")
+    mock_db.return_value.fetch_change_counters.side_effect = Exception("permission denied")
+    service = IngestionService(bucket="test-bucket", max_workers=1, change_probe=True)
+    mocker.patch.object(service, "ingest_table_changes", return_value={"row_count": 0})
+
+    results = service.ingest_all_tables(tables=["currency", "staff"])
+
+    assert service.ingest_table_changes.call_count == 2
+    assert all(r["status"] == "success" for r in results.values())
+    mock_s3.return_value.write_change_counters.assert_not_called()
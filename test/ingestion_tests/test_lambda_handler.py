@@ -28,3 +28,68 @@ def test_lambda_handler(mocker):
     # body = json.loads(response["body"])
 
     # assert response["statusCode"] == 200
+
+
+def test_lambda_handler_passes_time_budget_and_reinvokes_when_pending(mocker):
+    mocker.patch.dict(os.environ, {"LANDING_BUCKET_NAME": "test_bucket"})
+    mocker.patch("ingestion.lambda_handler.SELF_REINVOKE", True)
+    mock_service = mocker.patch("ingestion.lambda_handler.IngestionService")
+    fake_service = mock_service.return_value
+    fake_service.ingest_all_tables.return_value = {
+        "currency": {"status": "success", "row_count": 1},
+        "staff": {"status": "deferred"},
+    }
+    lambda_client = mocker.Mock()
+    mocker.patch("ingestion.lambda_handler.get_client", return_value=lambda_client)
+    context = mocker.Mock(invoked_function_arn="arn:aws:lambda:eu-west-2:1:function:ingest")
+
+    resp = lambda_handler({"reinvocation": 1}, context)
+
+    assert resp["statusCode"] == 200
+    fake_service.ingest_all_tables.assert_called_once_with(
+        tables=None, time_remaining=context.get_remaining_time_in_millis)
+    kwargs = lambda_client.invoke.call_args.kwargs
+    assert kwargs["FunctionName"] == context.invoked_function_arn
+    assert kwargs["InvocationType"] == "Event"
+    assert json.loads(kwargs["Payload"]) == {"reinvocation": 2, "pending": ["staff"]}
+
+
+def test_lambda_handler_stops_reinvoking_after_limit(mocker):
+    mocker.patch.dict(os.environ, {"LANDING_BUCKET_NAME": "test_bucket"})
+    mocker.patch("ingestion.lambda_handler.SELF_REINVOKE", True)
+    mocker.patch("ingestion.lambda_handler.MAX_REINVOCATIONS", 1)
+    mock_service = mocker.patch("ingestion.lambda_handler.IngestionService")
+    mock_service.return_value.ingest_all_tables.return_value = {"staff": {"status": "partial"}}
+    get_client = mocker.patch("ingestion.lambda_handler.get_client")
+
+    lambda_handler({"reinvocation": 1}, mocker.Mock())
+
+    get_client.assert_not_called()
+
+
+def test_lambda_handler_reinvocation_ingests_only_pending_tables(mocker):
+    mocker.patch.dict(os.environ, {"LANDING_BUCKET_NAME": "test_bucket"})
+    mock_service = mocker.patch("ingestion.lambda_handler.IngestionService")
+    fake_service = mock_service.return_value
+    fake_service.ingest_all_tables.return_value = {"staff": {"status": "success"}}
+    context = mocker.Mock()
+
+    lambda_handler({"reinvocation": 1, "pending": ["staff"]}, context)
+
+    fake_service.ingest_all_tables.assert_called_once_with(
+        tables=["staff"], time_remaining=context.get_remaining_time_in_millis)
+
+
+def test_lambda_handler_failed_reinvoke_does_not_fail_the_run(mocker):
+    mocker.patch.dict(os.environ, {"LANDING_BUCKET_NAME": "test_bucket"})
+    mocker.patch("ingestion.lambda_handler.SELF_REINVOKE", True)
+    mock_service = mocker.patch("ingestion.lambda_handler.IngestionService")
+    mock_service.return_value.ingest_all_tables.return_value = {"staff": {"status": "partial"}}
+    lambda_client = mocker.Mock()
+    lambda_client.invoke.side_effect = RuntimeError("throttled")
+    mocker.patch("ingestion.lambda_handler.get_client", return_value=lambda_client)
+
+    resp = lambda_handler({}, mocker.Mock(invoked_function_arn="arn"))
+
+    assert resp["statusCode"] == 200
+    lambda_client.invoke.assert_called_once()
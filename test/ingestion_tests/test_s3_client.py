@@ -4,6 +4,7 @@ from moto import mock_aws
 import boto3
 import json
 import pytest
+from ingestion.s3_client import MIN_PART_SIZE
 
 
 def test_s3_client_initialises_correctly():
@@ -58,3 +59,161 @@ def test_write_json_key_format(mocker):
     key = client.write_json("staff", [])
 
     assert key.startswith("staff/raw_2025-01-01T12-00-00")
+
+
+@mock_aws
+def test_open_stream_small_output_uses_single_put():
+    s3 = boto3.client("s3", region_name="eu-west-2")
+    s3.create_bucket(Bucket="test-bucket", CreateBucketConfiguration={"LocationConstraint": "eu-west-2"})
+
+    client = S3Client(bucket="test-bucket")
+
+    with client.open_stream("staff") as writer:
+        writer.write_rows([{"id": 1, "name": "Yana"}])
+        writer.write_rows([{"id": 2, "name": "Aaron"}])
+    key = writer.key
+
+    assert key.startswith("staff/raw_") and key.endswith(".jsonl")
+    body = s3.get_object(Bucket="test-bucket", Key=key)["Body"].read().decode("utf-8")
+    assert [json.loads(line) for line in body.splitlines()] == [
+        {"id": 1, "name": "Yana"},
+        {"id": 2, "name": "Aaron"},
+    ]
+
+
+@mock_aws
+def test_open_stream_large_output_uses_multipart_upload():
+    s3 = boto3.client("s3", region_name="eu-west-2")
+    s3.create_bucket(Bucket="test-bucket", CreateBucketConfiguration={"LocationConstraint": "eu-west-2"})
+
+    client = S3Client(bucket="test-bucket")
+    rows = [{"id": i, "payload": "x" * 200} for i in range(40000)]
+
+    writer = client.open_stream("sales_order", part_size=MIN_PART_SIZE)
+    for start in range(0, len(rows), 5000):
+        writer.write_rows(rows[start:start + 5000])
+    assert writer._upload_id is not None
+    key = writer.close()
+
+    body = s3.get_object(Bucket="test-bucket", Key=key)["Body"].read().decode("utf-8")
+    lines = body.splitlines()
+    assert len(lines) == 40000
+    assert json.loads(lines[-1])["id"] == 39999
+
+
+def test_open_stream_rejects_parts_below_s3_minimum():
+    client = S3Client(bucket="test-bucket")
+
+    with pytest.raises(ValueError):
+        client.open_stream("staff", part_size=1024)
+
+
+@mock_aws
+def test_checkpoint_manifest_round_trip_is_etag_guarded():
+    s3 = boto3.client("s3", region_name="eu-west-2")
+    s3.create_bucket(Bucket="test-bucket", CreateBucketConfiguration={"LocationConstraint": "eu-west-2"})
+
+    client = S3Client(bucket="test-bucket")
+    assert client.get_checkpoint_manifest() == ({}, {}, None)
+
+    ts = datetime(2025, 1, 1, 12, 0, 0, tzinfo=timezone.utc)
+    etag = client.write_checkpoint_manifest({"staff": ts}, etag=None)
+    assert etag is not None
+
+    checkpoints, resume_keys, read_etag = client.get_checkpoint_manifest()
+    assert checkpoints == {"staff": ts}
+    assert resume_keys == {}
+    assert read_etag == etag
+
+    # creating again, or writing against a stale etag, is refused
+    assert client.write_checkpoint_manifest({"staff": ts}, etag=None) is None
+    newer = client.write_checkpoint_manifest({"staff": ts, "design": ts}, etag=etag)
+    assert newer is not None
+    assert client.write_checkpoint_manifest({"staff": ts}, etag=etag) is None
+
+
+@mock_aws
+def test_checkpoint_round_trips_resume_key():
+    s3 = boto3.client("s3", region_name="eu-west-2")
+    s3.create_bucket(Bucket="test-bucket", CreateBucketConfiguration={"LocationConstraint": "eu-west-2"})
+    client = S3Client(bucket="test-bucket")
+    ts = datetime(2025, 1, 1, 12, 0, 0, tzinfo=timezone.utc)
+
+    assert client.get_checkpoint_state("staff") == (None, None)
+    client.write_checkpoint("staff", ts, resume_key={"column": "staff_id", "value": 7})
+    assert client.get_checkpoint_state("staff") == (ts, {"column": "staff_id", "value": 7})
+    assert client.get_checkpoint("staff") == ts
+
+    # a completed run rewrites the checkpoint without the resume key
+    client.write_checkpoint("staff", ts)
+    assert client.get_checkpoint_state("staff") == (ts, None)
+
+    etag = client.write_checkpoint_manifest(
+        {"staff": ts}, etag=None, resume_keys={"staff": {"column": "staff_id", "value": 7}})
+    assert client.get_checkpoint_manifest() == (
+        {"staff": ts}, {"staff": {"column": "staff_id", "value": 7}}, etag)
+
+
+@mock_aws
+def test_open_stream_parquet_writes_typed_columns():
+    import io
+    from decimal import Decimal
+    import pyarrow.parquet as pq
+
+    s3 = boto3.client("s3", region_name="eu-west-2")
+    s3.create_bucket(Bucket="test-bucket", CreateBucketConfiguration={"LocationConstraint": "eu-west-2"})
+
+    client = S3Client(bucket="test-bucket", landing_format="parquet")
+    columns = [
+        {"column_name": "sales_order_id", "data_type": "integer"},
+        {"column_name": "unit_price", "data_type": "numeric", "numeric_precision": 10, "numeric_scale": 2},
+        {"column_name": "created_at", "data_type": "timestamp without time zone"},
+        {"column_name": "agreed_payment_date", "data_type": "date"},
+        {"column_name": "notes", "data_type": "jsonb"},
+    ]
+    created = datetime(2025, 1, 1, 12, 30, 0)
+
+    with client.open_stream("sales_order", columns=columns) as writer:
+        writer.write_rows([{
+            "sales_order_id": 1,
+            "unit_price": Decimal("3.50"),
+            "created_at": created,
+            "agreed_payment_date": created.date(),
+            "notes": {"rush": True},
+        }])
+    key = writer.key
+
+    assert key.startswith("sales_order/raw_") and key.endswith(".parquet")
+    body = s3.get_object(Bucket="test-bucket", Key=key)["Body"].read()
+    table = pq.read_table(io.BytesIO(body))
+    assert str(table.schema.field("sales_order_id").type) == "int32"
+    assert str(table.schema.field("unit_price").type) == "decimal128(10, 2)"
+    assert str(table.schema.field("created_at").type) == "timestamp[us]"
+    assert str(table.schema.field("agreed_payment_date").type) == "date32[day]"
+    row = table.to_pylist()[0]
+    assert row["unit_price"] == Decimal("3.50")
+    assert row["created_at"] == created
+    assert json.loads(row["notes"]) == {"rush": True}
+
+
+def test_open_stream_parquet_requires_columns():
+    client = S3Client(bucket="test-bucket", landing_format="parquet")
+
+    with pytest.raises(ValueError):
+        client.open_stream("staff")
+
+
+def test_unknown_landing_format_is_rejected():
+    with pytest.raises(ValueError):
+        S3Client(bucket="test-bucket", landing_format="csv")
+
+
+@mock_aws
+def test_change_counters_round_trip():
+    s3 = boto3.client("s3", region_name="eu-west-2")
+    s3.create_bucket(Bucket="test-bucket", CreateBucketConfiguration={"LocationConstraint": "eu-west-2"})
+    client = S3Client(bucket="test-bucket")
+
+    assert client.get_change_counters() == {}
+    client.write_change_counters({"staff": 12, "currency": 3})
+    assert client.get_change_counters() == {"currency": 3, "staff": 12}
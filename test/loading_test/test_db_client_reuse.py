@@ -0,0 +1,62 @@
+import json
+import os
+
+import pytest
+
+from loading.db_client import WarehouseDBClient
+
+
+@pytest.fixture
+def warehouse_env(mocker):
+    mocker.patch.dict(os.environ, {"DW_SECRET_ARN": "arn:aws:secretsmanager:eu-west-2:123:secret:dw"})
+    sm = mocker.Mock()
+    sm.get_secret_value.return_value = {
+        "SecretString": json.dumps(
+            {"host": "dw-host", "port": 5432, "database": "dw", "username": "dw_user", "password": "dw_pass"})
+    }
+    mocker.patch("boto3.client", return_value=sm)
+    return sm
+
+
+def test_connection_is_committed_and_reused_across_invocations(mocker, warehouse_env):
+    fake_conn = mocker.Mock()
+    connect = mocker.patch("loading.db_client.pg8000.dbapi.connect", return_value=fake_conn)
+
+    with WarehouseDBClient() as db:
+        db.execute("SELECT 1")
+    with WarehouseDBClient() as db:
+        assert db.conn is fake_conn
+
+    connect.assert_called_once()
+    assert fake_conn.commit.call_count == 2
+    fake_conn.close.assert_not_called()
+    # secret fetched once for both invocations
+    warehouse_env.get_secret_value.assert_called_once()
+
+
+def test_rollback_still_happens_on_error(mocker, warehouse_env):
+    fake_conn = mocker.Mock()
+    mocker.patch("loading.db_client.pg8000.dbapi.connect", return_value=fake_conn)
+
+    with pytest.raises(RuntimeError):
+        with WarehouseDBClient():
+            raise RuntimeError("load failed")
+
+    fake_conn.rollback.assert_called_once()
+    fake_conn.commit.assert_not_called()
+
+
+def test_connection_is_closed_when_commit_fails(mocker, warehouse_env):
+    broken_conn = mocker.Mock()
+    broken_conn.commit.side_effect = Exception("connection lost")
+    fresh_conn = mocker.Mock()
+    connect = mocker.patch("loading.db_client.pg8000.dbapi.connect", side_effect=[broken_conn, fresh_conn])
+
+    with pytest.raises(Exception, match="connection lost"):
+        with WarehouseDBClient():
+            pass
+    broken_conn.close.assert_called_once()
+
+    with WarehouseDBClient() as db:
+        assert db.conn is fresh_conn
+    assert connect.call_count == 2
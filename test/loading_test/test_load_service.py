@@ -261,3 +261,166 @@ def test_fact_skips_if_latest_key_already_loaded(monkeypatch):
     assert fake_db.executed_sql == []
     assert fake_db.executemany_calls == []
 
+
+
+def test_fact_reads_every_unloaded_delta_file_back_to_full_snapshot(monkeypatch):
+    table = "fact_sales_order"
+    fake_db = FakeDB()
+    fake_s3 = FakeS3LoadingClient()
+
+    def part(name, rows, mode):
+        df = pd.DataFrame([
+            {"order_id": order_id, "last_updated_date": "2026-01-02", "last_updated_time": t}
+            for order_id, t in rows])
+        df.attrs["output_mode"] = mode
+        fake_s3.parquet[f"{table}/{name}.parquet"] = df
+
+    part("part-000", [(1, "09:00:00")], "full")
+    part("part-001", [(1, "09:00:00"), (2, "10:00:00")], "full")
+    part("part-002", [(3, "11:00:00")], "delta")
+    part("part-003", [(4, "12:00:00")], "delta")
+
+    svc = LoadService(processed_bucket="fake-processed", db=fake_db)
+    svc.s3_client = fake_s3
+    monkeypatch.setattr(
+        "loading.load_service.CREATE_TABLE_SQL",
+        {table: (f'CREATE TABLE IF NOT EXISTS "{table}" ('
+                 "order_id INT, last_updated_date TEXT, last_updated_time TEXT);")},
+        raising=True,
+    )
+    ckpt_key = f"{svc.checkpoints_prefix}/{table}.json"
+    fake_s3.s3.objects[ckpt_key] = json.dumps({
+        "last_loaded_key": f"{table}/part-000.parquet",
+        "last_loaded_ts": "2026-01-02T09:00:00Z",
+    }).encode("utf-8")
+
+    res = svc.load_one_table(table)
+
+    # part-001 is a full snapshot, so part-000's rows are not re-read and the
+    # watermark keeps order 1 out
+    inserted = [params[0] for params in fake_db.executemany_calls[0]["params"]]
+    assert inserted == [2, 3, 4]
+    assert res["latest_key"] == f"{table}/part-003.parquet"
+
+
+def test_fact_without_known_checkpoint_reads_back_to_latest_full_snapshot(monkeypatch):
+    table = "fact_sales_order"
+    fake_db = FakeDB()
+    fake_s3 = FakeS3LoadingClient()
+
+    def part(name, rows, mode):
+        df = pd.DataFrame([
+            {"order_id": order_id, "last_updated_date": "2026-01-02", "last_updated_time": t}
+            for order_id, t in rows])
+        df.attrs["output_mode"] = mode
+        fake_s3.parquet[f"{table}/{name}.parquet"] = df
+
+    part("part-000", [(1, "09:00:00")], "full")
+    part("part-001", [(1, "09:00:00"), (2, "10:00:00")], "full")
+    part("part-002", [(3, "11:00:00")], "delta")
+    part("part-003", [(4, "12:00:00")], "delta")
+
+    svc = LoadService(processed_bucket="fake-processed", db=fake_db)
+    svc.s3_client = fake_s3
+    monkeypatch.setattr(
+        "loading.load_service.CREATE_TABLE_SQL",
+        {table: (f'CREATE TABLE IF NOT EXISTS "{table}" ('
+                 "order_id INT, last_updated_date TEXT, last_updated_time TEXT);")},
+        raising=True,
+    )
+
+    # no checkpoint (fresh warehouse) and the latest file is a delta
+    res = svc.load_one_table(table)
+
+    inserted = [params[0] for params in fake_db.executemany_calls[0]["params"]]
+    assert inserted == [1, 2, 3, 4]
+    assert res["latest_key"] == f"{table}/part-003.parquet"
+
+
+def test_dim_date_loads_every_unloaded_delta_and_checkpoints(monkeypatch):
+    table = "dim_date"
+
+    class DimDateDB(FakeDB):
+        def fetchall(self, sql, params=None):
+            if "data_type" in sql and "is_nullable" in sql:
+                return [("date_id", "bigint", "NO"), ("date", "date", "NO")]
+            return [("date_id",), ("date",)]
+
+    fake_db = DimDateDB()
+    fake_s3 = FakeS3LoadingClient()
+
+    def part(name, dates, mode):
+        df = pd.DataFrame({"date_id": [int(d.replace("-", "")) for d in dates], "date": dates})
+        df.attrs["output_mode"] = mode
+        fake_s3.parquet[f"{table}/{name}.parquet"] = df
+
+    part("part-000", ["2026-01-01"], "full")
+    part("part-001", ["2026-01-02"], "delta")
+    part("part-002", ["2026-01-03"], "delta")
+
+    svc = LoadService(processed_bucket="fake-processed", db=fake_db)
+    svc.s3_client = fake_s3
+    monkeypatch.setattr(
+        "loading.load_service.CREATE_TABLE_SQL",
+        {table: f'CREATE TABLE IF NOT EXISTS "{table}" (date_id BIGINT PRIMARY KEY, date DATE);'},
+        raising=True,
+    )
+    ckpt_key = f"{svc.checkpoints_prefix}/{table}.json"
+    fake_s3.s3.objects[ckpt_key] = json.dumps({
+        "last_loaded_key": f"{table}/part-000.parquet", "last_loaded_ts": None}).encode("utf-8")
+
+    res = svc.load_one_table(table)
+
+    # both deltas written since the last load reach the warehouse
+    upserted = [params[0] for params in fake_db.executemany_calls[0]["params"]]
+    assert upserted == [20260102, 20260103]
+    assert res["mode"] == "snapshot_upsert"
+    assert json.loads(fake_s3.s3.objects[ckpt_key])["last_loaded_key"] == f"{table}/part-002.parquet"
+
+    # nothing new: skipped
+    assert svc.load_one_table(table)["reason"] == "already_loaded"
+
+
+def test_fact_purchase_order_delta_after_full_syncs_the_key_sequence(monkeypatch):
+    table = "fact_purchase_order"
+
+    class PurchaseDB(FakeDB):
+        def fetchall(self, sql, params=None):
+            if "data_type" in sql and "is_nullable" in sql:
+                return [("purchase_record_id", "bigint", "NO"),
+                        ("purchase_order_id", "integer", "NO"),
+                        ("last_updated_date", "text", "NO"),
+                        ("last_updated_time", "text", "NO")]
+            return [("purchase_record_id",), ("purchase_order_id",),
+                    ("last_updated_date",), ("last_updated_time",)]
+
+    fake_db = PurchaseDB()
+    fake_s3 = FakeS3LoadingClient()
+    svc = LoadService(processed_bucket="fake-processed", db=fake_db)
+    svc.s3_client = fake_s3
+    monkeypatch.setattr(
+        "loading.load_service.CREATE_TABLE_SQL",
+        {table: f'CREATE TABLE IF NOT EXISTS "{table}" (purchase_record_id BIGSERIAL PRIMARY KEY);'},
+        raising=True,
+    )
+
+    full = pd.DataFrame({"purchase_record_id": [1, 2], "purchase_order_id": [10, 11],
+                         "last_updated_date": ["2026-01-01"] * 2,
+                         "last_updated_time": ["09:00:00", "10:00:00"]})
+    full.attrs["output_mode"] = "full"
+    fake_s3.parquet[f"{table}/part-000.parquet"] = full
+    svc.load_one_table(table)
+    assert not any("setval" in sql for sql in fake_db.executed_sql)
+
+    delta = pd.DataFrame({"purchase_order_id": [12], "last_updated_date": ["2026-01-02"],
+                          "last_updated_time": ["09:00:00"]})
+    delta.attrs["output_mode"] = "delta"
+    fake_s3.parquet[f"{table}/part-001.parquet"] = delta
+    res = svc.load_one_table(table)
+
+    assert res["rows"] == 1
+    setval = [sql for sql in fake_db.executed_sql if "setval" in sql]
+    assert len(setval) == 1
+    assert "pg_get_serial_sequence" in setval[0] and "MAX(\"purchase_record_id\")" in setval[0]
+    # the delta row takes its key from the sequence
+    assert "purchase_record_id" not in fake_db.executemany_calls[-1]["sql"]
@@ -0,0 +1,84 @@
+import pandas as pd
+import pyarrow as pa
+import pytest
+
+from test_transform_service import FakeS3TransformationClient, seeded_service  # noqa: F401
+from transformation.arrow_transform_service import ArrowTransformService, latest_by_key
+from transformation.transform_service import TRANSFORM_GRAPH, TransformService
+
+
+def add_rows(landing, table_name, rows):
+    data = FakeS3TransformationClient.data[landing]
+    data[table_name] = pd.concat([data[table_name], pd.DataFrame(rows)], ignore_index=True)
+
+
+@pytest.fixture
+def engines(seeded_service):  # noqa: F811
+    _, landing, processed = seeded_service
+    # duplicate keys (latest version wins), an unmatched join key and a
+    # second row per table, so ordering and null handling are compared too
+    add_rows(landing, "currency", [{"currency_id": 2, "currency_code": "EUR"},
+                                   {"currency_id": 1, "currency_code": "GBX"}])
+    add_rows(landing, "department", [{"department_id": 11, "department_name": "Ops"}])
+    staff = FakeS3TransformationClient.data[landing]["staff"].iloc[0]
+    add_rows(landing, "staff", [dict(staff, staff_id=101, department_id=11),
+                                dict(staff, staff_id=102, department_id=99)])
+    sales = FakeS3TransformationClient.data[landing]["sales_order"].iloc[0]
+    add_rows(landing, "sales_order", [dict(sales, sales_order_id=1001,
+                                           created_at="2024-03-01T23:30:00.123456Z",
+                                           last_updated="2024-03-02T00:15:00Z")])
+    return (TransformService(landing, processed),
+            ArrowTransformService(landing, processed))
+
+
+@pytest.mark.parametrize("output", list(TRANSFORM_GRAPH))
+def test_arrow_engine_matches_pandas_engine(engines, output):
+    pandas_service, arrow_service = engines
+    builder = TRANSFORM_GRAPH[output]["builder"]
+
+    expected = pa.Table.from_pandas(getattr(pandas_service, builder)(), preserve_index=False)
+    actual = getattr(arrow_service, builder)()
+
+    assert actual.schema.remove_metadata() == expected.schema.remove_metadata()
+    assert actual.to_pylist() == expected.to_pylist()
+
+
+def test_arrow_engine_keeps_date_and_time_types(engines):
+    _, arrow_service = engines
+    fact = arrow_service.make_fact_sales_order()
+
+    assert fact.schema.field("created_date").type == pa.date32()
+    assert fact.schema.field("created_time").type == pa.time64("us")
+
+
+def test_latest_by_key_keeps_last_version_in_row_order():
+    table = pa.table({"k": [1, 2, 1, 3], "v": ["a", "b", "c", "d"]})
+
+    assert latest_by_key(table, "k").to_pydict() == {"k": [2, 1, 3], "v": ["b", "c", "d"]}
+
+
+def test_arrow_engine_run_writes_outputs_with_output_mode(engines):
+    _, arrow_service = engines
+    processed = arrow_service.processed_s3.bucket
+
+    summary = arrow_service.run()
+
+    assert summary["status"] == "success"
+    written = FakeS3TransformationClient.writes[processed]
+    assert sorted(written) == sorted(TRANSFORM_GRAPH)
+    # restored into DataFrame.attrs by pandas.read_parquet in the loader
+    assert written["fact_payment"].schema.metadata[b"PANDAS_ATTRS"] == b'{"output_mode": "full"}'
+
+
+def test_arrow_engine_drops_pandas_copies_once_converted(seeded_service):  # noqa: F811
+    _, landing, processed = seeded_service
+    full = ArrowTransformService(landing, processed)
+    delta = ArrowTransformService(landing, processed, fact_mode="delta")
+
+    full._load_source("payment")
+    delta._load_source("payment")
+
+    assert "payment" in full._arrow
+    assert "payment" not in full._typed and "payment" not in full._cache
+    # delta facts filter on the pandas frame
+    assert "payment" in delta._typed
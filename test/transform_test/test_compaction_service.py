@@ -0,0 +1,152 @@
+import json
+
+import boto3
+import pytest
+from moto import mock_aws
+
+from transformation.compaction_service import CompactionService
+from transformation.s3_client import S3TransformationClient
+
+
+@pytest.fixture
+def landing():
+    with mock_aws():
+        s3 = boto3.client("s3", region_name="us-east-1")
+        s3.create_bucket(Bucket="landing")
+
+        def land(key, rows):
+            s3.put_object(Bucket="landing", Key=key, Body=json.dumps(rows))
+
+        land("staff/raw_2025-01-01T00-00-00.json",
+             [{"staff_id": 1, "first_name": "A"}, {"staff_id": 2, "first_name": "B"}])
+        land("staff/raw_2025-01-02T00-00-00.json", [{"staff_id": 1, "first_name": "A2"}])
+        land("checkpoints/staff_checkpoint.json", {"last_ingested": "2025-01-02T00:00:00"})
+        yield s3, land
+
+
+def test_compaction_keeps_latest_version_per_key(landing):
+    s3, land = landing
+
+    results = CompactionService("landing").run()
+
+    assert list(results) == ["staff"]
+    assert results["staff"]["status"] == "success"
+    assert results["staff"]["files_merged"] == 2
+    client = S3TransformationClient("landing")
+    pointer = client.get_compacted_pointer("staff")
+    assert pointer["last_key"] == "staff/raw_2025-01-02T00-00-00.json"
+    snapshot = client.read_parquet(pointer["snapshot_key"])
+    assert snapshot.to_dict("records") == [
+        {"staff_id": 2, "first_name": "B"},
+        {"staff_id": 1, "first_name": "A2"},
+    ]
+
+    # transforms start from the snapshot and add only newer raw files
+    land("staff/raw_2025-01-03T00-00-00.json", [{"staff_id": 3, "first_name": "C"}])
+    df = client.read_table("staff")
+    assert list(df["staff_id"]) == [2, 1, 3]
+
+
+def test_compaction_archives_merged_files_and_is_idempotent(landing):
+    s3, land = landing
+    service = CompactionService("landing", archive=True)
+
+    service.run(["staff"])
+    first_pointer = S3TransformationClient("landing").get_compacted_pointer("staff")
+    land("staff/raw_2025-01-03T00-00-00.json", [{"staff_id": 2, "first_name": "B2"}])
+    second = service.compact_table("staff")
+
+    assert second["files_merged"] == 1
+    assert service.compact_table("staff")["status"] == "up_to_date"
+    keys = [obj["Key"] for obj in s3.list_objects_v2(Bucket="landing")["Contents"]]
+    assert not [k for k in keys if k.startswith("staff/")]
+    assert "_archive/staff/raw_2025-01-03T00-00-00.json" in keys
+    # the replaced snapshot is kept until the next compaction...
+    assert first_pointer["snapshot_key"] in keys
+    land("staff/raw_2025-01-04T00-00-00.json", [{"staff_id": 3, "first_name": "C"}])
+    service.compact_table("staff")
+    keys = [obj["Key"] for obj in s3.list_objects_v2(Bucket="landing")["Contents"]]
+    # ...which removes it
+    assert first_pointer["snapshot_key"] not in keys
+    assert len([k for k in keys if k.startswith("_compacted/staff/snapshot_")]) == 2
+    df = S3TransformationClient("landing").read_table("staff")
+    assert df.sort_values("staff_id").to_dict("records") == [
+        {"staff_id": 1, "first_name": "A2"},
+        {"staff_id": 2, "first_name": "B2"},
+        {"staff_id": 3, "first_name": "C"},
+    ]
+
+
+def test_read_compacted_rereads_pointer_when_snapshot_is_gone(landing):
+    s3, land = landing
+    service = CompactionService("landing")
+    service.compact_table("staff")
+    client = S3TransformationClient("landing")
+    stale = client.get_compacted_pointer("staff")
+    land("staff/raw_2025-01-03T00-00-00.json", [{"staff_id": 3, "first_name": "C"}])
+    service.compact_table("staff")
+    s3.delete_object(Bucket="landing", Key=stale["snapshot_key"])
+
+    # the first pointer read still names the removed snapshot
+    pointers = iter([stale, client.get_compacted_pointer("staff")])
+    client.get_compacted_pointer = lambda table_name: next(pointers)
+    df, last_key = client.read_compacted("staff")
+
+    assert last_key == "staff/raw_2025-01-03T00-00-00.json"
+    assert sorted(df["staff_id"]) == [1, 2, 3]
+
+
+def test_compaction_keeps_every_version_of_fact_source_tables(landing):
+    s3, land = landing
+    land("sales_order/raw_2025-01-01T00-00-00.json", [{"sales_order_id": 1, "units_sold": 5}])
+    land("sales_order/raw_2025-01-02T00-00-00.json", [{"sales_order_id": 1, "units_sold": 7}])
+    client = S3TransformationClient("landing")
+    before = client.read_table("sales_order")
+
+    result = CompactionService("landing", archive=True).compact_table("sales_order")
+
+    assert result["rows"] == 2
+    assert client.get_compacted_pointer("sales_order")["all_versions"] is True
+    # full-mode facts see the same rows, in the same order, as before
+    assert client.read_table("sales_order").to_dict("records") == before.to_dict("records")
+
+
+def test_compaction_rebuilds_latest_version_snapshot_of_fact_source_table(landing):
+    s3, land = landing
+    land("sales_order/raw_2025-01-01T00-00-00.json", [{"sales_order_id": 1, "units_sold": 5}])
+    land("sales_order/raw_2025-01-02T00-00-00.json", [{"sales_order_id": 1, "units_sold": 7}])
+    client = S3TransformationClient("landing")
+    # a snapshot from when every table was deduplicated, raw files archived
+    client.write_compacted(
+        "sales_order", client.read_table("sales_order").tail(1),
+        last_key="sales_order/raw_2025-01-02T00-00-00.json", primary_key="sales_order_id")
+    client.archive_keys(["sales_order/raw_2025-01-01T00-00-00.json",
+                         "sales_order/raw_2025-01-02T00-00-00.json"])
+    land("sales_order/raw_2025-01-03T00-00-00.json", [{"sales_order_id": 2, "units_sold": 1}])
+
+    CompactionService("landing", archive=True).compact_table("sales_order")
+
+    pointer = client.get_compacted_pointer("sales_order")
+    assert pointer["all_versions"] is True
+    assert pointer["last_key"] == "sales_order/raw_2025-01-03T00-00-00.json"
+    df = client.read_table("sales_order")
+    assert list(zip(df["sales_order_id"], df["units_sold"])) == [(1, 5), (1, 7), (2, 1)]
+
+
+def test_fingerprint_lists_only_keys_after_compacted_snapshot(landing):
+    s3, land = landing
+    client = S3TransformationClient("landing")
+    before = client.fingerprint("staff")
+    CompactionService("landing").compact_table("staff")
+    listed = []
+    original = client.list_objects
+    client.list_objects = lambda prefix, start_after=None: (
+        listed.append(start_after) or original(prefix, start_after=start_after))
+
+    compacted = client.fingerprint("staff")
+    assert compacted != before
+    assert listed == ["staff/raw_2025-01-02T00-00-00.json"]
+    assert client.fingerprint("staff") == compacted
+
+    land("staff/raw_2025-01-03T00-00-00.json", [{"staff_id": 3, "first_name": "C"}])
+    assert client.fingerprint("staff") != compacted
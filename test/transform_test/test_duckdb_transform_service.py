@@ -0,0 +1,94 @@
+import pyarrow as pa
+import pytest
+
+from test_transform_service import FakeS3TransformationClient, seeded_service  # noqa: F401
+from transformation.duckdb_transform_service import DuckDBTransformService
+from transformation.transform_service import TRANSFORM_GRAPH, TransformService
+
+
+@pytest.fixture
+def engines(seeded_service, tmp_path, monkeypatch):  # noqa: F811
+    _, landing, processed = seeded_service
+    # the same raw tables as local landing files, so DuckDB scans them in place
+    files = {}
+    for table_name, df in FakeS3TransformationClient.data[landing].items():
+        path = tmp_path / f"{table_name}.json"
+        df.to_json(path, orient="records", date_format="iso")
+        files[table_name] = [str(path)]
+    monkeypatch.setattr(DuckDBTransformService, "raw_files",
+                        lambda self, table_name: files[table_name])
+    return (TransformService(landing, processed),
+            DuckDBTransformService(landing, processed))
+
+
+def rows(table: pa.Table) -> list:
+    key = table.column_names[0]
+    return sorted(table.to_pylist(), key=lambda row: row[key])
+
+
+@pytest.mark.parametrize("output", list(TRANSFORM_GRAPH))
+def test_duckdb_engine_matches_pandas_engine(engines, output):
+    pandas_service, duckdb_service = engines
+    builder = TRANSFORM_GRAPH[output]["builder"]
+
+    expected = pa.Table.from_pandas(getattr(pandas_service, builder)(), preserve_index=False)
+    actual = getattr(duckdb_service, builder)().read_all()
+
+    assert actual.column_names == expected.column_names
+    assert rows(actual) == rows(expected)
+
+
+def test_duckdb_engine_streams_outputs_with_output_mode(engines):
+    _, duckdb_service = engines
+    processed = duckdb_service.processed_s3.bucket
+    written = {}
+
+    def write_parquet(table_name, reader):
+        written[table_name] = reader.read_all()
+        return f"{table_name}/processed_TEST.parquet"
+
+    duckdb_service.processed_s3.write_parquet = write_parquet
+    summary = duckdb_service.run(["dim_currency", "fact_payment"])
+
+    assert summary["status"] == "success"
+    assert FakeS3TransformationClient.writes[processed] == {}
+    assert sorted(written) == ["dim_currency", "fact_payment"]
+    assert written["fact_payment"].schema.metadata[b"PANDAS_ATTRS"] == b'{"output_mode": "full"}'
+    assert {r["output"]: r["rows"] for r in summary["results"]} == {
+        "dim_currency": written["dim_currency"].num_rows,
+        "fact_payment": written["fact_payment"].num_rows,
+    }
+
+
+def test_latest_view_prefers_newest_file_without_last_updated(engines, tmp_path, monkeypatch):
+    _, duckdb_service = engines
+    first, second = tmp_path / "currency_1.json", tmp_path / "currency_2.jsonl"
+    first.write_text('[{"currency_id": 1, "currency_code": "GBP"},'
+                     ' {"currency_id": 2, "currency_code": "USD"}]')
+    second.write_text('{"currency_id": 1, "currency_code": "GBX"}\n')
+    monkeypatch.setattr(DuckDBTransformService, "raw_files",
+                        lambda self, table_name: [str(first), str(second)])
+
+    dim = duckdb_service.make_dim_currency().read_all()
+
+    assert dim.to_pylist() == [{"currency_id": 1, "currency_code": "GBX"},
+                               {"currency_id": 2, "currency_code": "USD"}]
+
+
+def test_configure_s3_without_credentials_sends_unsigned_requests(engines, monkeypatch):
+    import boto3
+
+    _, duckdb_service = engines
+    statements = []
+
+    class RecordingConnection:
+        def execute(self, sql, *args):
+            statements.append(sql)
+
+    monkeypatch.setattr(boto3.session.Session, "get_credentials", lambda self: None)
+    duckdb_service._con = RecordingConnection()
+    duckdb_service._configure_s3()
+
+    assert "LOAD httpfs" in statements
+    assert any(sql.startswith("SET s3_region") for sql in statements)
+    assert not any("s3_access_key_id" in sql for sql in statements)
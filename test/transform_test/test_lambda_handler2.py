@@ -14,14 +14,14 @@ def test_lambda_handler_calls_run(monkeypatch):
     monkeypatch.setenv("PROCESSED_BUCKET_NAME", "processed_bucket")
 
     # Fake TransformService that tracks calls
-    calls = {"init": None, "run_single_table": 0}
+    calls = {"init": None, "run_tables": 0}
 
     class FakeTransformService:
         def __init__(self, ingest_bucket: str, processed_bucket: str):
             calls["init"] = (ingest_bucket, processed_bucket)
 
-        def run_single_table(self, table_name: str):
-            calls["run_single_table"] = table_name
+        def run_tables(self, table_names: list):
+            calls["run_tables"] = table_names
             return {"status": "Succes"}
         
     # Patch TransformService used in the handler module namespace
@@ -35,5 +35,137 @@ def test_lambda_handler_calls_run(monkeypatch):
     resp = lh.lambda_handler(event, None)
 
     assert calls["init"] == ('landing_bucket', 'processed_bucket')
-    assert calls["run_single_table"] == "sales_order"
+    assert calls["run_tables"] == ["sales_order"]
     assert resp["statusCode"] == 200
+
+
+def test_lambda_handler_compact_mode_runs_compaction(monkeypatch):
+    import transformation.lambda_handler as lh
+
+    monkeypatch.setenv("LANDING_BUCKET_NAME", "landing_bucket")
+    monkeypatch.setenv("PROCESSED_BUCKET_NAME", "processed_bucket")
+    calls = {}
+
+    class FakeCompactionService:
+        def __init__(self, landing_bucket):
+            calls["bucket"] = landing_bucket
+
+        def run(self, tables=None):
+            calls["tables"] = tables
+            return {"staff": {"status": "success"}}
+
+    monkeypatch.setattr(lh, "CompactionService", FakeCompactionService)
+
+    resp = lh.lambda_handler({"mode": "compact", "tables": ["staff"]}, None)
+
+    assert resp["statusCode"] == 200
+    assert calls == {"bucket": "landing_bucket", "tables": ["staff"]}
+    assert json.loads(resp["body"]) == {"staff": {"status": "success"}}
+
+
+def test_lambda_handler_skips_compaction_outputs(monkeypatch):
+    import transformation.lambda_handler as lh
+
+    monkeypatch.setenv("LANDING_BUCKET_NAME", "landing_bucket")
+    monkeypatch.setenv("PROCESSED_BUCKET_NAME", "processed_bucket")
+    event = {"Records": [{"s3": {"object": {"key": "_compacted/staff/snapshot_1.parquet"}}}]}
+
+    resp = lh.lambda_handler(event, None)
+
+    assert json.loads(resp["body"])["reason"] == "compaction"
+
+
+def s3_record(key):
+    return {"eventSource": "aws:s3", "s3": {"object": {"key": key}}}
+
+
+def test_lambda_handler_coalesces_all_records_into_one_run(monkeypatch):
+    import transformation.lambda_handler as lh
+
+    monkeypatch.setenv("LANDING_BUCKET_NAME", "landing_bucket")
+    monkeypatch.setenv("PROCESSED_BUCKET_NAME", "processed_bucket")
+    calls = []
+
+    class FakeTransformService:
+        def __init__(self, ingest_bucket, processed_bucket):
+            pass
+
+        def run_tables(self, table_names):
+            calls.append(table_names)
+            return {"status": "success"}
+
+    monkeypatch.setattr(lh, "TransformService", FakeTransformService)
+    event = {"Records": [
+        s3_record("staff/raw_1.json"),
+        s3_record("address/raw_1.json"),
+        s3_record("staff/raw_2.json"),
+        s3_record("checkpoints/_manifest.json"),
+    ]}
+
+    resp = lh.lambda_handler(event, None)
+
+    assert resp["statusCode"] == 200
+    assert calls == [["staff", "address"]]
+
+
+def test_lambda_handler_unwraps_sqs_batches_and_raises_on_failure(monkeypatch):
+    import transformation.lambda_handler as lh
+
+    monkeypatch.setenv("LANDING_BUCKET_NAME", "landing_bucket")
+    monkeypatch.setenv("PROCESSED_BUCKET_NAME", "processed_bucket")
+    calls = []
+
+    class FakeTransformService:
+        def __init__(self, ingest_bucket, processed_bucket):
+            pass
+
+        def run_tables(self, table_names):
+            calls.append(table_names)
+            if "design" in table_names:
+                raise RuntimeError("boom")
+            return {"status": "success"}
+
+    monkeypatch.setattr(lh, "TransformService", FakeTransformService)
+
+    def sqs(*keys):
+        return {"eventSource": "aws:sqs",
+                "body": json.dumps({"Records": [s3_record(k) for k in keys]})}
+
+    event = {"Records": [
+        sqs("sales_order/raw_1.json", "payment/raw_1.json"),
+        sqs("sales_order/raw_2.json"),
+        {"eventSource": "aws:sqs", "body": json.dumps({"Event": "s3:TestEvent"})},
+    ]}
+    assert lh.lambda_handler(event, None)["statusCode"] == 200
+    assert calls == [["sales_order", "payment"]]
+
+    # only test events: nothing to do, the batch is not failed
+    test_only = {"Records": [
+        {"eventSource": "aws:sqs", "body": json.dumps({"Event": "s3:TestEvent"})}]}
+    assert json.loads(lh.lambda_handler(test_only, None)["body"])["reason"] == "no_objects"
+
+    with pytest.raises(RuntimeError):
+        lh.lambda_handler({"Records": [sqs("design/raw_1.json")]}, None)
+
+
+def test_lambda_handler_uses_arrow_engine_when_selected(monkeypatch):
+    import transformation.lambda_handler as lh
+
+    monkeypatch.setenv("LANDING_BUCKET_NAME", "landing_bucket")
+    monkeypatch.setenv("PROCESSED_BUCKET_NAME", "processed_bucket")
+    monkeypatch.setattr(lh, "TRANSFORM_ENGINE", "arrow")
+    used = []
+
+    class FakeArrowTransformService:
+        def __init__(self, ingest_bucket, processed_bucket):
+            used.append("arrow")
+
+        def run_tables(self, table_names):
+            return {"status": "success"}
+
+    monkeypatch.setattr(lh, "ArrowTransformService", FakeArrowTransformService)
+
+    resp = lh.lambda_handler({"Records": [s3_record("staff/raw_1.json")]}, None)
+
+    assert resp["statusCode"] == 200
+    assert used == ["arrow"]
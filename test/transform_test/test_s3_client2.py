@@ -24,6 +24,20 @@ def test_read_raw_json_list_format(mocker):
     assert "staff" == "staff/raw.json".split("/")[0]
 
 
+def test_read_raw_jsonl_format(mocker):
+    """Streamed ingestion files hold one JSON object per line."""
+    s3 = mocker.Mock()
+    mocker.patch("boto3.client", return_value=s3)
+
+    body = b'{"id": 1, "name": "Alice"}\n{"id": 2, "name": "Bob"}\n'
+    s3.get_object.return_value = {"Body": BytesIO(body)}
+
+    client = S3TransformationClient("landing-bucket")
+    rows = client.read_json("staff/raw.jsonl")
+
+    assert rows == [{"id": 1, "name": "Alice"}, {"id": 2, "name": "Bob"}]
+
+
 class FakeBotoS3:
     """Minimal fake boto3 S3 client."""
     def __init__(self):
@@ -33,9 +47,11 @@ class FakeBotoS3:
         body = self.objects[(Bucket, Key)]
         return {"Body": io.BytesIO(body)}
 
-    def put_object(self, Bucket, Key, Body):
+    def put_object(self, Bucket, Key, Body, **kwargs):
         if isinstance(Body, str):
             Body = Body.encode("utf-8")
+        elif hasattr(Body, "read"):
+            Body = Body.read()
         self.objects[(Bucket, Key)] = Body
         return {"ResponseMetadata": {"HTTPStatusCode": 200}}
 
@@ -46,7 +62,7 @@ def test_write_parquet_puts_object(monkeypatch):
     fake_s3 = FakeBotoS3()
 
     import transformation.s3_client as s3_mod
-    monkeypatch.setattr(s3_mod.boto3, "client", lambda service: fake_s3)
+    monkeypatch.setattr("boto3.client", lambda service, **kwargs: fake_s3)
 
     client = S3TransformationClient(bucket="processed")
     df = pd.DataFrame({"id": [1], "name": ["Alice"]})
@@ -56,4 +72,187 @@ def test_write_parquet_puts_object(monkeypatch):
     # Verify it wrote something to S3 under returned key
     assert ("processed", key) in fake_s3.objects
     assert key.startswith("dim_test/processed_")
-    assert key.endswith(".parquet")
\ No newline at end of file
+    assert key.endswith(".parquet")
+    written = pd.read_parquet(io.BytesIO(fake_s3.objects[("processed", key)]))
+    pd.testing.assert_frame_equal(written, df)
+
+def test_read_table_reads_parquet_and_json_in_key_order(mocker):
+    s3 = mocker.Mock()
+    mocker.patch("boto3.client", return_value=s3)
+
+    parquet_buffer = BytesIO()
+    pd.DataFrame({"id": [2], "created_at": [pd.Timestamp("2025-01-02 10:00:00")]}).to_parquet(parquet_buffer, index=False)
+    objects = {
+        "staff/raw_2025-01-01T00-00-00.json": json.dumps([{"id": 1, "created_at": "2025-01-01 10:00:00"}]).encode("utf-8"),
+        "staff/raw_2025-01-02T00-00-00.parquet": parquet_buffer.getvalue(),
+    }
+    s3.list_objects_v2.return_value = {"Contents": [{"Key": k} for k in objects]}
+    s3.get_object.side_effect = lambda Bucket, Key: {"Body": BytesIO(objects[Key])}
+    # no compacted snapshot pointer
+    s3.exceptions.NoSuchKey = KeyError
+
+    client = S3TransformationClient("landing-bucket")
+    df = client.read_table("staff")
+
+    assert list(df["id"]) == [1, 2]
+
+
+def test_read_table_follows_continuation_tokens(mocker):
+    s3 = mocker.Mock()
+    mocker.patch("boto3.client", return_value=s3)
+    pages = [
+        {"Contents": [{"Key": "staff/raw_1.json"}], "IsTruncated": True, "NextContinuationToken": "t1"},
+        {"Contents": [{"Key": "staff/raw_2.json"}], "IsTruncated": False},
+    ]
+    s3.list_objects_v2.side_effect = pages
+    objects = {key: json.dumps([{"id": key}]).encode("utf-8")
+               for key in ("staff/raw_1.json", "staff/raw_2.json")}
+    s3.get_object.side_effect = lambda Bucket, Key: {"Body": BytesIO(objects[Key])}
+    s3.exceptions.NoSuchKey = KeyError
+
+    df = S3TransformationClient("landing-bucket").read_table("staff")
+
+    assert list(df["id"]) == ["staff/raw_1.json", "staff/raw_2.json"]
+    assert s3.list_objects_v2.call_args_list[1].kwargs["ContinuationToken"] == "t1"
+
+
+def test_read_table_incremental_reads_only_new_objects():
+    import boto3
+    from moto import mock_aws
+
+    with mock_aws():
+        s3 = boto3.client("s3", region_name="us-east-1")
+        s3.create_bucket(Bucket="landing")
+        s3.create_bucket(Bucket="processed")
+
+        def land(key, rows):
+            s3.put_object(Bucket="landing", Key=key, Body=json.dumps(rows))
+
+        land("staff/raw_2025-01-01T00-00-00.json", [{"staff_id": 1, "name": "a"}])
+        land("staff/raw_2025-01-02T00-00-00.json", [{"staff_id": 2, "name": "b"}])
+        landing = S3TransformationClient("landing")
+        processed = S3TransformationClient("processed")
+
+        first = landing.read_table_incremental("staff", processed)
+        assert list(first["staff_id"]) == [1, 2]
+        state = processed.get_raw_state("staff")
+        assert state["last_key"] == "staff/raw_2025-01-02T00-00-00.json"
+
+        land("staff/raw_2025-01-03T00-00-00.json", [{"staff_id": 1, "name": "a2"}])
+        reads = []
+        original = landing.read_json_frame
+        landing.read_json_frame = lambda key: reads.append(key) or original(key)
+
+        second = landing.read_table_incremental("staff", processed)
+
+        assert reads == ["staff/raw_2025-01-03T00-00-00.json"]
+        pd.testing.assert_frame_equal(second, landing.read_table("staff"))
+        # the superseded snapshot is removed
+        snapshots = [k for k in processed.list_keys("_raw_state/staff/") if k.endswith(".arrow")]
+        assert snapshots == [processed.get_raw_state("staff")["snapshot_key"]]
+
+
+def test_read_table_incremental_rebases_onto_archiving_compaction():
+    import boto3
+    from moto import mock_aws
+    from transformation.compaction_service import CompactionService
+
+    with mock_aws():
+        s3 = boto3.client("s3", region_name="us-east-1")
+        s3.create_bucket(Bucket="landing")
+        s3.create_bucket(Bucket="processed")
+
+        def land(key, rows):
+            s3.put_object(Bucket="landing", Key=key, Body=json.dumps(rows))
+
+        land("staff/raw_2025-01-01T00-00-00.json", [{"staff_id": 1, "name": "a"}])
+        landing = S3TransformationClient("landing")
+        processed = S3TransformationClient("processed")
+        landing.read_table_incremental("staff", processed)
+
+        # newer than the raw state, then moved to _archive/ by compaction
+        land("staff/raw_2025-01-02T00-00-00.json", [{"staff_id": 2, "name": "b"}])
+        CompactionService("landing", archive=True).compact_table("staff")
+        assert not landing.list_keys("staff/")
+
+        second = landing.read_table_incremental("staff", processed)
+
+        assert sorted(second["staff_id"]) == [1, 2]
+        assert processed.get_raw_state("staff")["last_key"] == "staff/raw_2025-01-02T00-00-00.json"
+
+        land("staff/raw_2025-01-03T00-00-00.json", [{"staff_id": 3, "name": "c"}])
+        third = landing.read_table_incremental("staff", processed)
+        assert sorted(third["staff_id"]) == [1, 2, 3]
+
+
+def test_read_keys_fetches_concurrently_but_keeps_key_order(mocker):
+    import threading
+    import time
+
+    s3 = mocker.Mock()
+    factory = mocker.patch("boto3.client", return_value=s3)
+    keys = [f"staff/raw_{i}.json" for i in range(6)]
+    threads = set()
+
+    def get_object(Bucket, Key):
+        threads.add(threading.get_ident())
+        # later keys finish first
+        time.sleep(0.01 * (len(keys) - keys.index(Key)))
+        return {"Body": BytesIO(json.dumps([{"staff_id": 1, "key": Key}]).encode("utf-8"))}
+
+    s3.get_object.side_effect = get_object
+    client = S3TransformationClient("landing-bucket", read_concurrency=4)
+
+    df = client.read_keys(keys)
+
+    assert list(df["key"]) == keys
+    assert len(threads) > 1
+    assert factory.call_args.kwargs["config"].max_pool_connections >= 4
+
+
+def test_parquet_options_layer_prefix_defaults_env_and_call_overrides(monkeypatch):
+    import transformation.s3_client as s3_mod
+
+    monkeypatch.setattr(s3_mod, "PARQUET_OVERRIDES", {
+        "*": {"compression_level": 5},
+        "fact_payment": {"row_group_size": 1000},
+    })
+
+    assert s3_mod.parquet_options("dim_staff")["compression_level"] == 5
+    fact = s3_mod.parquet_options("fact_payment", use_dictionary=["currency_id"])
+    assert fact["compression"] == "zstd"
+    assert fact["row_group_size"] == 1000
+    assert fact["use_dictionary"] == ["currency_id"]
+    assert s3_mod.parquet_options("other")["compression"] == "snappy"
+    with pytest.raises(ValueError):
+        s3_mod.parquet_options("dim_staff", bloom_filter=True)
+
+
+def test_large_parquet_output_streams_as_multipart_upload(monkeypatch):
+    import boto3
+    import numpy as np
+    import pyarrow.parquet as pq
+    from moto import mock_aws
+    import transformation.s3_client as s3_mod
+
+    with mock_aws():
+        s3 = boto3.client("s3", region_name="us-east-1")
+        s3.create_bucket(Bucket="processed")
+        monkeypatch.setattr(s3_mod, "PARQUET_PART_SIZE", s3_mod.MIN_PART_SIZE)
+        client = S3TransformationClient(bucket="processed")
+        single_puts = []
+        monkeypatch.setattr(client.s3, "put_object",
+                            lambda **kwargs: single_puts.append(kwargs))
+        rng = np.random.default_rng(0)
+        df = pd.DataFrame({"payment_id": np.arange(1_500_000),
+                           "payment_amount": rng.random(1_500_000)})
+
+        key = client.write_parquet("fact_payment", df, compression_level=1,
+                                   row_group_size=500_000)
+
+        assert single_puts == []  # went up as a multipart upload
+        body = s3.get_object(Bucket="processed", Key=key)["Body"].read()
+        parquet = pq.ParquetFile(io.BytesIO(body))
+        assert parquet.metadata.num_row_groups == 3
+        assert parquet.metadata.row_group(0).column(0).compression == "ZSTD"
+        assert parquet.read().to_pandas().equals(df)
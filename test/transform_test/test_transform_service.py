@@ -1,6 +1,7 @@
 import pandas as pd
 import pytest
 import numpy as np
+import pyarrow as pa
 from datetime import date, time
 from pprint import pprint
 
@@ -12,6 +13,8 @@ class FakeS3TransformationClient:
     data = {}     # {bucket: {table_name: DataFrame}}
     writes = {}   # {bucket: {output_table: DataFrame}}
     read_calls = []  # [(bucket, table_name)]
+    fingerprints = {}  # {table_name: str}
+    states = {}   # {bucket: {name: dict}}
 
     def __init__(self, bucket: str):
         self.bucket = bucket
@@ -22,10 +25,21 @@ class FakeS3TransformationClient:
         FakeS3TransformationClient.read_calls.append((self.bucket, table_name))
         return FakeS3TransformationClient.data[self.bucket][table_name].copy()
 
+    def fingerprint(self, table_name: str) -> str:
+        return FakeS3TransformationClient.fingerprints.get(table_name, "v1")
+
     def write_parquet(self, table_name: str, df: pd.DataFrame):
-        FakeS3TransformationClient.writes[self.bucket][table_name] = df.copy()
+        # Arrow tables (ArrowTransformService) are immutable
+        FakeS3TransformationClient.writes[self.bucket][table_name] = (
+            df if isinstance(df, pa.Table) else df.copy())
         return f"{table_name}/processed_TEST.parquet"
 
+    def get_state(self, name: str):
+        return FakeS3TransformationClient.states.get(self.bucket, {}).get(name)
+
+    def put_state(self, name: str, state: dict):
+        FakeS3TransformationClient.states.setdefault(self.bucket, {})[name] = state
+
 
 @pytest.fixture
 def seeded_service(monkeypatch):
@@ -45,6 +59,7 @@ def seeded_service(monkeypatch):
     FakeS3TransformationClient.data = {landing: {}, processed: {}}
     FakeS3TransformationClient.writes = {landing: {}, processed: {}}
     FakeS3TransformationClient.read_calls = []
+    FakeS3TransformationClient.states = {}
 
     # ---- seed ingest tables ----
     FakeS3TransformationClient.data[landing]["currency"] = pd.DataFrame(
@@ -162,7 +177,7 @@ def test_run_writes_all_required_tables(seeded_service):
     written = set(FakeS3TransformationClient.writes[processed].keys())
     required = {
         "fact_sales_order",
-        "fact_purchase_orders",
+        "fact_purchase_order",
         "fact_payment",
         "dim_transaction",
         "dim_staff",
@@ -365,3 +380,298 @@ def test_debug_dim_counterparty(seeded_service):
     service, _, _ = seeded_service
     df = service.make_dim_counterparty()
     pprint(df)
+
+
+def test_shared_table_cache_spans_services_until_fingerprint_changes(seeded_service):
+    from transformation import table_cache
+    from transformation.transform_service import TransformService
+
+    table_cache.clear()
+    FakeS3TransformationClient.read_calls = []
+    first = TransformService("landing-bucket", "processed-bucket", shared_cache=True)
+    fact = first.make_fact_purchase_order()
+
+    second = TransformService("landing-bucket", "processed-bucket", shared_cache=True)
+    po = second._get_ingest_table("purchase_order")
+
+    # served from the process-level cache, untouched by the first builder
+    assert FakeS3TransformationClient.read_calls == [("landing-bucket", "purchase_order")]
+    assert "created_date" not in po.columns
+    assert len(fact) == len(po)
+
+    FakeS3TransformationClient.fingerprints["purchase_order"] = "v2"
+    TransformService("landing-bucket", "processed-bucket", shared_cache=True)._get_ingest_table(
+        "purchase_order")
+    assert len(FakeS3TransformationClient.read_calls) == 2
+    FakeS3TransformationClient.fingerprints = {}
+    table_cache.clear()
+
+
+def test_shared_table_cache_evicts_least_recently_used():
+    from transformation import table_cache
+
+    table_cache.clear()
+    df = pd.DataFrame({"id": range(100)})
+    size = int(df.memory_usage(deep=True).sum())
+    table_cache.put("b", "a", "f", df, max_bytes=size * 2)
+    table_cache.put("b", "b", "f", df, max_bytes=size * 2)
+    assert table_cache.get("b", "a", "f") is not None
+    table_cache.put("b", "c", "f", df, max_bytes=size * 2)
+
+    assert table_cache.get("b", "b", "f") is None
+    assert table_cache.get("b", "a", "f") is not None
+    assert table_cache.get("b", "a", "other") is None
+    table_cache.clear()
+
+
+def test_parse_datetime_column_iso_fast_path_and_mixed_fallback():
+    from transformation.transform_service import parse_datetime_column
+
+    iso = pd.Series(["2025-01-02 10:00:00.123000", "2025-01-03T11:30:00", None], name="created_at")
+    parsed = parse_datetime_column(iso)
+    assert list(parsed[:2]) == [pd.Timestamp("2025-01-02 10:00:00.123"), pd.Timestamp("2025-01-03 11:30:00")]
+    assert pd.isna(parsed[2])
+
+    mixed = pd.Series(["2025-01-02", "02 Jan 2025 10:00"], name="last_updated")
+    assert list(parse_datetime_column(mixed)) == list(pd.to_datetime(mixed, format="mixed"))
+
+    already = pd.Series(pd.to_datetime(["2025-01-02"]))
+    assert parse_datetime_column(already) is already
+
+
+def test_typed_tables_parse_each_column_once(seeded_service, mocker):
+    import transformation.transform_service as ts_mod
+
+    service, _, _ = seeded_service
+    spy = mocker.spy(ts_mod, "parse_datetime_column")
+
+    service.make_fact_sales_order()
+    service.make_fact_payment()
+    service.make_fact_purchase_order()
+    service.make_dim_date()
+
+    parsed = [call.args[0].name for call in spy.call_args_list]
+    # sales_order + purchase_order: 4 columns each, payment: 3
+    assert len(parsed) == 11
+    assert parsed.count("created_at") == 3
+
+
+def test_dim_date_ids_are_stable_yyyymmdd(seeded_service):
+    service, _, _ = seeded_service
+    df = service.make_dim_date()
+
+    expected = [d.year * 10000 + d.month * 100 + d.day for d in df["date"]]
+    assert list(df["date_id"]) == expected
+    assert df["date_id"].is_unique
+
+
+def test_incremental_dim_date_emits_only_new_dates(seeded_service):
+    from transformation.transform_service import TransformService
+
+    service, landing, processed = seeded_service
+    service.dim_date_mode = "incremental"
+    service.run_single_table("payment")
+    all_dates = FakeS3TransformationClient.writes[processed]["dim_date"]
+    state = FakeS3TransformationClient.states[processed]["dim_date"]
+    assert state["date_ids"] == sorted(all_dates["date_id"])
+
+    # nothing new: dim_date is not written again
+    FakeS3TransformationClient.writes[processed].clear()
+    again = TransformService(landing, processed, dim_date_mode="incremental")
+    result = again.run_single_table("payment")
+    assert "dim_date" not in FakeS3TransformationClient.writes[processed]
+    dim_date = [r for r in result["results"] if r["output"] == "dim_date"][0]
+    assert (dim_date["rows"], dim_date["s3_key"]) == (0, None)
+
+    payments = FakeS3TransformationClient.data[landing]["payment"]
+    payments.loc[0, "payment_date"] = "2030-01-02"
+    later = TransformService(landing, processed, dim_date_mode="incremental")
+    df = later.make_dim_date()
+    assert list(df["date_id"]) == [20300102]
+
+
+def test_dim_date_state_saved_only_after_write(seeded_service, mocker):
+    service, _, processed = seeded_service
+    service.dim_date_mode = "incremental"
+    mocker.patch.object(service.processed_s3, "write_parquet",
+                        side_effect=RuntimeError("S3 down"))
+
+    with pytest.raises(RuntimeError):
+        service.run_single_table("payment")
+    assert "dim_date" not in FakeS3TransformationClient.states.get(processed, {})
+
+
+def test_dim_date_fixed_range_is_dense(seeded_service):
+    from transformation.transform_service import TransformService
+
+    _, landing, processed = seeded_service
+    service = TransformService(landing, processed, dim_date_range="2024-02-27:2024-03-02")
+    df = service.make_dim_date()
+
+    assert list(df["date_id"]) == [20240227, 20240228, 20240229, 20240301, 20240302]
+    assert FakeS3TransformationClient.read_calls == []
+
+
+def test_run_builds_each_output_once_and_loads_each_source_once(seeded_service, mocker):
+    from transformation.transform_service import TRANSFORM_GRAPH
+
+    service, _, processed = seeded_service
+    writes = mocker.spy(FakeS3TransformationClient, "write_parquet")
+
+    summary = service.run()
+
+    assert summary["status"] == "success"
+    written = [call.args[1] for call in writes.call_args_list]
+    assert sorted(written) == sorted(TRANSFORM_GRAPH)
+    read = [table for _, table in FakeS3TransformationClient.read_calls]
+    assert sorted(read) == sorted(set(read))
+    assert [r["output"] for r in summary["results"]] == list(TRANSFORM_GRAPH)
+    assert all("build_seconds" in r and "write_seconds" in r for r in summary["results"])
+    assert set(summary["load_seconds"]) == set(read)
+
+
+def test_run_failed_source_only_fails_its_dependents(seeded_service):
+    service, landing, processed = seeded_service
+    del FakeS3TransformationClient.data[landing]["address"]
+
+    summary = service.run()
+
+    status = {r["output"]: r["status"] for r in summary["results"]}
+    assert summary["status"] == "error"
+    assert status["dim_location"] == status["dim_counterparty"] == "error"
+    assert status["dim_staff"] == status["fact_payment"] == "success"
+    assert "dim_location" not in FakeS3TransformationClient.writes[processed]
+    assert "dim_staff" in FakeS3TransformationClient.writes[processed]
+
+
+@pytest.mark.parametrize("table, expected", [
+    ("department", ["dim_staff"]),
+    ("address", ["dim_location", "dim_counterparty"]),
+    ("payment", ["dim_date", "fact_payment"]),
+    ("currency", ["dim_currency"]),
+])
+def test_single_table_trigger_rebuilds_exactly_affected_outputs(seeded_service, table, expected):
+    service, _, processed = seeded_service
+
+    result = service.run_single_table(table)
+
+    assert [r["output"] for r in result["results"]] == expected
+    assert sorted(FakeS3TransformationClient.writes[processed]) == sorted(expected)
+
+
+def test_single_table_trigger_skips_tables_feeding_nothing(seeded_service):
+    from transformation.transform_service import TransformService
+
+    service, landing, processed = seeded_service
+    assert service.run_single_table("unknown")["status"] == "skipped"
+
+    # a fixed calendar does not depend on the fact sources
+    fixed = TransformService(landing, processed, dim_date_range="2024-01-01:2024-01-02")
+    result = fixed.run_single_table("payment")
+    assert [r["output"] for r in result["results"]] == ["fact_payment"]
+
+
+def test_run_tables_builds_shared_outputs_once(seeded_service, mocker):
+    service, _, processed = seeded_service
+    writes = mocker.spy(FakeS3TransformationClient, "write_parquet")
+
+    result = service.run_tables(["payment", "sales_order", "payment", "unknown"])
+
+    assert result["tables"] == ["payment", "sales_order", "unknown"]
+    assert result["skipped"] == ["unknown"]
+    written = [call.args[1] for call in writes.call_args_list]
+    assert sorted(written) == ["dim_date", "fact_payment", "fact_sales_order"]
+    reads = [table for _, table in FakeS3TransformationClient.read_calls]
+    assert sorted(reads) == ["payment", "purchase_order", "sales_order"]
+
+
+def test_delta_fact_mode_emits_only_rows_updated_after_watermark(seeded_service):
+    from transformation.transform_service import TransformService
+
+    _, landing, processed = seeded_service
+    writes = FakeS3TransformationClient.writes[processed]
+
+    TransformService(landing, processed, fact_mode="delta").run_single_table("purchase_order")
+    fact = writes["fact_purchase_order"]
+    assert fact.attrs["output_mode"] == "full"
+    assert "purchase_record_id" not in fact.columns
+    assert FakeS3TransformationClient.states[processed]["fact_purchase_order"] == {
+        "last_updated": "2024-01-04T09:30:00"}
+
+    # unchanged source: no new fact file
+    writes.clear()
+    TransformService(landing, processed, fact_mode="delta").run_single_table("purchase_order")
+    assert "fact_purchase_order" not in writes
+
+    purchases = FakeS3TransformationClient.data[landing]["purchase_order"]
+    updated = dict(purchases.iloc[0], purchase_order_id=7001,
+                   last_updated="2024-02-01T00:00:00Z")
+    FakeS3TransformationClient.data[landing]["purchase_order"] = pd.concat(
+        [purchases, pd.DataFrame([updated])], ignore_index=True)
+    later = TransformService(landing, processed, fact_mode="delta")
+    result = later.run_single_table("purchase_order")
+
+    fact = writes["fact_purchase_order"]
+    assert list(fact["purchase_order_id"]) == [7001]
+    assert fact.attrs["output_mode"] == "delta"
+    modes = {r["output"]: r["output_mode"] for r in result["results"]}
+    assert modes["fact_purchase_order"] == "delta"
+
+
+def test_compact_dtypes_shrinks_ids_and_low_cardinality_text():
+    from transformation.transform_service import compact_dtypes
+
+    df = pd.DataFrame({
+        "address_id": np.arange(2000, dtype="int64"),
+        "sales_order_id": [1.0, None] * 1000,
+        "country": ["UK", "France"] * 1000,
+        "district": ["North", "South", "East", "West"] * 500,
+        "postal_code": [f"P{i}" for i in range(2000)],
+        "unit_price": [1.25] * 2000,
+        "payment_amount": ["10.50", "20.00"] * 1000,
+        "created_at": ["2024-01-01T00:00:00Z"] * 2000,
+    })
+
+    compact = compact_dtypes(df)
+
+    assert compact["address_id"].dtype == "int32"
+    assert compact["sales_order_id"].dtype == "Int32"
+    assert compact["sales_order_id"].isna().sum() == 1000
+    assert isinstance(compact["country"].dtype, pd.CategoricalDtype)
+    assert isinstance(compact["district"].dtype, pd.CategoricalDtype)
+    assert compact["postal_code"].dtype == object
+    assert compact["unit_price"].dtype == "float64"
+    # decimal strings from JSON are low-cardinality but stay values
+    assert compact["payment_amount"].dtype == object
+    assert compact["created_at"].dtype == object
+    assert compact.memory_usage(deep=True).sum() < df.memory_usage(deep=True).sum()
+    # values are unchanged
+    pd.testing.assert_frame_equal(
+        compact.astype(object), df.astype(object).where(df.notna(), pd.NA)
+        .assign(sales_order_id=compact["sales_order_id"].astype(object)),
+        check_dtype=False)
+
+
+def test_run_reports_memory_of_compacted_tables(seeded_service):
+    from transformation.transform_service import TransformService
+
+    _, landing, processed = seeded_service
+
+    currency = FakeS3TransformationClient.data[landing]["currency"]
+    FakeS3TransformationClient.data[landing]["currency"] = pd.DataFrame({
+        "currency_id": range(1, 301),
+        "currency_code": ["GBP", "USD", "EUR"] * 100,
+    }).assign(**{c: currency[c].iloc[0] for c in currency.columns
+                 if c not in ("currency_id", "currency_code")})
+
+    summary = TransformService(landing, processed).run(["dim_currency"])
+    memory = summary["memory_bytes"]["currency"]
+    assert memory["after"] < memory["before"]
+    dim = FakeS3TransformationClient.writes[processed]["dim_currency"]
+    assert isinstance(dim["currency_code"].dtype, pd.CategoricalDtype)
+    assert dim["currency_id"].dtype == "int32"
+
+    # TRANSFORM_COMPACT_DTYPES=false keeps the raw dtypes
+    summary = TransformService(landing, processed, compact=False).run(["dim_currency"])
+    assert summary["memory_bytes"] == {}
+    assert FakeS3TransformationClient.writes[processed]["dim_currency"]["currency_id"].dtype == "int64"